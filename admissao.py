@@ -0,0 +1,143 @@
+"""
+Controle de admissão adaptativo para o pipeline de PDF
+
+Limita quantas gerações rodam ao mesmo tempo, com o limite ajustado pela
+latência observada (AIMD): cada geração dentro da latência alvo soma
+1/limite ao limite (+1 por "rodada"), e uma geração lenta ou com falha o
+multiplica por `fator_reducao`, no máximo uma vez por janela de latência alvo
+para uma rajada não derrubar o limite várias vezes de uma vez.
+
+Acima do limite as requisições esperam em uma fila limitada; com a fila
+cheia, ou depois de esperar `espera_max_s`, recebem AdmissaoRecusada na hora
+em vez de se acumular até o timeout da conversão.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class AdmissaoRecusada(Exception):
+    """Pipeline saturado; retry_after sugere quando tentar de novo (s)"""
+
+    def __init__(self, mensagem: str, retry_after: int):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class ControleAdmissao:
+    def __init__(self, limite_inicial: int, limite_min: int, limite_max: int, max_fila: int,
+                 latencia_alvo_s: float, espera_max_s: float, fator_reducao: float = 0.7):
+        self.limite_min = max(1, limite_min)
+        self.limite_max = max(self.limite_min, limite_max)
+        self.limite = float(min(max(limite_inicial, self.limite_min), self.limite_max))
+        self.max_fila = max_fila
+        self.latencia_alvo_s = latencia_alvo_s
+        self.espera_max_s = espera_max_s
+        self.fator_reducao = fator_reducao
+
+        self._em_execucao = 0
+        self._fila = deque()
+        self._ultima_reducao = 0.0
+        self._latencia_media = None
+
+        self._admitidas = 0
+        self._recusadas = 0
+        self._reducoes = 0
+
+    @property
+    def vagas(self) -> int:
+        return int(self.limite) - self._em_execucao
+
+    def _retry_after(self) -> int:
+        # Tempo para a fila atual andar com o limite atual, pela latência média recente
+        latencia = self._latencia_media or self.latencia_alvo_s
+        rodadas = (len(self._fila) + 1) / max(1, int(self.limite))
+        return max(1, math.ceil(latencia * rodadas))
+
+    def _recusar(self, motivo: str):
+        self._recusadas += 1
+        raise AdmissaoRecusada(motivo, self._retry_after())
+
+    def _liberar_fila(self):
+        while self._fila and self.vagas > 0:
+            futuro = self._fila.popleft()
+            if not futuro.done():
+                self._em_execucao += 1
+                futuro.set_result(None)
+
+    async def _entrar(self):
+        if self.vagas > 0 and not self._fila:
+            self._em_execucao += 1
+            return
+
+        if len(self._fila) >= self.max_fila:
+            self._recusar(f"Pipeline saturado ({self._em_execucao} em execução, {len(self._fila)} na fila)")
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.append(futuro)
+        try:
+            await asyncio.wait_for(asyncio.shield(futuro), self.espera_max_s)
+        except asyncio.TimeoutError:
+            if not futuro.done():
+                futuro.cancel()
+                self._fila.remove(futuro)
+                self._recusar(f"Sem vaga no pipeline após {self.espera_max_s:g}s na fila")
+        except asyncio.CancelledError:
+            # Cliente desistiu: devolve a vaga se ela já tinha sido concedida
+            if futuro.done() and not futuro.cancelled():
+                self._sair()
+            elif not futuro.done():
+                futuro.cancel()
+                self._fila.remove(futuro)
+            raise
+
+    def _sair(self):
+        self._em_execucao -= 1
+        self._liberar_fila()
+
+    def _registrar(self, latencia: float, sucesso: bool):
+        if self._latencia_media is None:
+            self._latencia_media = latencia
+        else:
+            self._latencia_media = 0.8 * self._latencia_media + 0.2 * latencia
+
+        agora = time.monotonic()
+        if not sucesso or latencia > self.latencia_alvo_s:
+            if agora - self._ultima_reducao >= self.latencia_alvo_s:
+                self.limite = max(self.limite_min, self.limite * self.fator_reducao)
+                self._ultima_reducao = agora
+                self._reducoes += 1
+        else:
+            self.limite = min(self.limite_max, self.limite + 1 / self.limite)
+            self._liberar_fila()
+
+    @asynccontextmanager
+    async def admitir(self):
+        """Ocupa uma vaga durante o bloco; levanta AdmissaoRecusada se saturado"""
+        await self._entrar()
+        self._admitidas += 1
+        inicio = time.monotonic()
+        sucesso = False
+        try:
+            yield
+            sucesso = True
+        finally:
+            self._registrar(time.monotonic() - inicio, sucesso)
+            self._sair()
+
+    def estatisticas(self) -> dict:
+        return {
+            "limite": int(self.limite),
+            "limite_min": self.limite_min,
+            "limite_max": self.limite_max,
+            "em_execucao": self._em_execucao,
+            "fila": len(self._fila),
+            "max_fila": self.max_fila,
+            "latencia_media_s": round(self._latencia_media or 0.0, 3),
+            "admitidas": self._admitidas,
+            "recusadas": self._recusadas,
+            "reducoes": self._reducoes,
+        }
@@ -3,27 +3,59 @@ API para geração de Relatórios LSP-R
 VERSÃO 2.3.1 - HTML Email com primeira página completa
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
+import time
+
+# Início da importação do app (fase "importacao" da subida em /health)
+INICIO_PROCESSO = time.perf_counter()
+
+from fastapi import Body, FastAPI, File, Form, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
 from pathlib import Path
-from docx import Document
-from docx.shared import Pt
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from datetime import datetime
-import subprocess
+from typing import Any, Dict, List, Optional
+import asyncio
+import contextlib
+import copy
 import shutil
 import base64
-from PyPDF2 import PdfMerger
+import json
 import logging
+import os
 import re
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+from admissao import AdmissaoRecusada, ControleAdmissao
+from area_trabalho import AreaTrabalho, escolher_raiz
+from artefatos import ArmazemRelatorios, responder_artefato
+from cache_relatorios import CacheRelatorios, chave_relatorio
+from capa_nativa import motor_nativo_disponivel, renderizar_capa_pdf
+from compressao import CompressaoMiddleware
+from conversor import (
+    PerfisSubprocesso, PoolLibreOffice, TimeoutConversao, diretorio_do_processo,
+    limpar_perfis_orfaos, uno_disponivel
 )
+from corpos_pdf import CacheCorpos, VariantesCorpos
+from execucao import ExecutorRelatorios, ExecutorSaturado
+from fila_jobs import CONCLUIDO, PENDENTE, FilaJobs, notificar_callback
+from html_email import ModeloHtml
+from idempotencia import GERADO, ConflitoIdempotencia, Idempotencia
+from inicializacao import Inicializacao
+import logs
+import metricas
+from metricas import cronometrar
+from perfilador import Perfilador, PerfilMiddleware, perfilar, token_confere
+from pipeline import CONVERTER, JUNTAR, PREENCHER, Estagio, PipelineRelatorios
+from perfilador import anexar as anexar_perfil
+from perfilador import ativo as perfilando
+from streaming import fronteira_multipart, stream_json_base64, stream_multipart
+from templates_docx import CacheTemplates, TemplatesCompilados, normalizar_template
+
+# Configuração de logging: formato "texto" ou "json", nível e fração das requisições que
+# emitem o detalhe (DEBUG) de cada etapa
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto")
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO")
+LOG_AMOSTRAGEM = float(os.getenv("LOG_AMOSTRAGEM", "0"))
+logs.configurar(LOG_FORMATO, LOG_NIVEL, LOG_AMOSTRAGEM, detalhados=(__name__,))
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="API Relatório LSP-R", version="2.3.1")
@@ -31,10 +63,186 @@ app = FastAPI(title="API Relatório LSP-R", version="2.3.1")
 # Diretórios
 BASE_DIR = Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR / "templates"
+TEMPLATES_COMPILADOS_DIR = TEMPLATES_DIR / "compilados"
 CORPOS_PDF_DIR = BASE_DIR / "assets" / "corpos_pdf"
+LOGO_PATH = BASE_DIR / "assets" / "logo_cerebro.png"
 TEMP_DIR = BASE_DIR / "temp"
 TEMP_DIR.mkdir(exist_ok=True)
 
+
+def _env_bool(nome: str, padrao: bool) -> bool:
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+# Área de trabalho por requisição (tmpfs quando disponível) e faxineiro
+TRABALHO_MAX_IDADE_S = float(os.getenv("TRABALHO_MAX_IDADE_S", "900"))
+TRABALHO_MAX_MB = int(os.getenv("TRABALHO_MAX_MB", "256"))
+TRABALHO_INTERVALO_LIMPEZA = float(os.getenv("TRABALHO_INTERVALO_LIMPEZA", "60"))
+
+area_trabalho = AreaTrabalho(
+    escolher_raiz(os.getenv("TRABALHO_DIR"), TEMP_DIR / "trabalho"),
+    TRABALHO_MAX_IDADE_S, TRABALHO_MAX_MB * 1024 * 1024
+)
+
+# Tarefas de fundo (faxineiro, workers de jobs), canceladas no shutdown
+tarefas_fundo = []
+
+# Processos da API (workers uvicorn): "auto" = um por CPU. Os padrões de pool LibreOffice e
+# executor abaixo são por worker, dividindo as CPUs entre eles
+CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+WORKERS = CPUS if os.getenv("WORKERS", "1") == "auto" else max(1, int(os.getenv("WORKERS", "1")))
+CPUS_POR_WORKER = max(1, CPUS // WORKERS)
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "3344"))
+
+# Conversão LibreOffice
+LIBREOFFICE_BIN = os.getenv("LIBREOFFICE_BIN", "libreoffice")
+LIBREOFFICE_TIMEOUT = float(os.getenv("LIBREOFFICE_TIMEOUT", "30"))
+LIBREOFFICE_POOL_TAMANHO = int(os.getenv("LIBREOFFICE_POOL_TAMANHO", str(min(4, CPUS_POR_WORKER))))
+LIBREOFFICE_POOL_AQUECER = _env_bool("LIBREOFFICE_POOL_AQUECER", True)
+# Conversões simultâneas via subprocesso (sem pool), cada uma com perfil próprio
+LIBREOFFICE_SUBPROCESSOS = int(os.getenv("LIBREOFFICE_SUBPROCESSOS", str(CPUS_POR_WORKER)))
+LIBREOFFICE_PERFIS_DIR = TEMP_DIR / "perfis_libreoffice"
+
+# Pool de instâncias persistentes (criado no startup; None = um processo por conversão)
+pool_libreoffice = None
+# Uma vaga por instância do pool: a espera por instância livre fica no event loop,
+# fora do timeout da conversão e sem ocupar threads do to_thread
+vagas_pool = None
+# Perfis isolados do modo subprocesso (criados no startup quando não há pool)
+perfis_subprocesso = None
+
+# Executor das etapas CPU-bound (preenchimento DOCX, junção de PDFs)
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", str(min(4, CPUS_POR_WORKER))))
+EXECUTOR_MAX_FILA = int(os.getenv("EXECUTOR_MAX_FILA", "32"))
+EXECUTOR_PROCESSOS = _env_bool("EXECUTOR_PROCESSOS", True)
+
+# Templates DOCX e corpos PDF parseados uma vez por processo (carregados ao iniciar cada worker)
+TEMPLATES_PRE_CARREGAR = _env_bool("TEMPLATES_PRE_CARREGAR", True)
+# Sem todos os templates compilados válidos (compilar_templates.py), o startup falha em vez de avisar
+TEMPLATES_EXIGIR_COMPILADOS = _env_bool("TEMPLATES_EXIGIR_COMPILADOS", False)
+templates_compilados = TemplatesCompilados(TEMPLATES_DIR, TEMPLATES_COMPILADOS_DIR)
+CORPOS_PDF_PRE_CARREGAR = _env_bool("CORPOS_PDF_PRE_CARREGAR", True)
+cache_corpos = CacheCorpos()
+
+# Aquecimento (workers do executor, perfis/pool LibreOffice, conversão de teste) em segundo
+# plano, com /health em 503 até terminar; desligado, o startup só termina depois dele
+AQUECIMENTO_EM_FUNDO = _env_bool("AQUECIMENTO_EM_FUNDO", True)
+AQUECIMENTO_CONVERSAO = _env_bool("AQUECIMENTO_CONVERSAO", True)
+inicializacao = Inicializacao(INICIO_PROCESSO)
+
+# Variantes otimizadas dos corpos (otimizar_assets.py): "impressao" (sem perdas) ou "email"
+CORPOS_VARIANTES_DIR = CORPOS_PDF_DIR / "otimizados"
+QUALIDADE_CORPO = os.getenv("QUALIDADE_CORPO", "impressao")
+variantes_corpos = VariantesCorpos(CORPOS_VARIANTES_DIR)
+
+# Controle de admissão adaptativo do pipeline de PDF (/gerar-relatorio, /gerar-relatorio-completo)
+ADMISSAO_HABILITADA = _env_bool("ADMISSAO_HABILITADA", True)
+ADMISSAO_LIMITE_INICIAL = int(os.getenv(
+    "ADMISSAO_LIMITE_INICIAL", str(2 * max(1, LIBREOFFICE_POOL_TAMANHO or LIBREOFFICE_SUBPROCESSOS))
+))
+ADMISSAO_LIMITE_MAX = int(os.getenv("ADMISSAO_LIMITE_MAX", str(4 * ADMISSAO_LIMITE_INICIAL)))
+ADMISSAO_MAX_FILA = int(os.getenv("ADMISSAO_MAX_FILA", "20"))
+ADMISSAO_LATENCIA_ALVO_S = float(os.getenv("ADMISSAO_LATENCIA_ALVO_S", "5"))
+ADMISSAO_ESPERA_S = float(os.getenv("ADMISSAO_ESPERA_S", "10"))
+# Saturado, /gerar-relatorio-completo responde só o HTML (pdf_base64 nulo) em vez de 503
+ADMISSAO_DEGRADAR_HTML = _env_bool("ADMISSAO_DEGRADAR_HTML", False)
+
+admissao = ControleAdmissao(
+    ADMISSAO_LIMITE_INICIAL, 1, ADMISSAO_LIMITE_MAX, ADMISSAO_MAX_FILA,
+    ADMISSAO_LATENCIA_ALVO_S, ADMISSAO_ESPERA_S
+) if ADMISSAO_HABILITADA else None
+
+# Pipeline em estágios: vagas e fila de cada estágio, para que as etapas Python de uma
+# requisição andem enquanto outra converte (metade do executor para cada etapa Python)
+PIPELINE_PREENCHER_WORKERS = int(os.getenv("PIPELINE_PREENCHER_WORKERS", str(max(1, (EXECUTOR_WORKERS + 1) // 2))))
+PIPELINE_CONVERTER_WORKERS = int(os.getenv(
+    "PIPELINE_CONVERTER_WORKERS", str(max(1, LIBREOFFICE_POOL_TAMANHO or LIBREOFFICE_SUBPROCESSOS))
+))
+PIPELINE_JUNTAR_WORKERS = int(os.getenv("PIPELINE_JUNTAR_WORKERS", str(max(1, (EXECUTOR_WORKERS + 1) // 2))))
+PIPELINE_MAX_FILA = int(os.getenv("PIPELINE_MAX_FILA", str(EXECUTOR_MAX_FILA)))
+
+pipeline = PipelineRelatorios([
+    Estagio(PREENCHER, PIPELINE_PREENCHER_WORKERS, PIPELINE_MAX_FILA),
+    Estagio(CONVERTER, PIPELINE_CONVERTER_WORKERS, PIPELINE_MAX_FILA),
+    Estagio(JUNTAR, PIPELINE_JUNTAR_WORKERS, PIPELINE_MAX_FILA),
+])
+
+# Lote (/gerar-relatorios-lote)
+LOTE_MAX_ITENS = int(os.getenv("LOTE_MAX_ITENS", "200"))
+LOTE_CONVERSAO_MAX = int(os.getenv("LOTE_CONVERSAO_MAX", "20"))
+
+# Pontuação de respostas brutas (/pontuar, /pontuar-csv)
+PONTUACAO_MAX_RESPONDENTES = int(os.getenv("PONTUACAO_MAX_RESPONDENTES", "10000"))
+
+# Motor da capa: "docx" (template + LibreOffice) ou "nativo" (PDF direto via ReportLab)
+MOTOR_CAPA = os.getenv("MOTOR_CAPA", "docx")
+
+# Compressão (gzip/brotli) das respostas JSON e HTML
+COMPRESSAO_HABILITADA = _env_bool("COMPRESSAO_HABILITADA", True)
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", "500"))
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", "6"))
+COMPRESSAO_QUALIDADE_BROTLI = int(os.getenv("COMPRESSAO_QUALIDADE_BROTLI", "5"))
+
+if COMPRESSAO_HABILITADA:
+    app.add_middleware(
+        CompressaoMiddleware,
+        minimo_bytes=COMPRESSAO_MIN_BYTES,
+        nivel_gzip=COMPRESSAO_NIVEL_GZIP,
+        qualidade_brotli=COMPRESSAO_QUALIDADE_BROTLI
+    )
+
+# Perfilamento sob demanda (cProfile) com token de administração e/ou amostragem
+PERFILAMENTO_TOKEN = os.getenv("PERFILAMENTO_TOKEN", "")
+PERFILAMENTO_AMOSTRAGEM = float(os.getenv("PERFILAMENTO_AMOSTRAGEM", "0"))
+PERFILAMENTO_MAX = int(os.getenv("PERFILAMENTO_MAX", "50"))
+
+perfilamento = Perfilador(
+    TEMP_DIR / "perfilamento", PERFILAMENTO_MAX, PERFILAMENTO_TOKEN, PERFILAMENTO_AMOSTRAGEM,
+    caminhos=("/gerar-relatorio", "/gerar-relatorio-completo", "/gerar-html-email")
+)
+if perfilamento.habilitado:
+    app.add_middleware(PerfilMiddleware, perfilador=perfilamento)
+
+# Id por requisição nos logs e linha de resumo com o tempo das etapas (middleware mais externo)
+app.add_middleware(logs.CorrelacaoMiddleware, amostragem=LOG_AMOSTRAGEM)
+
+# Cache de capas e relatórios finais
+CACHE_HABILITADO = _env_bool("CACHE_HABILITADO", True)
+CACHE_MEMORIA_MB = int(os.getenv("CACHE_MEMORIA_MB", "64"))
+CACHE_DISCO_MB = int(os.getenv("CACHE_DISCO_MB", "1024"))
+
+cache = CacheRelatorios(
+    TEMP_DIR / "cache", CACHE_MEMORIA_MB * 1024 * 1024, CACHE_DISCO_MB * 1024 * 1024
+) if CACHE_HABILITADO else None
+
+# Jobs assíncronos (/jobs): fila SQLite compartilhável entre processos/containers
+DADOS_DIR = Path(os.getenv("DADOS_DIR", str(BASE_DIR / "dados")))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "1"))
+JOBS_RESERVA_S = float(os.getenv("JOBS_RESERVA_S", "300"))
+JOBS_MAX_TENTATIVAS = int(os.getenv("JOBS_MAX_TENTATIVAS", "3"))
+JOBS_RETENCAO_HORAS = float(os.getenv("JOBS_RETENCAO_HORAS", "24"))
+JOBS_INTERVALO = float(os.getenv("JOBS_INTERVALO", "1"))
+
+fila_jobs = FilaJobs(DADOS_DIR / "jobs.db", DADOS_DIR / "jobs", JOBS_RESERVA_S, JOBS_MAX_TENTATIVAS)
+
+# Armazém de relatórios com URL de download estável (/relatorios/{id})
+RELATORIOS_RETENCAO_HORAS = float(os.getenv("RELATORIOS_RETENCAO_HORAS", "72"))
+RELATORIOS_MAX_MB = int(os.getenv("RELATORIOS_MAX_MB", "2048"))
+
+armazem = ArmazemRelatorios(
+    DADOS_DIR / "relatorios.db", DADOS_DIR / "relatorios",
+    RELATORIOS_RETENCAO_HORAS * 3600, RELATORIOS_MAX_MB * 1024 * 1024
+)
+
+# Idempotência: requisições iguais simultâneas compartilham a geração, e o PDF pronto é
+# repetido do cache durante a janela (Idempotency-Key opcional)
+IDEMPOTENCIA_JANELA_S = float(os.getenv("IDEMPOTENCIA_JANELA_S", "600"))
+idempotencia = Idempotencia(DADOS_DIR / "idempotencia", IDEMPOTENCIA_JANELA_S, cache)
+
 ARQUIVOS_VALIDOS = [
     'relatório_mais_ação_menos_mensagem',
     'relatório_mais_ação_menos_pessoas',
@@ -57,6 +265,9 @@ NOMES_ESTILOS = {
     "MENSAGEM": "Mensagem (Conteúdo / Analítico)"
 }
 
+# Ordem das linhas na tabela de pontuações
+ORDEM_TABELA = ("PESSOAS", "ACAO", "TEMPO", "MENSAGEM")
+
 NOMES_ESTILOS_LONGOS = {
     "PESSOAS": "Orientado para Pessoas (Relacional)",
     "ACAO": "Orientado para Ação (Processo)",
@@ -64,6 +275,20 @@ NOMES_ESTILOS_LONGOS = {
     "MENSAGEM": "Orientado para Mensagem (Conteúdo / Analítico)"
 }
 
+DESCRICOES_ESTILOS = [
+    ("Orientado para Pessoas (Relacional)",
+     "valoriza o vínculo e empatia. Escuta com atenção às emoções e constrói confiança pela proximidade."),
+    ("Orientado para Ação (Processo)",
+     "prefere conversas diretas, voltadas à solução e ao resultado. Gosta de foco e clareza, mas pode soar apressado."),
+    ("Orientado para o Tempo (Solução imediata)",
+     "preza pela objetividade e gosta de ritmo na conversa. Evita desvios e busca eficiência."),
+    ("Orientado para Mensagem (Conteúdo / Analítico)",
+     "escuta para compreender o sentido exato do que está sendo dito. Avalia argumentos, identifica contradições e busca precisão na comunicação.")
+]
+
+# HTML do email: modelo compilado uma única vez, só os campos são renderizados por chamada
+modelo_email = ModeloHtml.de_arquivo(TEMPLATES_DIR / "email_capa.html")
+
 class Pontuacoes(BaseModel):
     PESSOAS: int = Field(..., ge=0, le=60)
     ACAO: int = Field(..., ge=0, le=60)
@@ -76,10 +301,24 @@ class RelatorioRequest(BaseModel):
     predominante: str = Field(..., pattern="^(PESSOAS|ACAO|TEMPO|MENSAGEM)$")
     menosDesenvolvido: str = Field(..., pattern="^(PESSOAS|ACAO|TEMPO|MENSAGEM)$")
     arquivo: str
+    motor: Optional[str] = Field(None, pattern="^(docx|nativo)$")
+    qualidade: Optional[str] = Field(None, pattern="^(email|impressao)$")
+
+class JobRequest(RelatorioRequest):
+    callback_url: Optional[str] = Field(None, pattern="^https?://")
+
+class PontuacaoRequest(BaseModel):
+    respondentes: List[Dict[str, Any]]
+    gerar: bool = False
+    motor: Optional[str] = Field(None, pattern="^(docx|nativo)$")
+    callback_url: Optional[str] = Field(None, pattern="^https?://")
 
 
 def remover_bordas_tabela(tabela):
     """Remove todas as bordas de uma tabela"""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
     for row in tabela.rows:
         for cell in row.cells:
             tcPr = cell._element.get_or_add_tcPr()
@@ -91,10 +330,11 @@ def remover_bordas_tabela(tabela):
             tcPr.append(tcBorders)
 
 
-def criar_tabela_pontuacoes(doc, dados: RelatorioRequest):
-    """Cria tabela DOCX real com bordas invisíveis"""
-    logger.info("→ Criando tabela de pontuações...")
-    
+def criar_modelo_tabela(doc):
+    """Tabela DOCX real com bordas invisíveis e pontuações zeradas, fora do corpo do documento
+
+    Montada uma vez por template (no índice); cada capa só copia e preenche as pontuações.
+    """
     # Criar tabela: 5 linhas (cabeçalho + 4 dados), 2 colunas
     tabela = doc.add_table(rows=5, cols=2)
     
@@ -110,24 +350,16 @@ def criar_tabela_pontuacoes(doc, dados: RelatorioRequest):
     cabecalho_cells[1].paragraphs[0].alignment = 1  # CENTER
     
     # DADOS (ordem correta)
-    dados_tabela = [
-        (NOMES_ESTILOS["PESSOAS"], str(dados.pontuacoes.PESSOAS)),
-        (NOMES_ESTILOS["ACAO"], str(dados.pontuacoes.ACAO)),
-        (NOMES_ESTILOS["TEMPO"], str(dados.pontuacoes.TEMPO)),
-        (NOMES_ESTILOS["MENSAGEM"], str(dados.pontuacoes.MENSAGEM))
-    ]
-    
-    for i, (nome, pontuacao) in enumerate(dados_tabela, start=1):
+    for i, estilo in enumerate(ORDEM_TABELA, start=1):
         row = tabela.rows[i]
-        row.cells[0].text = nome
-        row.cells[1].text = pontuacao
+        row.cells[0].text = NOMES_ESTILOS[estilo]
+        row.cells[1].text = "0"
         
         # Alinhar número ao CENTRO
         row.cells[1].paragraphs[0].alignment = 1  # CENTER
-        
-        logger.info(f"  ✓ Linha {i}: {nome} = {pontuacao}")
     
     # Aplicar fonte DejaVu Sans em toda tabela
+    from docx.shared import Pt
     for row in tabela.rows:
         for cell in row.cells:
             for paragraph in cell.paragraphs:
@@ -135,108 +367,128 @@ def criar_tabela_pontuacoes(doc, dados: RelatorioRequest):
                     run.font.name = 'DejaVu Sans'
                     run.font.size = Pt(12)
     
-    logger.info("✓ Tabela criada com sucesso")
+    elemento = tabela._element
+    elemento.getparent().remove(elemento)
+    return elemento
+
+
+def criar_tabela_pontuacoes(doc, modelo, dados: RelatorioRequest):
+    """Cópia do modelo da tabela com as pontuações do participante"""
+    from docx.table import Table
+
+    tabela = Table(copy.deepcopy(modelo), doc._body)
+    for i, estilo in enumerate(ORDEM_TABELA, start=1):
+        pontuacao = str(getattr(dados.pontuacoes, estilo))
+        tabela.rows[i].cells[1].paragraphs[0].runs[0].text = pontuacao
+        logger.debug("  ✓ Linha %d: %s = %s", i, NOMES_ESTILOS[estilo], pontuacao)
+    
     return tabela
 
 
+def indexar_template(doc) -> dict:
+    """Localiza os parágrafos e runs que recebem os dados do participante"""
+    indice = {
+        "nome": [],
+        "tabela": None,
+        "remover": [],
+        "predominante": [],
+        "menos_desenvolvido": []
+    }
+    
+    for i, para in enumerate(doc.paragraphs):
+        texto = para.text
+        
+        # Runs com o nome
+        if "Nome completo" in texto:
+            runs = [j for j, run in enumerate(para.runs) if "Nome completo" in run.text]
+            indice["nome"].append((i, runs))
+        
+        # Cabeçalho da tabela
+        if "Estilo de escuta" in texto and "Pontuação" in texto:
+            indice["tabela"] = i
+            indice["remover"].append(i)
+            continue
+        
+        # 4 linhas seguintes da tabela antiga
+        if indice["tabela"] is not None and 1 <= i - indice["tabela"] <= 4:
+            if any(estilo_nome in texto for estilo_nome in NOMES_ESTILOS.values()):
+                indice["remover"].append(i)
+        
+        if "Estilo predominante:" in texto:
+            indice["predominante"].append(i)
+        
+        if "Estilo menos desenvolvido:" in texto:
+            indice["menos_desenvolvido"].append(i)
+    
+    if indice["tabela"] is not None:
+        indice["modelo_tabela"] = criar_modelo_tabela(doc)
+    
+    return indice
+
+
+cache_templates = CacheTemplates(indexar_template, normalizar_template, TEMPLATES_COMPILADOS_DIR)
+
+
+def substituir_linha_estilo(para, rotulo: str, estilo: str):
+    """Reescreve a linha "<rótulo> <estilo>" no primeiro run do parágrafo"""
+    novo_texto = re.sub(
+        r'(' + re.escape(rotulo) + r'\s*)(.+)',
+        r'\1' + estilo,
+        "".join(run.text for run in para.runs)
+    )
+    for run in para.runs:
+        run.text = ""
+    if para.runs:
+        para.runs[0].text = novo_texto
+
+
 def substituir_campos_docx(doc_path: Path, dados: RelatorioRequest, output_path: Path):
     """Substitui campos e cria tabela"""
     try:
-        logger.info("="*60)
-        logger.info(f"PROCESSANDO: {doc_path.name}")
-        logger.info(f"Participante: {dados.participante}")
-        logger.info("="*60)
+        logger.debug("→ Preenchendo %s (participante: %s)", doc_path.name, dados.participante)
         
-        doc = Document(doc_path)
-        logger.info(f"✓ Documento carregado: {len(doc.paragraphs)} parágrafos")
+        # Template já parseado, normalizado (DejaVu Sans 12pt) e indexado
+        template = cache_templates.obter(doc_path)
+        indice = template.indice
+        doc = template.novo_documento()
+        paragrafos = doc.paragraphs
+        logger.debug("✓ Documento carregado: %d parágrafos", len(paragrafos))
         
-        paragrafos_para_remover = []
-        paragrafo_tabela_idx = None
+        # 1. SUBSTITUIR NOME e LINHAS DE ESTILO
+        for i, runs in indice["nome"]:
+            para_runs = paragrafos[i].runs
+            for j in runs:
+                para_runs[j].text = para_runs[j].text.replace("Nome completo", dados.participante)
+            logger.debug("✓ Nome substituído")
         
-        # 1. SUBSTITUIR NOME e MARCAR LINHAS DA TABELA para remoção
-        for i, para in enumerate(doc.paragraphs):
-            texto = para.text
-            
-            # Substituir nome
-            if "Nome completo" in texto:
-                for run in para.runs:
-                    if "Nome completo" in run.text:
-                        run.text = run.text.replace("Nome completo", dados.participante)
-                        logger.info(f"✓ Nome substituído: {dados.participante}")
-            
-            # Identificar cabeçalho da tabela
-            if "Estilo de escuta" in texto and "Pontuação" in texto:
-                logger.info(f"✓ Encontrado cabeçalho da tabela (parágrafo {i})")
-                paragrafo_tabela_idx = i
-                paragrafos_para_remover.append(i)
-                continue
-            
-            # Marcar 4 linhas seguintes para remoção
-            if paragrafo_tabela_idx is not None:
-                offset = i - paragrafo_tabela_idx
-                if 1 <= offset <= 4:
-                    for estilo_nome in NOMES_ESTILOS.values():
-                        if estilo_nome in texto:
-                            logger.info(f"✓ Marcado para remoção: linha {i}")
-                            paragrafos_para_remover.append(i)
-                            break
-            
-            # Substituir predominante/menos desenvolvido
-            if "Estilo predominante:" in texto:
-                novo_texto = re.sub(
-                    r'(Estilo predominante:\s*)(.+)',
-                    r'\1' + NOMES_ESTILOS_LONGOS[dados.predominante],
-                    "".join(run.text for run in para.runs)
-                )
-                for run in para.runs:
-                    run.text = ""
-                if para.runs:
-                    para.runs[0].text = novo_texto
-                logger.info("✓ Predominante substituído")
-            
-            if "Estilo menos desenvolvido:" in texto:
-                novo_texto = re.sub(
-                    r'(Estilo menos desenvolvido:\s*)(.+)',
-                    r'\1' + NOMES_ESTILOS_LONGOS[dados.menosDesenvolvido],
-                    "".join(run.text for run in para.runs)
-                )
-                for run in para.runs:
-                    run.text = ""
-                if para.runs:
-                    para.runs[0].text = novo_texto
-                logger.info("✓ Menos desenvolvido substituído")
+        for i in indice["predominante"]:
+            substituir_linha_estilo(paragrafos[i], "Estilo predominante:", NOMES_ESTILOS_LONGOS[dados.predominante])
+            logger.debug("✓ Predominante substituído")
+        
+        for i in indice["menos_desenvolvido"]:
+            substituir_linha_estilo(paragrafos[i], "Estilo menos desenvolvido:", NOMES_ESTILOS_LONGOS[dados.menosDesenvolvido])
+            logger.debug("✓ Menos desenvolvido substituído")
         
         # 2. REMOVER PARÁGRAFOS DA TABELA ANTIGA
-        logger.info(f"→ Removendo {len(paragrafos_para_remover)} parágrafos...")
-        for idx in sorted(paragrafos_para_remover, reverse=True):
-            p = doc.paragraphs[idx]._element
+        logger.debug("→ Removendo %d parágrafos", len(indice["remover"]))
+        for idx in sorted(indice["remover"], reverse=True):
+            p = paragrafos[idx]._element
             p.getparent().remove(p)
         
         # 3. INSERIR TABELA DOCX REAL
-        if paragrafo_tabela_idx is not None:
-            logger.info("→ Inserindo tabela DOCX...")
-            
+        if indice["tabela"] is not None:
             # Criar tabela
-            tabela = criar_tabela_pontuacoes(doc, dados)
+            tabela = criar_tabela_pontuacoes(doc, indice["modelo_tabela"], dados)
             
             # Inserir no documento (antes do próximo parágrafo)
-            para_ref = doc.paragraphs[max(0, paragrafo_tabela_idx - 1)]._element
+            para_ref = paragrafos[max(0, indice["tabela"] - 1)]._element
             para_ref.addnext(tabela._element)
             
-            logger.info("✓ Tabela inserida")
-        
-        # 4. APLICAR DEJAVU SANS em todo documento
-        logger.info("→ Aplicando DejaVu Sans 12pt...")
-        for para in doc.paragraphs:
-            for run in para.runs:
-                run.font.name = 'DejaVu Sans'
-                run.font.size = Pt(12)
-                run.font.highlight_color = None
+            logger.debug("✓ Tabela inserida")
         
         # Salvar
-        doc.save(output_path)
-        logger.info(f"✓ Documento salvo: {output_path.name}")
-        logger.info("="*60)
+        template.salvar(doc, output_path)
+        logger.debug("✓ Documento salvo: %s", output_path.name)
         
         return True
         
@@ -245,30 +497,72 @@ def substituir_campos_docx(doc_path: Path, dados: RelatorioRequest, output_path:
         raise
 
 
-def converter_docx_para_pdf(docx_path: Path, pdf_path: Path):
-    """Converte DOCX para PDF usando LibreOffice"""
-    try:
-        logger.info(f"→ Convertendo para PDF...")
-        
+async def executar_libreoffice(docx_paths, outdir: Path, timeout: float):
+    """Roda um único processo LibreOffice convertendo um ou mais DOCX para outdir
+    
+    Depois do startup, cada processo usa um perfil isolado emprestado de perfis_subprocesso.
+    """
+    emprestimo = perfis_subprocesso.emprestar() if perfis_subprocesso is not None else contextlib.nullcontext()
+    async with emprestimo as perfil_uri:
         comando = [
-            "libreoffice",
+            LIBREOFFICE_BIN,
+            *([f"-env:UserInstallation={perfil_uri}"] if perfil_uri else []),
             "--headless",
             "--convert-to", "pdf",
-            "--outdir", str(pdf_path.parent),
-            str(docx_path)
+            "--outdir", str(outdir),
+            *[str(docx_path) for docx_path in docx_paths]
         ]
         
-        result = subprocess.run(comando, capture_output=True, text=True, timeout=30)
+        processo = await asyncio.create_subprocess_exec(
+            *comando,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(processo.communicate(), timeout)
+        except asyncio.TimeoutError:
+            processo.kill()
+            await processo.wait()
+            metricas.LIBREOFFICE.inc("subprocesso", "timeout")
+            raise Exception(f"Conversão excedeu o timeout de {timeout}s")
+    
+    metricas.LIBREOFFICE.inc("subprocesso", str(processo.returncode))
+    if processo.returncode != 0:
+        raise Exception(f"Conversão falhou: {stderr.decode(errors='replace')}")
+
+
+async def converter_no_pool(docx_path: Path, pdf_path: Path):
+    """Converte em uma instância do pool, contando o resultado nas métricas"""
+    try:
+        async with vagas_pool:
+            await asyncio.to_thread(pool_libreoffice.converter, docx_path, pdf_path)
+    except TimeoutConversao:
+        metricas.LIBREOFFICE.inc("pool", "timeout")
+        raise
+    except Exception:
+        metricas.LIBREOFFICE.inc("pool", "erro")
+        raise
+    metricas.LIBREOFFICE.inc("pool", "0")
+
+
+async def converter_docx_para_pdf(docx_path: Path, pdf_path: Path):
+    """Converte DOCX para PDF usando LibreOffice"""
+    try:
+        logger.debug("→ Convertendo para PDF")
+        
+        if pool_libreoffice is not None:
+            await converter_no_pool(docx_path, pdf_path)
+            logger.debug("✓ PDF gerado: %s", pdf_path.name)
+            return True
         
-        if result.returncode != 0:
-            raise Exception(f"Conversão falhou: {result.stderr}")
+        await executar_libreoffice([docx_path], pdf_path.parent, LIBREOFFICE_TIMEOUT)
         
         # Renomear se necessário
         arquivo_gerado = pdf_path.parent / f"{docx_path.stem}.pdf"
         if arquivo_gerado != pdf_path and arquivo_gerado.exists():
             shutil.move(str(arquivo_gerado), str(pdf_path))
         
-        logger.info(f"✓ PDF gerado: {pdf_path.name}")
+        logger.debug("✓ PDF gerado: %s", pdf_path.name)
         return True
         
     except Exception as e:
@@ -276,18 +570,61 @@ def converter_docx_para_pdf(docx_path: Path, pdf_path: Path):
         raise
 
 
+async def converter_lote_docx_para_pdf(docx_paths, outdir: Path) -> dict:
+    """Converte vários DOCX para outdir/<nome>.pdf com o mínimo de processos LibreOffice
+    
+    Retorna {docx_path: erro ou None}. Sem pool, cada chamada ao LibreOffice recebe
+    até LOTE_CONVERSAO_MAX arquivos.
+    """
+    logger.debug("→ Convertendo lote de %d capas", len(docx_paths))
+    erros = {}
+    
+    if pool_libreoffice is not None:
+        resultados = await asyncio.gather(
+            *(converter_no_pool(d, outdir / f"{d.stem}.pdf") for d in docx_paths),
+            return_exceptions=True
+        )
+        erros = {d: r for d, r in zip(docx_paths, resultados) if isinstance(r, Exception)}
+    else:
+        # Grupos em paralelo, limitados pelos perfis de subprocesso livres
+        grupos = [docx_paths[i:i + LOTE_CONVERSAO_MAX] for i in range(0, len(docx_paths), LOTE_CONVERSAO_MAX)]
+        resultados = await asyncio.gather(
+            *(executar_libreoffice(grupo, outdir, LIBREOFFICE_TIMEOUT * len(grupo)) for grupo in grupos),
+            return_exceptions=True
+        )
+        for grupo, r in zip(grupos, resultados):
+            if isinstance(r, Exception):
+                logger.error(f"✗ Erro na conversão do lote: {r}")
+                erros.update({d: r for d in grupo})
+    
+    resultado = {}
+    for docx_path in docx_paths:
+        if docx_path in erros:
+            resultado[docx_path] = erros[docx_path]
+        elif not (outdir / f"{docx_path.stem}.pdf").exists():
+            resultado[docx_path] = Exception("Conversão não gerou o PDF")
+        else:
+            resultado[docx_path] = None
+    
+    logger.info("✓ Lote convertido: %d/%d", sum(1 for e in resultado.values() if e is None), len(docx_paths))
+    return resultado
+
+
 def juntar_pdfs(capa_pdf: Path, corpo_pdf: Path, output_pdf: Path):
     """Junta capa e corpo em um PDF final"""
     try:
-        logger.info("→ Juntando PDFs...")
+        logger.debug("→ Juntando PDFs")
+        from PyPDF2 import PdfReader, PdfWriter
+        
+        writer = PdfWriter()
+        for pagina in PdfReader(str(capa_pdf)).pages:
+            writer.add_page(pagina)
+        cache_corpos.obter(corpo_pdf).anexar(writer)
         
-        merger = PdfMerger()
-        merger.append(str(capa_pdf))
-        merger.append(str(corpo_pdf))
-        merger.write(str(output_pdf))
-        merger.close()
+        with open(output_pdf, "wb") as f:
+            writer.write(f)
         
-        logger.info(f"✓ PDF completo: {output_pdf.name}")
+        logger.debug("✓ PDF completo: %s", output_pdf.name)
         return True
         
     except Exception as e:
@@ -295,217 +632,523 @@ def juntar_pdfs(capa_pdf: Path, corpo_pdf: Path, output_pdf: Path):
         raise
 
 
-def gerar_html_capa(dados: RelatorioRequest) -> str:
-    """Gera HTML com formatação IDÊNTICA ao documento Word"""
-    dados_tabela = [
-        ("Pessoas (Relacional)", dados.pontuacoes.PESSOAS),
-        ("Ação (Processo)", dados.pontuacoes.ACAO),
-        ("Tempo (Solução imediata)", dados.pontuacoes.TEMPO),
-        ("Mensagem (Conteúdo / Analítico)", dados.pontuacoes.MENSAGEM)
+def inicializar_worker():
+    """Carrega templates e corpos PDF no cache do processo (inicializador dos workers)"""
+    if TEMPLATES_PRE_CARREGAR:
+        cache_templates.pre_carregar(templates_compilados.resolver(arquivo) for arquivo in ARQUIVOS_VALIDOS)
+    if CORPOS_PDF_PRE_CARREGAR:
+        corpos = [CORPOS_PDF_DIR / f"{arquivo}.pdf" for arquivo in ARQUIVOS_VALIDOS]
+        cache_corpos.pre_carregar(variantes_corpos.resolver(corpo, QUALIDADE_CORPO) for corpo in corpos)
+
+
+executor = ExecutorRelatorios(
+    EXECUTOR_WORKERS, EXECUTOR_MAX_FILA, EXECUTOR_PROCESSOS,
+    inicializador=inicializar_worker
+)
+
+
+async def executar_etapa(etapa: str, func, *args):
+    """Executa func no executor, registrando o tempo gasto dentro do worker"""
+    if perfilando():
+        # cProfile dentro do worker; as estatísticas voltam para o perfil da requisição
+        duracao, (resultado, estatisticas) = await executor.executar(
+            cronometrar, logs.com_contexto, logs.contexto(), perfilar, func, *args
+        )
+        anexar_perfil(estatisticas)
+    else:
+        duracao, resultado = await executor.executar(cronometrar, logs.com_contexto, logs.contexto(), func, *args)
+    metricas.ETAPAS.observar(duracao, etapa)
+    logs.registrar_etapa(etapa, duracao)
+    return resultado
+
+
+def gerar_capa_nativa(dados: RelatorioRequest, output_path: Path):
+    """Gera a capa em PDF sem passar por DOCX/LibreOffice"""
+    logger.debug("→ Gerando capa nativa")
+    
+    linhas_tabela = [
+        (NOMES_ESTILOS[estilo], getattr(dados.pontuacoes, estilo))
+        for estilo in ORDEM_TABELA
     ]
+    renderizar_capa_pdf(
+        output_path,
+        dados.participante,
+        linhas_tabela,
+        NOMES_ESTILOS_LONGOS[dados.predominante],
+        NOMES_ESTILOS_LONGOS[dados.menosDesenvolvido],
+        DESCRICOES_ESTILOS,
+        LOGO_PATH
+    )
+    
+    logger.debug("✓ Capa nativa gerada: %s", output_path.name)
+    return True
+
+
+def resolver_motor(dados: RelatorioRequest) -> str:
+    """Motor da capa para a requisição (campo `motor` ou MOTOR_CAPA)"""
+    motor = dados.motor or MOTOR_CAPA
+    if motor == "nativo" and not motor_nativo_disponivel():
+        if dados.motor == "nativo":
+            raise HTTPException(400, "Motor nativo indisponível (ReportLab ou DejaVu Sans ausentes)")
+        return "docx"
+    return motor
+
+
+def ler_pdf_base64(pdf_path: Path) -> str:
+    """Lê o PDF e retorna seu conteúdo em base64"""
+    with open(pdf_path, 'rb') as f:
+        return base64.b64encode(f.read()).decode('utf-8')
+
+
+def campos_chave(dados: RelatorioRequest, motor: str) -> dict:
+    # A qualidade já entra na chave final pelo checksum do corpo escolhido
+    campos = dados.model_dump(exclude={"qualidade"})
+    campos["motor"] = motor
+    return campos
+
+
+async def chaves_cache(dados: RelatorioRequest, motor: str, template_docx: Path, corpo_pdf: Path):
+    """Chaves (final, capa) da requisição no cache; (None, None) com cache desabilitado ou perfilando"""
+    if cache is None or perfilando():
+        return None, None
+    campos = campos_chave(dados, motor)
+    chave_final = await asyncio.to_thread(chave_relatorio, "final", campos, template_docx, corpo_pdf)
+    chave_capa = await asyncio.to_thread(chave_relatorio, "capa", campos, template_docx)
+    return chave_final, chave_capa
+
+
+async def restaurar_do_cache(chave, destino: Path) -> bool:
+    if chave is None:
+        return False
+    return await asyncio.to_thread(cache.restaurar, chave, destino)
+
+
+async def guardar_no_cache(chave, origem: Path):
+    if chave is not None:
+        await asyncio.to_thread(cache.guardar, chave, origem)
+
+
+async def finalizar_relatorio(temp_pdf: Path, corpo_pdf: Path, temp_final: Path, chave_final):
+    """Junta capa e corpo e guarda o resultado no cache"""
+    await executar_etapa("juntar_pdfs", juntar_pdfs, temp_pdf, corpo_pdf, temp_final)
+    await guardar_no_cache(chave_final, temp_final)
+
+
+def carregar_corpo(corpo_pdf: Path):
+    cache_corpos.obter(corpo_pdf)
+
+
+async def precarregar_corpo(dados: RelatorioRequest, corpo_pdf: Path):
+    """Parseia o corpo no executor enquanto a capa converte
+
+    Só quando o inicializador dos workers não o carregou: pré-carga desligada ou
+    qualidade diferente da padrão. Falhas ficam para a junção, que carrega de novo.
+    """
+    if CORPOS_PDF_PRE_CARREGAR and (dados.qualidade or QUALIDADE_CORPO) == QUALIDADE_CORPO:
+        return
+    try:
+        await executar_etapa("carregar_corpo", carregar_corpo, corpo_pdf)
+    except Exception as e:
+        logger.debug("Pré-carga do corpo ignorada: %s", e)
+
+
+async def impressao_requisicao(dados: RelatorioRequest, template_docx: Path, corpo_pdf: Path,
+                               chave_idempotencia: Optional[str] = None) -> str:
+    """Impressão digital da requisição, ligada à Idempotency-Key se houver
+
+    É a chave do relatório final no cache, de onde a idempotência repete o PDF.
+    """
+    campos = campos_chave(dados, resolver_motor(dados))
+    impressao = await asyncio.to_thread(chave_relatorio, "final", campos, template_docx, corpo_pdf)
+    if chave_idempotencia:
+        await asyncio.to_thread(idempotencia.vincular, chave_idempotencia, impressao)
+    return impressao
+
+
+def cabecalhos_idempotencia(origem: str) -> dict:
+    return {} if origem == GERADO else {"Idempotent-Replayed": "true"}
+
+
+async def gerar_pdf_relatorio(dados: RelatorioRequest, template_docx: Path, corpo_pdf: Path,
+                              temp_docx: Path, temp_pdf: Path, temp_final: Path, admitir: bool = False,
+                              chave_idempotencia: Optional[str] = None) -> str:
+    """Executa o pipeline DOCX → PDF → junção fora do event loop
+    
+    Requisições iguais em andamento compartilham uma única geração e resultados recentes
+    são repetidos; retorna a origem do PDF (gerado, aguardado ou repetido). Com `admitir`,
+    a geração (não o cache) passa pelo controle de admissão e pode levantar AdmissaoRecusada.
+    
+    Cada etapa ocupa só a vaga do seu estágio do pipeline (preencher, converter, juntar);
+    o corpo é pré-carregado enquanto a capa converte.
+    """
+    motor = resolver_motor(dados)
+    impressao = await impressao_requisicao(dados, template_docx, corpo_pdf, chave_idempotencia)
+    
+    async def gerar():
+        chave_final, chave_capa = await chaves_cache(dados, motor, template_docx, corpo_pdf)
+        
+        if await restaurar_do_cache(chave_final, temp_final):
+            logger.debug("✓ Relatório servido do cache")
+            logs.anotar("cache", "final")
+            return
+        
+        controle = admissao.admitir() if admitir and admissao is not None else contextlib.nullcontext()
+        async with controle:
+            precarga = None
+            try:
+                if not await restaurar_do_cache(chave_capa, temp_pdf):
+                    if motor == "nativo":
+                        async with pipeline.vaga(PREENCHER):
+                            await executar_etapa("capa_nativa", gerar_capa_nativa, dados, temp_pdf)
+                    else:
+                        async with pipeline.vaga(PREENCHER):
+                            await executar_etapa("preencher_docx", substituir_campos_docx, template_docx, dados, temp_docx)
+                        precarga = asyncio.create_task(precarregar_corpo(dados, corpo_pdf))
+                        async with pipeline.vaga(CONVERTER):
+                            with metricas.medir("converter_pdf"):
+                                await converter_docx_para_pdf(temp_docx, temp_pdf)
+                    await guardar_no_cache(chave_capa, temp_pdf)
+                
+                if precarga is not None:
+                    await precarga
+                async with pipeline.vaga(JUNTAR):
+                    await finalizar_relatorio(temp_pdf, corpo_pdf, temp_final, chave_final)
+            finally:
+                if precarga is not None and not precarga.done():
+                    precarga.cancel()
+    
+    if perfilando():
+        await gerar()
+        origem = GERADO
+    else:
+        origem = await idempotencia.executar(impressao, temp_final, gerar)
+    logs.anotar("origem", origem)
+    metricas.SAIDA_BYTES.observar(temp_final.stat().st_size, "pdf")
+    return origem
+
+
+async def com_html_capa(dados: RelatorioRequest, geracao):
+    """Aguarda a corrotina `geracao` renderizando o HTML da capa enquanto ela roda
+
+    Retorna (resultado da geração, html).
+    """
+    tarefa = asyncio.ensure_future(geracao)
+    try:
+        # Deixa a geração chegar à primeira espera (executor, LibreOffice) antes do HTML
+        await asyncio.sleep(0)
+        html = gerar_html_capa(dados)
+        return await tarefa, html
+    except BaseException:
+        tarefa.cancel()
+        raise
+
+
+def rotulo_arquivo(arquivo: str) -> str:
+    """Valor do rótulo `arquivo` nas métricas (limitado aos 12 templates)"""
+    return arquivo if arquivo in ARQUIVOS_VALIDOS else "invalido"
+
+
+def corpo_da_requisicao(dados: RelatorioRequest, corpo_pdf: Path) -> Path:
+    """Variante do corpo na qualidade pedida (ou a padrão); o original se não houver"""
+    return variantes_corpos.resolver(corpo_pdf, dados.qualidade or QUALIDADE_CORPO)
+
+
+def validar_requisicao(dados: RelatorioRequest):
+    """Valida a requisição e retorna (template_docx, corpo_pdf); levanta HTTPException"""
+    if dados.predominante == dados.menosDesenvolvido:
+        raise HTTPException(400, "Predominante e menos desenvolvido não podem ser iguais")
+    
+    if dados.arquivo not in ARQUIVOS_VALIDOS:
+        raise HTTPException(400, f"Arquivo inválido: {dados.arquivo}")
     
-    predominante = NOMES_ESTILOS_LONGOS[dados.predominante]
-    menos_desenvolvido = NOMES_ESTILOS_LONGOS[dados.menosDesenvolvido]
-    
-    html = f"""<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: Aptos, Calibri, 'Segoe UI', Arial, sans-serif;
-            font-size: 12pt;
-            line-height: 1.15;
-            color: #000000;
-            background-color: #ffffff;
-            padding: 40px 60px;
-            max-width: 800px;
-            margin: 0 auto;
-        }}
-        
-        .logo-container {{
-            text-align: center;
-            margin-bottom: 20px;
-        }}
-        
-        .logo {{
-            width: 80px;
-            height: auto;
-        }}
-        
-        h1 {{
-            font-size: 14pt;
-            font-weight: bold;
-            text-align: center;
-            margin: 20px 0 30px 0;
-            color: #000000;
-        }}
-        
-        .participante {{
-            font-size: 12pt;
-            margin-bottom: 25px;
-            line-height: 1.15;
-        }}
-        
-        .participante strong {{
-            font-weight: bold;
-        }}
-        
-        h2 {{
-            font-size: 12pt;
-            font-weight: bold;
-            margin: 25px 0 15px 0;
-            color: #000000;
-        }}
-        
-        /* TABELA SIMPLES SEM BORDAS - Alinhamento perfeito */
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 15px 0 25px 0;
-            border: none;
-        }}
-        
-        table td {{
-            padding: 2px 0;
-            border: none;
-            font-size: 12pt;
-            line-height: 1.15;
-        }}
-        
-        table td:first-child {{
-            text-align: left;
-            padding-right: 20px;
-        }}
-        
-        table td:last-child {{
-            text-align: center;
-            width: 100px;
-        }}
-        
-        table tr.cabecalho td {{
-            font-weight: bold;
-            padding-bottom: 5px;
-        }}
-        
-        .destaque-box {{
-            margin: 20px 0;
-        }}
-        
-        .destaque-box p {{
-            margin: 8px 0;
-            line-height: 1.15;
-        }}
-        
-        .destaque-box strong {{
-            font-weight: bold;
-        }}
-        
-        h3 {{
-            font-size: 12pt;
-            font-weight: bold;
-            margin: 25px 0 12px 0;
-            color: #000000;
-        }}
-        
-        .descricao-paragrafo {{
-            margin: 12px 0;
-            text-indent: 0;
-            line-height: 1.15;
-        }}
-        
-        .descricao-paragrafo strong {{
-            font-weight: bold;
-        }}
-        
-        .footer-text {{
-            margin-top: 25px;
-            text-align: left;
-            font-style: italic;
-            line-height: 1.15;
-        }}
-        
-        @media print {{
-            body {{
-                padding: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="logo-container">
-        <svg class="logo" width="80" height="80" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg">
-            <circle cx="50" cy="50" r="45" fill="#4A90E2" opacity="0.2"/>
-            <circle cx="30" cy="35" r="8" fill="#4A90E2"/>
-            <circle cx="70" cy="35" r="8" fill="#4A90E2"/>
-            <circle cx="50" cy="50" r="8" fill="#4A90E2"/>
-            <circle cx="35" cy="60" r="6" fill="#4A90E2"/>
-            <circle cx="65" cy="60" r="6" fill="#4A90E2"/>
-            <circle cx="45" cy="70" r="5" fill="#4A90E2"/>
-            <circle cx="55" cy="70" r="5" fill="#4A90E2"/>
-            <path d="M30 35 L50 50 M70 35 L50 50 M50 50 L35 60 M50 50 L65 60 M35 60 L45 70 M65 60 L55 70" 
-                  stroke="#4A90E2" stroke-width="2" fill="none"/>
-        </svg>
-    </div>
-
-    <h1>Relatório de Perfil de Escuta e Comunicação</h1>
-    
-    <p class="participante"><strong>Participante:</strong> {dados.participante}</p>
-    
-    <h2>Resultado geral</h2>
-    
-    <table>
-        <tr class="cabecalho">
-            <td>Estilo de escuta</td>
-            <td>Pontuação</td>
-        </tr>"""
-    
-    for nome, pont in dados_tabela:
-        html += f"""
-        <tr>
-            <td>{nome}</td>
-            <td>{pont}</td>
-        </tr>"""
-    
-    html += f"""
-    </table>
-    
-    <div class="destaque-box">
-        <p><strong>Estilo predominante:</strong> {predominante}</p>
-        <p><strong>Estilo menos desenvolvido:</strong> {menos_desenvolvido}</p>
-    </div>
-    
-    <h3>Descrição geral dos 4 estilos:</h3>
-    
-    <p class="descricao-paragrafo">
-        <strong>Orientado para Pessoas (Relacional):</strong> valoriza o vínculo e empatia. Escuta com atenção às emoções e constrói confiança pela proximidade.
-    </p>
-    
-    <p class="descricao-paragrafo">
-        <strong>Orientado para Ação (Processo):</strong> prefere conversas diretas, voltadas à solução e ao resultado. Gosta de foco e clareza, mas pode soar apressado.
-    </p>
-    
-    <p class="descricao-paragrafo">
-        <strong>Orientado para o Tempo (Solução imediata):</strong> preza pela objetividade e gosta de ritmo na conversa. Evita desvios e busca eficiência.
-    </p>
-    
-    <p class="descricao-paragrafo">
-        <strong>Orientado para Mensagem (Conteúdo / Analítico):</strong> escuta para compreender o sentido exato do que está sendo dito. Avalia argumentos, identifica contradições e busca precisão na comunicação.
-    </p>
-    
-    <p class="footer-text">
-        Essas informações serão aprofundadas no relatório anexo.
-    </p>
-</body>
-</html>"""
+    template_docx = templates_compilados.resolver(dados.arquivo)
+    corpo_pdf = CORPOS_PDF_DIR / f"{dados.arquivo}.pdf"
     
+    if not template_docx.exists() or not corpo_pdf.exists():
+        raise HTTPException(404, "Template ou corpo não encontrado")
+    
+    return template_docx, corpo_da_requisicao(dados, corpo_pdf)
+
+
+def linha_ndjson(conteudo: dict) -> bytes:
+    return (json.dumps(conteudo, ensure_ascii=False, default=str) + "\n").encode()
+
+
+async def processar_lote(itens: list):
+    """Gera os relatórios de um lote, emitindo uma linha NDJSON por item concluído
+    
+    Capas são preenchidas em paralelo e convertidas juntas; cada item é juntado
+    ao corpo e emitido assim que fica pronto. Erros de um item não interrompem o lote.
+    
+    No máximo um item por worker do executor fica em andamento: o restante aguarda
+    aqui, em vez de lotar a fila do executor (ExecutorSaturado) para este e os demais
+    endpoints.
+    """
+    lote_dir = area_trabalho.criar("lote")
+    logs.anotar("itens", len(itens))
+    logger.debug("Lote: %d itens", len(itens))
+    
+    try:
+        pendentes = []
+        for indice, item in enumerate(itens):
+            try:
+                dados = RelatorioRequest.model_validate(item)
+                template_docx, corpo_pdf = validar_requisicao(dados)
+                pendentes.append({
+                    "indice": indice,
+                    "dados": dados,
+                    "motor": resolver_motor(dados),
+                    "template": template_docx,
+                    "corpo": corpo_pdf,
+                    "capa_docx": lote_dir / f"capa_{indice}.docx",
+                    "capa_pdf": lote_dir / f"capa_{indice}.pdf",
+                    "final": lote_dir / f"final_{indice}.pdf"
+                })
+            except ValidationError as e:
+                metricas.REQUISICOES.inc("lote", rotulo_arquivo(str(item.get("arquivo"))), "erro_cliente")
+                yield linha_ndjson({"indice": indice, "success": False, "erro": e.errors(include_url=False)})
+            except HTTPException as e:
+                metricas.REQUISICOES.inc("lote", rotulo_arquivo(dados.arquivo), "erro_cliente")
+                yield linha_ndjson({"indice": indice, "success": False, "erro": e.detail})
+        
+        vagas = asyncio.Semaphore(executor.workers)
+        
+        # 1. Cache e capas (DOCX preenchido ou PDF nativo), em paralelo
+        async def preparar(p):
+            async with vagas:
+                return await preparar_item(p)
+        
+        async def preparar_item(p):
+            p["chave_final"], p["chave_capa"] = await chaves_cache(p["dados"], p["motor"], p["template"], p["corpo"])
+            if await restaurar_do_cache(p["chave_final"], p["final"]):
+                return "pronto"
+            if await restaurar_do_cache(p["chave_capa"], p["capa_pdf"]):
+                return "capa"
+            if p["motor"] == "nativo":
+                await executar_etapa("capa_nativa", gerar_capa_nativa, p["dados"], p["capa_pdf"])
+                await guardar_no_cache(p["chave_capa"], p["capa_pdf"])
+                return "capa"
+            await executar_etapa("preencher_docx", substituir_campos_docx, p["template"], p["dados"], p["capa_docx"])
+            return "docx"
+        
+        estados = await asyncio.gather(*(preparar(p) for p in pendentes), return_exceptions=True)
+        
+        falhas = {}
+        for p, estado in zip(pendentes, estados):
+            if isinstance(estado, Exception):
+                falhas[p["indice"]] = estado
+            else:
+                p["estado"] = estado
+        
+        # 2. Conversão das capas DOCX em lote
+        para_converter = [p for p in pendentes if p.get("estado") == "docx"]
+        if para_converter:
+            with metricas.medir("converter_pdf_lote"):
+                erros = await converter_lote_docx_para_pdf([p["capa_docx"] for p in para_converter], lote_dir)
+            for p in para_converter:
+                erro = erros[p["capa_docx"]]
+                if erro is not None:
+                    falhas[p["indice"]] = erro
+                else:
+                    await guardar_no_cache(p["chave_capa"], p["capa_pdf"])
+        
+        for p in pendentes:
+            if p["indice"] in falhas:
+                metricas.REQUISICOES.inc("lote", p["dados"].arquivo, "erro")
+                yield linha_ndjson({"indice": p["indice"], "success": False, "erro": str(falhas[p["indice"]])})
+        
+        # 3. Junção e resposta de cada item, na ordem em que ficam prontos
+        async def finalizar(p):
+            async with vagas:
+                return await finalizar_item(p)
+        
+        async def finalizar_item(p):
+            try:
+                if p["estado"] != "pronto":
+                    await finalizar_relatorio(p["capa_pdf"], p["corpo"], p["final"], p["chave_final"])
+                metricas.SAIDA_BYTES.observar(p["final"].stat().st_size, "pdf")
+                with metricas.medir("base64"):
+                    pdf_base64 = await asyncio.to_thread(ler_pdf_base64, p["final"])
+                dados = p["dados"]
+                metricas.REQUISICOES.inc("lote", dados.arquivo, "sucesso")
+                return {
+                    "indice": p["indice"],
+                    "success": True,
+                    "pdf_base64": pdf_base64,
+                    "html": gerar_html_capa(dados),
+                    "filename": f"relatorio_{dados.participante.replace(' ', '_')}.pdf",
+                    "participante": dados.participante
+                }
+            except Exception as e:
+                logger.error("✗ Erro no item %d do lote: %s", p["indice"], e, extra={"indice": p["indice"]})
+                metricas.REQUISICOES.inc("lote", p["dados"].arquivo, "erro")
+                return {"indice": p["indice"], "success": False, "erro": str(e)}
+        
+        tarefas = [finalizar(p) for p in pendentes if p["indice"] not in falhas]
+        for tarefa in asyncio.as_completed(tarefas):
+            yield linha_ndjson(await tarefa)
+        
+        logger.debug("✓ Lote concluído: %d itens", len(itens))
+    
+    finally:
+        area_trabalho.remover(lote_dir)
+
+
+def resumo_job(job: dict) -> dict:
+    """Representação pública de um job"""
+    resumo = {
+        "id": job["id"],
+        "status": job["status"],
+        "tentativas": job["tentativas"],
+        "criado_em": job["criado_em"],
+        "concluido_em": job["concluido_em"],
+        "status_url": f"/jobs/{job['id']}"
+    }
+    if job["status"] == CONCLUIDO:
+        resumo["download_url"] = f"/jobs/{job['id']}/pdf"
+    if job["erro"]:
+        resumo["erro"] = job["erro"]
+    return resumo
+
+
+async def processar_job(job: dict):
+    """Gera o PDF de um job reservado e registra o resultado na fila"""
+    job_dir = area_trabalho.criar("job")
+    logger.debug("Job %s (tentativa %d)", job["id"], job["tentativas"])
+    inicio = time.perf_counter()
+    
+    try:
+        with metricas.requisicao("jobs", rotulo_arquivo(str(job["payload"].get("arquivo")))):
+            dados = RelatorioRequest.model_validate(job["payload"])
+            template_docx, corpo_pdf = validar_requisicao(dados)
+            temp_final = job_dir / "final.pdf"
+            await gerar_pdf_relatorio(
+                dados, template_docx, corpo_pdf,
+                job_dir / "capa.docx", job_dir / "capa.pdf", temp_final
+            )
+            resultado = fila_jobs.resultados_dir / f"{job['id']}.pdf"
+            await asyncio.to_thread(shutil.move, temp_final, resultado)
+            await asyncio.to_thread(fila_jobs.concluir, job["id"], resultado)
+        # Jobs não passam pelo CorrelacaoMiddleware: esta é a linha de resumo deles
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        logger.info(
+            "✓ Job concluído: %s %.0fms", job["id"], duracao_ms,
+            extra={
+                "job_id": job["id"],
+                "tentativa": job["tentativas"],
+                "duracao_ms": round(duracao_ms, 1),
+                "etapas_ms": {e: round(d * 1000, 1) for e, d in logs.resumo_atual()["etapas"].items()},
+            }
+        )
+    except (ValidationError, HTTPException) as e:
+        erro = e.detail if isinstance(e, HTTPException) else str(e)
+        await asyncio.to_thread(fila_jobs.falhar, job["id"], erro, job["tentativas"], True)
+        logger.error("✗ Job inválido %s: %s", job["id"], erro, extra={"job_id": job["id"]})
+    except Exception as e:
+        status = await asyncio.to_thread(fila_jobs.falhar, job["id"], str(e), job["tentativas"])
+        logger.error(
+            "✗ Erro no job %s (%s): %s", job["id"], status, e,
+            extra={"job_id": job["id"], "tentativa": job["tentativas"], "status": status}
+        )
+    finally:
+        area_trabalho.remover(job_dir)
+    
+    if job["callback_url"]:
+        atual = await asyncio.to_thread(fila_jobs.obter, job["id"])
+        if atual["status"] != PENDENTE:
+            await asyncio.to_thread(notificar_callback, job["callback_url"], resumo_job(atual))
+
+
+async def worker_jobs(nome: str):
+    """Consome a fila de jobs até ser cancelado"""
+    ultima_limpeza = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            if loop.time() - ultima_limpeza > 600:
+                ultima_limpeza = loop.time()
+                removidos = await asyncio.to_thread(fila_jobs.limpar, JOBS_RETENCAO_HORAS * 3600)
+                if removidos:
+                    logger.info(f"✓ {removidos} jobs antigos removidos")
+            
+            job = await asyncio.to_thread(fila_jobs.reservar, nome)
+            if job is None:
+                await asyncio.sleep(JOBS_INTERVALO)
+                continue
+            # O id do job faz o papel do id de requisição nos logs
+            with logs.requisicao(f"job-{job['id']}"):
+                await processar_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"✗ Erro no worker de jobs {nome}: {e}", exc_info=True)
+            await asyncio.sleep(JOBS_INTERVALO)
+
+
+async def faxineiro_armazem():
+    """Remove periodicamente relatórios armazenados expirados ou acima do limite"""
+    while True:
+        try:
+            removidos = await asyncio.to_thread(armazem.limpar)
+            if removidos:
+                logger.info(f"✓ {removidos} relatórios armazenados removidos")
+        except Exception as e:
+            logger.error(f"✗ Erro na limpeza do armazém: {e}")
+        await asyncio.sleep(600)
+
+
+async def faxineiro_idempotencia():
+    """Remove periodicamente resultados e Idempotency-Keys fora da janela"""
+    while True:
+        try:
+            await asyncio.to_thread(idempotencia.limpar)
+        except Exception as e:
+            logger.error(f"✗ Erro na limpeza da idempotência: {e}")
+        await asyncio.sleep(max(10.0, min(IDEMPOTENCIA_JANELA_S, 300.0)))
+
+
+async def faxineiro_trabalho():
+    """Remove periodicamente diretórios de trabalho órfãos"""
+    while True:
+        try:
+            await asyncio.to_thread(area_trabalho.limpar)
+        except Exception as e:
+            logger.error(f"✗ Erro na limpeza da área de trabalho: {e}")
+        await asyncio.sleep(TRABALHO_INTERVALO_LIMPEZA)
+
+
+def iniciar_workers_jobs(quantidade: int):
+    prefixo = f"{os.uname().nodename}-{os.getpid()}"
+    for i in range(quantidade):
+        tarefas_fundo.append(asyncio.create_task(worker_jobs(f"{prefixo}-{i}")))
+    if quantidade:
+        logger.info(f"✓ {quantidade} workers de jobs iniciados")
+
+
+async def rodar_worker():
+    """Processo dedicado só a consumir jobs (ver worker.py)"""
+    await startup()
+    tarefas_fundo.append(asyncio.create_task(faxineiro_trabalho()))
+    iniciar_workers_jobs(max(1, JOBS_WORKERS))
+    try:
+        await asyncio.gather(*tarefas_fundo)
+    finally:
+        await shutdown()
+
+
+def gerar_html_capa(dados: RelatorioRequest) -> str:
+    """Gera HTML com formatação IDÊNTICA ao documento Word"""
+    with metricas.medir("html_capa"):
+        html = modelo_email.renderizar(
+            participante=dados.participante,
+            pontuacao_pessoas=dados.pontuacoes.PESSOAS,
+            pontuacao_acao=dados.pontuacoes.ACAO,
+            pontuacao_tempo=dados.pontuacoes.TEMPO,
+            pontuacao_mensagem=dados.pontuacoes.MENSAGEM,
+            predominante=NOMES_ESTILOS_LONGOS[dados.predominante],
+            menos_desenvolvido=NOMES_ESTILOS_LONGOS[dados.menosDesenvolvido]
+        )
+    metricas.SAIDA_BYTES.observar(len(html), "html")
     return html
 
 
@@ -519,13 +1162,92 @@ async def health():
     checks = {
         "templates_dir": TEMPLATES_DIR.exists(),
         "corpos_pdf_dir": CORPOS_PDF_DIR.exists(),
-        "libreoffice": shutil.which("libreoffice") is not None
+        "libreoffice": shutil.which(LIBREOFFICE_BIN) is not None
     }
-    return {
+    resposta = {
         "status": "ok" if all(checks.values()) else "warning",
         "version": "2.3.1",
         "checks": checks
     }
+    resposta["inicializacao"] = inicializacao.estatisticas()
+    resposta["motor_capa"] = {"padrao": MOTOR_CAPA, "nativo_disponivel": motor_nativo_disponivel()}
+    sem_compilado = await asyncio.to_thread(templates_compilados.verificar, ARQUIVOS_VALIDOS)
+    resposta["templates_compilados"] = {"validos": len(ARQUIVOS_VALIDOS) - len(sem_compilado), "sem_compilado": sem_compilado}
+    resposta["corpos_otimizados"] = {"padrao": QUALIDADE_CORPO, "variantes": variantes_corpos.estatisticas()}
+    resposta["executor"] = executor.estatisticas()
+    resposta["pipeline"] = pipeline.estatisticas()
+    if admissao is not None:
+        resposta["admissao"] = admissao.estatisticas()
+    resposta["idempotencia"] = idempotencia.estatisticas()
+    if perfilamento.habilitado:
+        resposta["perfilamento"] = perfilamento.estatisticas()
+    if cache is not None:
+        resposta["cache"] = cache.estatisticas()
+    if pool_libreoffice is not None:
+        resposta["pool_libreoffice"] = pool_libreoffice.estatisticas()
+    if perfis_subprocesso is not None:
+        resposta["perfis_subprocesso"] = perfis_subprocesso.estatisticas()
+    resposta["processo"] = {"pid": os.getpid(), "workers": WORKERS, "cpus": CPUS}
+    resposta["jobs"] = await asyncio.to_thread(fila_jobs.estatisticas)
+    resposta["area_trabalho"] = await asyncio.to_thread(area_trabalho.estatisticas)
+    resposta["armazem"] = await asyncio.to_thread(armazem.estatisticas)
+    if not inicializacao.pronto:
+        # Ainda aquecendo (ou falhou): fora do balanceamento até a primeira renderização ser rápida
+        resposta["status"] = inicializacao.estado
+        return JSONResponse(resposta, status_code=503)
+    return resposta
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato texto do Prometheus"""
+    texto = metricas.REGISTRO.exportar()
+    texto += metricas.exportar_estatisticas("relatorio_executor", "Executor das etapas CPU-bound", executor.estatisticas())
+    for estagio, estatisticas in pipeline.estatisticas().items():
+        texto += metricas.exportar_estatisticas(
+            f"relatorio_pipeline_{estagio}", f"Estágio {estagio} do pipeline de PDF", estatisticas
+        )
+    if admissao is not None:
+        texto += metricas.exportar_estatisticas("relatorio_admissao", "Controle de admissão do pipeline de PDF", admissao.estatisticas())
+    texto += metricas.exportar_estatisticas(
+        "relatorio_idempotencia", "Gerações compartilhadas e repetidas", idempotencia.estatisticas()
+    )
+    if cache is not None:
+        texto += metricas.exportar_estatisticas("relatorio_cache", "Cache de capas e relatórios", cache.estatisticas())
+    if pool_libreoffice is not None:
+        texto += metricas.exportar_estatisticas(
+            "libreoffice_pool", "Pool de instâncias LibreOffice", pool_libreoffice.estatisticas()
+        )
+    jobs = await asyncio.to_thread(fila_jobs.estatisticas)
+    texto += metricas.exportar_estatisticas("relatorio_jobs", "Jobs na fila por status", jobs)
+    armazenados = await asyncio.to_thread(armazem.estatisticas)
+    texto += metricas.exportar_estatisticas("relatorio_armazem", "Relatórios armazenados", armazenados)
+    return PlainTextResponse(texto, media_type="text/plain; version=0.0.4")
+
+
+def exigir_token_perfilamento(token: Optional[str]):
+    if not PERFILAMENTO_TOKEN:
+        raise HTTPException(404, "Perfilamento desabilitado (defina PERFILAMENTO_TOKEN)")
+    if not token_confere(token or "", PERFILAMENTO_TOKEN):
+        raise HTTPException(403, "Token de perfilamento inválido")
+
+
+@app.get("/admin/perfilamento")
+async def listar_perfis(x_perfilamento_token: Optional[str] = Header(None)):
+    """Perfis gravados, do mais recente ao mais antigo"""
+    exigir_token_perfilamento(x_perfilamento_token)
+    return {"perfis": await asyncio.to_thread(perfilamento.listar), **perfilamento.estatisticas()}
+
+
+@app.get("/admin/perfilamento/{arquivo}")
+async def baixar_perfil(arquivo: str, x_perfilamento_token: Optional[str] = Header(None)):
+    """Baixa o .prof (pstats) ou o .txt de um perfil"""
+    exigir_token_perfilamento(x_perfilamento_token)
+    caminho = perfilamento.caminho(arquivo)
+    if caminho is None:
+        raise HTTPException(404, "Perfil não encontrado")
+    tipo = "text/plain; charset=utf-8" if caminho.suffix == ".txt" else "application/octet-stream"
+    return FileResponse(caminho, media_type=tipo, filename=caminho.name)
 
 
 @app.get("/templates-disponiveis")
@@ -562,115 +1284,457 @@ async def gerar_html_email(dados: RelatorioRequest):
         raise HTTPException(500, str(e))
 
 
-@app.post("/gerar-relatorio-completo")
-async def gerar_relatorio_completo(dados: RelatorioRequest):
-    """Gera PDF E HTML em uma única chamada"""
+async def relatorio_no_armazem(dados: RelatorioRequest, template_docx: Path, corpo_pdf: Path,
+                               admitir: bool = False, chave_idempotencia: Optional[str] = None) -> dict:
+    """Artefato do relatório no armazém, gerando o PDF só se a mesma requisição ainda não estiver lá"""
+    if chave_idempotencia:
+        await impressao_requisicao(dados, template_docx, corpo_pdf, chave_idempotencia)
+    campos = campos_chave(dados, resolver_motor(dados))
+    hash_requisicao = await asyncio.to_thread(chave_relatorio, "relatorio", campos, template_docx, corpo_pdf)
+    
+    entrada = await asyncio.to_thread(armazem.buscar, hash_requisicao)
+    if entrada is not None:
+        logger.debug("✓ Relatório já armazenado: %s", entrada["id"])
+        logs.anotar("relatorio_id", entrada["id"])
+        return entrada
+    
+    trabalho = area_trabalho.criar("armazem")
     try:
-        logger.info("REQUISIÇÃO COMPLETA (PDF + HTML)")
-        
-        if dados.predominante == dados.menosDesenvolvido:
-            raise HTTPException(400, "Estilos não podem ser iguais")
+        temp_final = trabalho / "final.pdf"
+        await gerar_pdf_relatorio(
+            dados, template_docx, corpo_pdf, trabalho / "capa.docx", trabalho / "capa.pdf", temp_final, admitir
+        )
+        filename = f"relatorio_{dados.participante.replace(' ', '_')}.pdf"
+        entrada = await asyncio.to_thread(armazem.guardar, temp_final, hash_requisicao, filename)
+    finally:
+        area_trabalho.remover(trabalho)
+    
+    logger.debug("✓ Relatório armazenado: %s", entrada["id"])
+    logs.anotar("relatorio_id", entrada["id"])
+    return entrada
+
+
+@app.post("/gerar-relatorio-completo")
+async def gerar_relatorio_completo(
+    dados: RelatorioRequest,
+    request: Request,
+    response: Response,
+    formato: str = Query("json", pattern="^(json|json-stream|multipart)$"),
+    retorno: str = Query("base64", pattern="^(base64|url)$"),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Gera PDF E HTML em uma única chamada
+    
+    O HTML é renderizado enquanto o PDF passa pelos estágios do pipeline.
+    
+    formato=json (padrão) monta a resposta inteira em memória; json-stream envia o
+    mesmo JSON com o base64 gerado em blocos; multipart devolve multipart/mixed com
+    os metadados + HTML em JSON e o PDF binário.
+    
+    retorno=url guarda o PDF no armazém e devolve a URL de download (/relatorios/{id})
+    no lugar do base64; a mesma requisição repetida reaproveita o artefato.
+    
+    Idempotency-Key reutilizada com dados diferentes responde 422.
+    """
+    with metricas.requisicao("gerar-relatorio-completo", rotulo_arquivo(dados.arquivo)):
+        try:
+            template_docx, corpo_pdf = validar_requisicao(dados)
         
-        if dados.arquivo not in ARQUIVOS_VALIDOS:
-            raise HTTPException(400, "Arquivo inválido")
+            if retorno == "url":
+                entrada, html = await com_html_capa(
+                    dados, relatorio_no_armazem(dados, template_docx, corpo_pdf, True, idempotency_key)
+                )
+                return {
+                    "success": True,
+                    "relatorio_id": entrada["id"],
+                    "pdf_url": str(request.url_for("baixar_relatorio", relatorio_id=entrada["id"])),
+                    "pdf_bytes": entrada["bytes"],
+                    "expira_em": entrada["criado_em"] + RELATORIOS_RETENCAO_HORAS * 3600,
+                    "html": html,
+                    "filename": entrada["filename"],
+                    "participante": dados.participante
+                }
         
-        template_docx = TEMPLATES_DIR / f"{dados.arquivo}.docx"
-        corpo_pdf = CORPOS_PDF_DIR / f"{dados.arquivo}.pdf"
+            trabalho = area_trabalho.criar("completo")
+            remover_trabalho = BackgroundTask(area_trabalho.remover, trabalho)
+            temp_docx = trabalho / "capa.docx"
+            temp_pdf = trabalho / "capa.pdf"
+            temp_final = trabalho / "final.pdf"
         
-        if not template_docx.exists() or not corpo_pdf.exists():
-            raise HTTPException(404, "Template ou corpo não encontrado")
+            try:
+                origem, html = await com_html_capa(dados, gerar_pdf_relatorio(
+                    dados, template_docx, corpo_pdf, temp_docx, temp_pdf, temp_final, True, idempotency_key
+                ))
+            except BaseException:
+                area_trabalho.remover(trabalho)
+                raise
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        temp_docx = TEMP_DIR / f"capa_{timestamp}.docx"
-        temp_pdf = TEMP_DIR / f"capa_{timestamp}.pdf"
-        temp_final = TEMP_DIR / f"final_{timestamp}.pdf"
+            cabecalhos = cabecalhos_idempotencia(origem)
+            filename = f"relatorio_{dados.participante.replace(' ', '_')}.pdf"
         
-        substituir_campos_docx(template_docx, dados, temp_docx)
-        converter_docx_para_pdf(temp_docx, temp_pdf)
-        juntar_pdfs(temp_pdf, corpo_pdf, temp_final)
+            if formato == "json-stream":
+                return StreamingResponse(
+                    stream_json_base64(
+                        "pdf_base64", temp_final,
+                        {"success": True},
+                        {"html": html, "filename": filename, "participante": dados.participante}
+                    ),
+                    media_type="application/json",
+                    headers=cabecalhos,
+                    background=remover_trabalho
+                )
         
-        with open(temp_final, 'rb') as f:
-            pdf_base64 = base64.b64encode(f.read()).decode('utf-8')
+            if formato == "multipart":
+                fronteira = fronteira_multipart()
+                return StreamingResponse(
+                    stream_multipart(
+                        fronteira,
+                        {"success": True, "html": html, "filename": filename, "participante": dados.participante},
+                        temp_final, filename
+                    ),
+                    media_type=f"multipart/mixed; boundary={fronteira}",
+                    headers=cabecalhos,
+                    background=remover_trabalho
+                )
         
-        html = gerar_html_capa(dados)
+            try:
+                async with pipeline.vaga(JUNTAR):
+                    with metricas.medir("base64"):
+                        pdf_base64 = await asyncio.to_thread(ler_pdf_base64, temp_final)
+            finally:
+                area_trabalho.remover(trabalho)
         
-        logger.info("✓ PDF e HTML gerados")
+            response.headers.update(cabecalhos)
+            return {
+                "success": True,
+                "pdf_base64": pdf_base64,
+                "html": html,
+                "filename": filename,
+                "participante": dados.participante
+            }
         
-        return {
-            "success": True,
-            "pdf_base64": pdf_base64,
-            "html": html,
-            "filename": f"relatorio_{dados.participante.replace(' ', '_')}.pdf",
-            "participante": dados.participante
-        }
+        except HTTPException:
+            raise
+        except ConflitoIdempotencia as e:
+            raise HTTPException(422, str(e))
+        except ExecutorSaturado as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": "5"})
+        except AdmissaoRecusada as e:
+            if not ADMISSAO_DEGRADAR_HTML:
+                raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+            logger.warning(f"⚠ {e}: respondendo só o HTML")
+            return JSONResponse({
+                "success": True,
+                "degradado": True,
+                "pdf_base64": None,
+                "html": gerar_html_capa(dados),
+                "filename": None,
+                "participante": dados.participante
+            }, headers={"Retry-After": str(e.retry_after)})
+        except Exception as e:
+            logger.error(f"Erro: {e}", exc_info=True)
+            raise HTTPException(500, str(e))
+
+
+@app.post("/gerar-relatorios-lote")
+async def gerar_relatorios_lote(itens: List[Dict[str, Any]] = Body(...)):
+    """Gera relatórios para uma lista de requisições, respondendo em NDJSON"""
+    if not itens:
+        raise HTTPException(400, "Lote vazio")
+    
+    if len(itens) > LOTE_MAX_ITENS:
+        raise HTTPException(413, f"Lote excede o limite de {LOTE_MAX_ITENS} itens")
+    
+    return StreamingResponse(processar_lote(itens), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", status_code=202)
+async def criar_job(dados: JobRequest):
+    """Enfileira a geração do relatório e retorna o id do job"""
+    validar_requisicao(dados)
+    payload = dados.model_dump(exclude={"callback_url"})
+    job_id = await asyncio.to_thread(fila_jobs.criar, payload, dados.callback_url)
+    logs.anotar("job_id", job_id)
+    return resumo_job(await asyncio.to_thread(fila_jobs.obter, job_id))
+
+
+@app.get("/jobs/{job_id}")
+async def status_job(job_id: str):
+    job = await asyncio.to_thread(fila_jobs.obter, job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado")
+    return resumo_job(job)
+
+
+@app.get("/jobs/{job_id}/pdf")
+async def baixar_job(job_id: str):
+    job = await asyncio.to_thread(fila_jobs.obter, job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado")
+    if job["status"] != CONCLUIDO:
+        raise HTTPException(409, f"Job ainda não concluído ({job['status']})")
+    
+    resultado = Path(job["resultado"])
+    if not resultado.exists():
+        raise HTTPException(410, "Resultado do job expirado")
+    
+    participante = json.loads(job["payload"])["participante"]
+    return FileResponse(
+        path=str(resultado),
+        media_type="application/pdf",
+        filename=f"relatorio_{participante.replace(' ', '_')}.pdf"
+    )
+
+
+@app.get("/relatorios/{relatorio_id}")
+async def baixar_relatorio(relatorio_id: str, request: Request):
+    """PDF armazenado, com ETag/If-None-Match, Range e Cache-Control"""
+    entrada = await asyncio.to_thread(armazem.obter, relatorio_id)
+    if entrada is None:
+        raise HTTPException(404, "Relatório não encontrado ou expirado")
+    
+    restante = entrada["criado_em"] + RELATORIOS_RETENCAO_HORAS * 3600 - time.time()
+    return responder_artefato(armazem.caminho(relatorio_id), entrada, request.headers, max(0, int(restante)))
+
+
+async def responder_pontuacao(registros: list, gerar: bool, motor: Optional[str], callback_url: Optional[str]):
+    """Pontua os respondentes e, com `gerar`, enfileira um job de relatório para cada válido"""
+    if len(registros) > PONTUACAO_MAX_RESPONDENTES:
+        raise HTTPException(413, f"Limite de {PONTUACAO_MAX_RESPONDENTES} respondentes excedido")
+    
+    from pontuacao import pontuar_registros
+    
+    resultados = await asyncio.to_thread(pontuar_registros, registros)
+    validos = [r for r in resultados if "erro" not in r]
+    logs.anotar("respondentes", len(resultados))
+    logs.anotar("validos", len(validos))
+    
+    if gerar and validos:
+        payloads = []
+        for resultado in validos:
+            dados = RelatorioRequest(
+                participante=resultado["participante"],
+                pontuacoes=resultado["pontuacoes"],
+                predominante=resultado["predominante"],
+                menosDesenvolvido=resultado["menosDesenvolvido"],
+                arquivo=resultado["arquivo"],
+                motor=motor
+            )
+            validar_requisicao(dados)
+            payloads.append(dados.model_dump())
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erro: {e}", exc_info=True)
-        raise HTTPException(500, str(e))
+        ids = await asyncio.to_thread(fila_jobs.criar_varios, payloads, callback_url)
+        for resultado, job_id in zip(validos, ids):
+            resultado["job"] = {"id": job_id, "status_url": f"/jobs/{job_id}"}
+        logs.anotar("jobs", len(ids))
+    
+    return {"total": len(resultados), "validos": len(validos), "resultados": resultados}
+
+
+@app.post("/pontuar")
+async def pontuar_respostas(requisicao: PontuacaoRequest):
+    """Pontua respostas brutas do questionário (um ou vários respondentes)"""
+    return await responder_pontuacao(
+        requisicao.respondentes, requisicao.gerar, requisicao.motor, requisicao.callback_url
+    )
+
+
+@app.post("/pontuar-csv")
+async def pontuar_csv(
+    arquivo: UploadFile = File(...),
+    gerar: bool = Form(False),
+    motor: Optional[str] = Form(None, pattern="^(docx|nativo)$"),
+    callback_url: Optional[str] = Form(None, pattern="^https?://")
+):
+    """Pontua uma exportação CSV do Google Forms"""
+    conteudo = await arquivo.read()
+    try:
+        texto = conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = conteudo.decode("latin-1")
+    
+    from pontuacao import ler_csv
+    
+    registros = await asyncio.to_thread(ler_csv, texto)
+    if not registros:
+        raise HTTPException(400, "CSV sem respondentes")
+    
+    return await responder_pontuacao(registros, gerar, motor, callback_url)
 
 
 @app.post("/gerar-relatorio")
-async def gerar_relatorio(dados: RelatorioRequest):
+async def gerar_relatorio(dados: RelatorioRequest, idempotency_key: Optional[str] = Header(None, max_length=255)):
     """Gera PDF e retorna arquivo para download"""
-    try:
-        logger.info("="*60)
-        logger.info("NOVA REQUISIÇÃO")
-        logger.info("="*60)
-        
-        if dados.predominante == dados.menosDesenvolvido:
-            raise HTTPException(400, "Predominante e menos desenvolvido não podem ser iguais")
-        
-        if dados.arquivo not in ARQUIVOS_VALIDOS:
-            raise HTTPException(400, f"Arquivo inválido: {dados.arquivo}")
-        
-        template_docx = TEMPLATES_DIR / f"{dados.arquivo}.docx"
-        corpo_pdf = CORPOS_PDF_DIR / f"{dados.arquivo}.pdf"
-        
-        if not template_docx.exists():
-            raise HTTPException(404, f"Template não encontrado")
-        
-        if not corpo_pdf.exists():
-            raise HTTPException(404, f"Corpo não encontrado")
+    with metricas.requisicao("gerar-relatorio", rotulo_arquivo(dados.arquivo)):
+        try:
+            template_docx, corpo_pdf = validar_requisicao(dados)
+            trabalho = area_trabalho.criar("relatorio")
+            temp_docx = trabalho / "capa.docx"
+            temp_pdf = trabalho / "capa.pdf"
+            temp_final = trabalho / "final.pdf"
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        temp_docx = TEMP_DIR / f"capa_{timestamp}.docx"
-        temp_pdf = TEMP_DIR / f"capa_{timestamp}.pdf"
-        temp_final = TEMP_DIR / f"final_{timestamp}.pdf"
+            try:
+                origem = await gerar_pdf_relatorio(
+                    dados, template_docx, corpo_pdf, temp_docx, temp_pdf, temp_final, True, idempotency_key
+                )
+            except BaseException:
+                area_trabalho.remover(trabalho)
+                raise
         
-        try:
-            substituir_campos_docx(template_docx, dados, temp_docx)
-            converter_docx_para_pdf(temp_docx, temp_pdf)
-            juntar_pdfs(temp_pdf, corpo_pdf, temp_final)
-            
-            logger.info("="*60)
-            logger.info("✓✓✓ SUCESSO ✓✓✓")
-            logger.info("="*60)
-            
+            # O diretório de trabalho só é removido depois que o arquivo terminou de ser enviado
             return FileResponse(
                 path=str(temp_final),
                 media_type="application/pdf",
-                filename=f"relatorio_{dados.participante.replace(' ', '_')}.pdf"
+                filename=f"relatorio_{dados.participante.replace(' ', '_')}.pdf",
+                headers=cabecalhos_idempotencia(origem),
+                background=BackgroundTask(area_trabalho.remover, trabalho)
             )
             
+        except HTTPException:
+            raise
+        except ConflitoIdempotencia as e:
+            raise HTTPException(422, str(e))
+        except ExecutorSaturado as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": "5"})
+        except AdmissaoRecusada as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+        except Exception as e:
+            logger.error(f"✗✗✗ ERRO FATAL: {e}", exc_info=True)
+            raise HTTPException(500, str(e))
+
+
+def verificar_templates_compilados(sem_compilado: list):
+    """Loga (ou, com TEMPLATES_EXIGIR_COMPILADOS, recusa) templates sem compilação válida"""
+    if not sem_compilado:
+        logger.info(f"✓ {len(ARQUIVOS_VALIDOS)} templates compilados")
+        return
+    
+    mensagem = (
+        f"{len(sem_compilado)} templates sem compilação válida, usando os originais "
+        f"(rode python compilar_templates.py): {', '.join(sem_compilado)}"
+    )
+    if TEMPLATES_EXIGIR_COMPILADOS:
+        raise RuntimeError(mensagem)
+    logger.warning(f"⚠ {mensagem}")
+
+
+async def aquecer_libreoffice():
+    global pool_libreoffice, vagas_pool, perfis_subprocesso
+    
+    # Perfis LibreOffice exclusivos deste worker; os de workers encerrados são removidos
+    orfaos = await asyncio.to_thread(limpar_perfis_orfaos, LIBREOFFICE_PERFIS_DIR)
+    if orfaos:
+        logger.info(f"✓ {orfaos} diretórios de perfis LibreOffice órfãos removidos")
+    perfis_dir = diretorio_do_processo(LIBREOFFICE_PERFIS_DIR)
+    
+    if LIBREOFFICE_POOL_TAMANHO > 0:
+        if uno_disponivel() and shutil.which(LIBREOFFICE_BIN):
+            pool = PoolLibreOffice(
+                LIBREOFFICE_BIN, LIBREOFFICE_POOL_TAMANHO,
+                perfis_dir, LIBREOFFICE_TIMEOUT
+            )
+            if LIBREOFFICE_POOL_AQUECER:
+                await asyncio.to_thread(pool.aquecer)
+            vagas_pool = asyncio.Semaphore(pool.tamanho)
+            pool_libreoffice = pool
+        else:
+            logger.warning("⚠ Ponte UNO indisponível: usando um processo LibreOffice por conversão")
+    
+    if pool_libreoffice is None:
+        perfis = PerfisSubprocesso(perfis_dir, max(1, LIBREOFFICE_SUBPROCESSOS))
+        await asyncio.to_thread(perfis.preparar)
+        perfis_subprocesso = perfis
+        logger.info(f"✓ {perfis_subprocesso.quantidade} perfis LibreOffice isolados para conversão via subprocesso")
+
+
+async def conversao_teste():
+    """Converte um template em cada instância/perfil, para a primeira requisição já encontrar
+    o LibreOffice carregado (binários em cache e perfil inicializado)"""
+    template = templates_compilados.resolver(ARQUIVOS_VALIDOS[0])
+    if not template.exists() or not shutil.which(LIBREOFFICE_BIN):
+        logger.warning("⚠ Conversão de teste ignorada (template ou LibreOffice ausente)")
+        return
+    
+    async def converter(diretorio: Path):
+        try:
+            await converter_docx_para_pdf(template, diretorio / "aquecimento.pdf")
+        except Exception as e:
+            logger.warning(f"⚠ Conversão de teste falhou: {e}")
         finally:
-            pass
-            
-    except HTTPException:
-        raise
+            await asyncio.to_thread(area_trabalho.remover, diretorio)
+    
+    quantidade = pool_libreoffice.tamanho if pool_libreoffice is not None else perfis_subprocesso.quantidade
+    await asyncio.gather(*(converter(area_trabalho.criar("aquecimento")) for _ in range(quantidade)))
+
+
+async def aquecer():
+    """Sobe workers e LibreOffice antes do primeiro tráfego, cronometrando cada fase"""
+    async def fase(nome, corrotina):
+        with inicializacao.fase(nome):
+            await corrotina
+    
+    try:
+        # Independentes: os workers do executor (templates e corpos) sobem junto com o LibreOffice
+        await asyncio.gather(
+            fase("executor", asyncio.to_thread(executor.iniciar)),
+            fase("libreoffice", aquecer_libreoffice())
+        )
+        if AQUECIMENTO_CONVERSAO:
+            await fase("conversao_teste", conversao_teste())
     except Exception as e:
-        logger.error(f"✗✗✗ ERRO FATAL: {e}", exc_info=True)
-        raise HTTPException(500, str(e))
+        inicializacao.concluir(e)
+        if not AQUECIMENTO_EM_FUNDO:
+            raise
+        return
+    inicializacao.concluir()
 
 
 @app.on_event("startup")
 async def startup():
+    inicializacao.registrar("importacao", time.perf_counter() - INICIO_PROCESSO)
+    
     logger.info("="*60)
     logger.info("API Relatório LSP-R v2.3.1")
     logger.info("="*60)
+    
+    verificar_templates_compilados(await asyncio.to_thread(templates_compilados.verificar, ARQUIVOS_VALIDOS))
+    
+    if AQUECIMENTO_EM_FUNDO:
+        tarefas_fundo.append(asyncio.create_task(aquecer()))
+    else:
+        await aquecer()
+    
+    if MOTOR_CAPA == "nativo" and not motor_nativo_disponivel():
+        logger.warning("⚠ Motor nativo indisponível (ReportLab/DejaVu Sans): usando DOCX + LibreOffice")
+
+
+@app.on_event("startup")
+async def iniciar_tarefas_fundo():
+    tarefas_fundo.append(asyncio.create_task(faxineiro_trabalho()))
+    tarefas_fundo.append(asyncio.create_task(faxineiro_armazem()))
+    tarefas_fundo.append(asyncio.create_task(faxineiro_idempotencia()))
+    iniciar_workers_jobs(JOBS_WORKERS)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for tarefa in tarefas_fundo:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas_fundo, return_exceptions=True)
+    tarefas_fundo.clear()
+    executor.encerrar()
+    if pool_libreoffice is not None:
+        pool_libreoffice.encerrar()
+    shutil.rmtree(diretorio_do_processo(LIBREOFFICE_PERFIS_DIR), ignore_errors=True)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3344)
+    # Com vários workers o uvicorn precisa importar o app em cada processo
+    # O access log do uvicorn é substituído pela linha de resumo do CorrelacaoMiddleware
+    if WORKERS > 1:
+        logger.warning(
+            f"⚠ {WORKERS} workers: /metrics, limites de admissão, single-flight da "
+            "idempotência e caches em memória valem por processo"
+        )
+    uvicorn.run(app if WORKERS == 1 else "app:app", host=HOST, port=PORT, workers=WORKERS, access_log=False)
@@ -0,0 +1,103 @@
+"""
+Área de trabalho temporária das requisições
+
+Cada requisição recebe um diretório próprio com id único (sem colisão entre
+requisições simultâneas), criado em tmpfs (/dev/shm) quando disponível para
+que DOCX, capa e PDF final intermediários não toquem o disco. O diretório é
+removido ao fim da requisição e um faxineiro periódico apaga o que sobrar
+(requisições interrompidas, workers mortos) por idade e por tamanho total.
+"""
+
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TMPFS_PADRAO = Path("/dev/shm")
+
+# Diretórios mais novos que isso estão em uso: o limite de tamanho não os remove
+IDADE_MINIMA_S = 60
+
+
+def escolher_raiz(configurada: str, alternativa: Path) -> Path:
+    """Diretório configurado, ou /dev/shm se gravável, ou o diretório alternativo em disco"""
+    if configurada:
+        return Path(configurada)
+    if TMPFS_PADRAO.is_dir() and os.access(TMPFS_PADRAO, os.W_OK):
+        return TMPFS_PADRAO / "relatorios_lsp"
+    return alternativa
+
+
+def _tamanho(diretorio: Path) -> int:
+    total = 0
+    for raiz, _, arquivos in os.walk(diretorio):
+        for nome in arquivos:
+            try:
+                total += os.stat(os.path.join(raiz, nome)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class AreaTrabalho:
+    """Diretórios de trabalho por requisição, com limpeza por idade e tamanho"""
+
+    def __init__(self, raiz: Path, max_idade_s: float, max_bytes: int):
+        self.raiz = raiz
+        self.max_idade_s = max_idade_s
+        self.max_bytes = max_bytes
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        self._removidos = 0
+
+    def criar(self, prefixo: str = "req") -> Path:
+        diretorio = self.raiz / f"{prefixo}_{uuid.uuid4().hex}"
+        diretorio.mkdir()
+        return diretorio
+
+    def remover(self, diretorio: Path):
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    def limpar(self) -> int:
+        """Remove diretórios antigos e, acima do limite de tamanho, os mais antigos primeiro"""
+        agora = time.time()
+        entradas = []
+        for diretorio in self.raiz.iterdir():
+            try:
+                entradas.append((diretorio.stat().st_mtime, diretorio))
+            except FileNotFoundError:
+                continue
+
+        removidos = 0
+        restantes = []
+        for mtime, diretorio in sorted(entradas):
+            if agora - mtime > self.max_idade_s:
+                self.remover(diretorio)
+                removidos += 1
+            else:
+                restantes.append((mtime, diretorio, _tamanho(diretorio)))
+
+        total = sum(tamanho for _, _, tamanho in restantes)
+        for mtime, diretorio, tamanho in restantes:
+            if total <= self.max_bytes or agora - mtime < IDADE_MINIMA_S:
+                break
+            self.remover(diretorio)
+            total -= tamanho
+            removidos += 1
+
+        if removidos:
+            self._removidos += removidos
+            logger.info(f"✓ Área de trabalho: {removidos} diretórios órfãos removidos")
+        return removidos
+
+    def estatisticas(self) -> dict:
+        diretorios = [d for d in self.raiz.iterdir()] if self.raiz.exists() else []
+        return {
+            "raiz": str(self.raiz),
+            "diretorios": len(diretorios),
+            "bytes": sum(_tamanho(d) for d in diretorios),
+            "removidos_faxineiro": self._removidos,
+        }
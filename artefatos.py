@@ -0,0 +1,262 @@
+"""
+Armazém persistente dos relatórios gerados (GET /relatorios/{id})
+
+Cada PDF fica em disco com um id aleatório e é indexado em SQLite pelo id e
+pelo hash da requisição: pedir de novo o mesmo relatório devolve o artefato
+existente sem gerá-lo outra vez. Artefatos saem por idade (retenção) e, acima
+do limite de espaço, os menos acessados recentemente saem primeiro.
+
+O download responde com ETag (SHA-256 do arquivo), If-None-Match, Range de
+um intervalo único e Cache-Control privado. O arquivo é lido do disco em
+blocos pelo event loop: o Starlette 0.27 não usa sendfile nem a extensão
+http.response.pathsend, então não há cópia zero do kernel para o socket.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import FileResponse, Response
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS relatorios (
+    id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    acessado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS relatorios_hash ON relatorios (hash);
+CREATE INDEX IF NOT EXISTS relatorios_acessado ON relatorios (acessado_em);
+"""
+
+ID_VALIDO = re.compile(r"^[0-9a-f]{32}$")
+INTERVALO = re.compile(r"^bytes=(\d*)-(\d*)$")
+TAMANHO_BLOCO = 64 * 1024
+
+
+def _sha256(caminho: Path) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+class ArmazemRelatorios:
+    """PDFs gerados, indexados por id e hash da requisição"""
+
+    def __init__(self, db_path: Path, diretorio: Path, retencao_s: float, max_bytes: int):
+        self.db_path = db_path
+        self.diretorio = diretorio
+        self.retencao_s = retencao_s
+        self.max_bytes = max_bytes
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        with self._conexao() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(ESQUEMA)
+
+    @contextmanager
+    def _conexao(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def caminho(self, relatorio_id: str) -> Path:
+        return self.diretorio / f"{relatorio_id}.pdf"
+
+    def _valido(self, linha) -> bool:
+        return (
+            linha is not None
+            and linha["criado_em"] > time.time() - self.retencao_s
+            and self.caminho(linha["id"]).exists()
+        )
+
+    def obter(self, relatorio_id: str):
+        """Metadados do artefato (ou None se não existe/expirou), marcando o acesso"""
+        if not ID_VALIDO.match(relatorio_id):
+            return None
+        with self._conexao() as conn:
+            linha = conn.execute("SELECT * FROM relatorios WHERE id = ?", (relatorio_id,)).fetchone()
+            if not self._valido(linha):
+                return None
+            conn.execute("UPDATE relatorios SET acessado_em = ? WHERE id = ?", (time.time(), relatorio_id))
+        return dict(linha)
+
+    def buscar(self, hash_requisicao: str):
+        """Artefato mais recente gerado para a mesma requisição"""
+        with self._conexao() as conn:
+            linha = conn.execute(
+                "SELECT * FROM relatorios WHERE hash = ? ORDER BY criado_em DESC LIMIT 1",
+                (hash_requisicao,)
+            ).fetchone()
+        return dict(linha) if self._valido(linha) else None
+
+    def guardar(self, origem: Path, hash_requisicao: str, filename: str) -> dict:
+        """Copia o PDF para o armazém (hardlink quando possível) e o indexa"""
+        relatorio_id = uuid.uuid4().hex
+        destino = self.caminho(relatorio_id)
+        temporario = destino.with_suffix(".tmp")
+        try:
+            os.link(origem, temporario)
+        except OSError:
+            shutil.copyfile(origem, temporario)
+        temporario.replace(destino)
+
+        agora = time.time()
+        entrada = {
+            "id": relatorio_id,
+            "hash": hash_requisicao,
+            "filename": filename,
+            "bytes": destino.stat().st_size,
+            "sha256": _sha256(destino),
+            "criado_em": agora,
+            "acessado_em": agora,
+        }
+        with self._conexao() as conn:
+            conn.execute(
+                "INSERT INTO relatorios (id, hash, filename, bytes, sha256, criado_em, acessado_em) "
+                "VALUES (:id, :hash, :filename, :bytes, :sha256, :criado_em, :acessado_em)",
+                entrada
+            )
+        return entrada
+
+    def limpar(self) -> int:
+        """Remove artefatos expirados e, acima do limite, os acessados há mais tempo"""
+        limite = time.time() - self.retencao_s
+        with self._conexao() as conn:
+            remover = [
+                linha["id"] for linha in
+                conn.execute("SELECT id FROM relatorios WHERE criado_em < ?", (limite,))
+            ]
+            total = 0
+            for linha in conn.execute(
+                "SELECT id, bytes FROM relatorios WHERE criado_em >= ? ORDER BY acessado_em DESC", (limite,)
+            ):
+                total += linha["bytes"]
+                if total > self.max_bytes:
+                    remover.append(linha["id"])
+
+            for relatorio_id in remover:
+                self.caminho(relatorio_id).unlink(missing_ok=True)
+            conn.executemany("DELETE FROM relatorios WHERE id = ?", [(r,) for r in remover])
+        return len(remover)
+
+    def estatisticas(self) -> dict:
+        with self._conexao() as conn:
+            linha = conn.execute("SELECT COUNT(*) AS total, COALESCE(SUM(bytes), 0) AS bytes FROM relatorios").fetchone()
+        return {"relatorios": linha["total"], "bytes": linha["bytes"], "limite_bytes": self.max_bytes}
+
+
+def intervalo_pedido(cabecalho: str, tamanho: int):
+    """(início, fim inclusivo) de um Range de intervalo único; None = arquivo inteiro
+
+    Levanta ValueError se o intervalo não pode ser atendido (416).
+    """
+    encontrado = INTERVALO.match(cabecalho.strip())
+    if not encontrado:
+        # Múltiplos intervalos ou unidade desconhecida: responde com o arquivo inteiro
+        return None
+    inicio, fim = encontrado.groups()
+    if not inicio and not fim:
+        return None
+
+    if not inicio:
+        sufixo = int(fim)
+        if sufixo == 0:
+            raise ValueError("Intervalo vazio")
+        return max(0, tamanho - sufixo), tamanho - 1
+
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or fim < inicio:
+        raise ValueError("Intervalo fora do arquivo")
+    return inicio, fim
+
+
+class RespostaParcial(Response):
+    """206 com um trecho do arquivo, lido em blocos"""
+
+    media_type = "application/pdf"
+
+    def __init__(self, caminho: Path, inicio: int, fim: int, tamanho: int, headers: dict):
+        self.caminho = caminho
+        self.inicio = inicio
+        self.fim = fim
+        super().__init__(status_code=206, headers={
+            **headers,
+            "content-range": f"bytes {inicio}-{fim}/{tamanho}",
+            "content-length": str(fim - inicio + 1),
+        })
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        restante = self.fim - self.inicio + 1
+        async with await anyio.open_file(self.caminho, "rb") as f:
+            await f.seek(self.inicio)
+            while restante > 0:
+                bloco = await f.read(min(TAMANHO_BLOCO, restante))
+                if not bloco:
+                    break
+                restante -= len(bloco)
+                await send({"type": "http.response.body", "body": bloco, "more_body": restante > 0})
+        if restante > 0:
+            await send({"type": "http.response.body", "body": b""})
+
+
+def disposicao(filename: str) -> str:
+    """Content-Disposition de anexo, como o FileResponse monta"""
+    codificado = quote(filename)
+    if codificado != filename:
+        return f"attachment; filename*=utf-8''{codificado}"
+    return f'attachment; filename="{filename}"'
+
+
+def responder_artefato(caminho: Path, entrada: dict, cabecalhos, max_age: int) -> Response:
+    """Resposta do download conforme If-None-Match, Range e If-Range
+
+    Arquivo inteiro e trechos (206) saem com o mesmo Content-Disposition.
+    """
+    etag = f'"{entrada["sha256"]}"'
+    headers = {
+        "etag": etag,
+        "cache-control": f"private, max-age={max_age}",
+        "accept-ranges": "bytes",
+    }
+
+    if_none_match = cabecalhos.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [e.strip() for e in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    tamanho = entrada["bytes"]
+    intervalo = cabecalhos.get("range")
+    if_range = cabecalhos.get("if-range")
+    if intervalo and (not if_range or if_range.strip() == etag):
+        try:
+            pedido = intervalo_pedido(intervalo, tamanho)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{tamanho}"})
+        if pedido is not None:
+            return RespostaParcial(caminho, *pedido, tamanho, {
+                **headers, "content-disposition": disposicao(entrada["filename"])
+            })
+
+    return FileResponse(caminho, media_type="application/pdf", filename=entrada["filename"], headers=headers)
@@ -0,0 +1,244 @@
+"""
+Benchmark offline do pipeline de relatórios
+
+Roda no próprio processo (sem servidor HTTP, sem executor e sem cache) contra
+os templates e corpos reais, cronometrando cada etapa nos 12 ARQUIVOS_VALIDOS.
+Reporta média, p95 e pico de memória por etapa, grava o resultado em JSON e
+compara com um baseline salvo.
+
+Uso:
+    python benchmark.py                                  # roda e imprime
+    python benchmark.py --saida bench.json               # salva o resultado
+    python benchmark.py --baseline bench.json --limite 0.2
+    python benchmark.py --conversor stub                 # sem LibreOffice
+
+Com --baseline, o código de saída é 1 se alguma etapa ficar mais lenta que
+baseline * (1 + limite).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from PyPDF2 import PdfWriter
+
+import app
+from pontuacao import ARQUIVOS
+from templates_docx import TemplateDocx
+
+DADOS_EXEMPLO = {
+    "participante": "Participante Benchmark",
+    "pontuacoes": {"PESSOAS": 30, "ACAO": 20, "TEMPO": 40, "MENSAGEM": 35},
+}
+
+
+def dados_para(arquivo: str) -> app.RelatorioRequest:
+    """Requisição coerente com o template (predominante/menos a partir do nome)"""
+    for chave, nome in ARQUIVOS.items():
+        if nome == arquivo:
+            predominante, menos = chave.split("-")
+            break
+    return app.RelatorioRequest(
+        **DADOS_EXEMPLO, predominante=predominante, menosDesenvolvido=menos, arquivo=arquivo
+    )
+
+
+def converter_stub(docx_path: Path, pdf_path: Path):
+    """Substitui o LibreOffice por uma página A4 em branco"""
+    writer = PdfWriter()
+    writer.add_blank_page(595, 842)
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+
+
+def converter_libreoffice(docx_path: Path, pdf_path: Path):
+    asyncio.run(app.executar_libreoffice([docx_path], pdf_path.parent, app.LIBREOFFICE_TIMEOUT))
+    gerado = pdf_path.parent / f"{docx_path.stem}.pdf"
+    if gerado != pdf_path:
+        gerado.replace(pdf_path)
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p * len(ordenados)) - 1)]
+
+
+class Medicoes:
+    def __init__(self):
+        self.tempos = {}
+        self.picos = {}
+
+    def medir(self, etapa: str, func, *args, memoria: bool = False):
+        if memoria:
+            tracemalloc.start()
+            func(*args)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.picos[etapa] = max(self.picos.get(etapa, 0), pico)
+            return
+
+        inicio = time.perf_counter()
+        func(*args)
+        self.tempos.setdefault(etapa, []).append(time.perf_counter() - inicio)
+
+    def resumo(self) -> dict:
+        resumo = {}
+        for etapa, tempos in self.tempos.items():
+            resumo[etapa] = {
+                "amostras": len(tempos),
+                "media_ms": round(statistics.fmean(tempos) * 1000, 3),
+                "p95_ms": round(percentil(tempos, 0.95) * 1000, 3),
+                "min_ms": round(min(tempos) * 1000, 3),
+                "max_ms": round(max(tempos) * 1000, 3),
+                "pico_memoria_kb": round(self.picos.get(etapa, 0) / 1024, 1),
+            }
+        return resumo
+
+
+def executar_etapas(medicoes: Medicoes, arquivo: str, converter, trabalho: Path, memoria: bool):
+    template_docx = app.templates_compilados.resolver(arquivo)
+    corpo_pdf = app.CORPOS_PDF_DIR / f"{arquivo}.pdf"
+    dados = dados_para(arquivo)
+    capa_docx = trabalho / "capa.docx"
+    capa_pdf = trabalho / "capa.pdf"
+    final_pdf = trabalho / "final.pdf"
+
+    medicoes.medir(
+        "carregar_template", TemplateDocx, template_docx,
+        app.indexar_template, app.normalizar_template, memoria=memoria
+    )
+    medicoes.medir("preencher_docx", app.substituir_campos_docx, template_docx, dados, capa_docx, memoria=memoria)
+    medicoes.medir("converter_pdf", converter, capa_docx, capa_pdf, memoria=memoria)
+    if app.motor_nativo_disponivel():
+        medicoes.medir("capa_nativa", app.gerar_capa_nativa, dados, trabalho / "nativa.pdf", memoria=memoria)
+    medicoes.medir("juntar_pdfs", app.juntar_pdfs, capa_pdf, corpo_pdf, final_pdf, memoria=memoria)
+    medicoes.medir("base64", app.ler_pdf_base64, final_pdf, memoria=memoria)
+    medicoes.medir("html_capa", app.gerar_html_capa, dados, memoria=memoria)
+
+
+def rodar(repeticoes: int, conversor: str, arquivos) -> dict:
+    converter = converter_stub if conversor == "stub" else converter_libreoffice
+    medicoes = Medicoes()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as diretorio:
+        trabalho = Path(diretorio)
+
+        # Aquecimento: carrega templates/corpos nos caches do processo
+        for arquivo in arquivos:
+            executar_etapas(Medicoes(), arquivo, converter, trabalho, memoria=False)
+
+        for _ in range(repeticoes):
+            for arquivo in arquivos:
+                executar_etapas(medicoes, arquivo, converter, trabalho, memoria=False)
+
+        # Memória em uma passada separada (tracemalloc distorce os tempos)
+        for arquivo in arquivos:
+            executar_etapas(medicoes, arquivo, converter, trabalho, memoria=True)
+
+    return {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "conversor": conversor,
+            "repeticoes": repeticoes,
+            "arquivos": len(arquivos),
+            "rss_max_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "etapas": medicoes.resumo(),
+    }
+
+
+def comparar(resultado: dict, baseline: dict, limite: float) -> list:
+    """Etapas cuja média ficou acima de baseline * (1 + limite)"""
+    regressoes = []
+    for etapa, atual in resultado["etapas"].items():
+        anterior = baseline.get("etapas", {}).get(etapa)
+        if anterior is None or anterior["media_ms"] <= 0:
+            continue
+        variacao = atual["media_ms"] / anterior["media_ms"] - 1
+        atual["variacao"] = round(variacao, 3)
+        if variacao > limite:
+            regressoes.append((etapa, anterior["media_ms"], atual["media_ms"], variacao))
+    return regressoes
+
+
+def imprimir(resultado: dict):
+    meta = resultado["meta"]
+    print("=" * 78)
+    print(f"  BENCHMARK - {meta['arquivos']} templates x {meta['repeticoes']} repetições "
+          f"(conversor: {meta['conversor']})")
+    print("=" * 78)
+    print(f"{'Etapa':<20}{'média ms':>12}{'p95 ms':>12}{'máx ms':>12}{'pico KB':>12}{'variação':>10}")
+    for etapa, r in resultado["etapas"].items():
+        variacao = f"{r['variacao']:+.0%}" if "variacao" in r else "-"
+        print(f"{etapa:<20}{r['media_ms']:>12.2f}{r['p95_ms']:>12.2f}{r['max_ms']:>12.2f}"
+              f"{r['pico_memoria_kb']:>12.1f}{variacao:>10}")
+    print(f"\nRSS máximo do processo: {meta['rss_max_kb'] / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de relatórios")
+    parser.add_argument("--repeticoes", type=int, default=5, help="passadas por template (padrão: 5)")
+    parser.add_argument("--conversor", choices=("auto", "libreoffice", "stub"), default="auto",
+                        help="auto usa o LibreOffice se encontrado, senão o stub")
+    parser.add_argument("--arquivo", action="append", help="limita a um ou mais templates")
+    parser.add_argument("--saida", type=Path, help="grava o resultado em JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON de um resultado anterior para comparar")
+    parser.add_argument("--limite", type=float, default=0.2,
+                        help="regressão tolerada sobre o baseline (padrão: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Os logs por etapa do pipeline poluiriam a saída e pesariam nas medições
+    logging.disable(logging.INFO)
+
+    conversor = args.conversor
+    if conversor == "auto":
+        conversor = "libreoffice" if shutil.which(app.LIBREOFFICE_BIN) else "stub"
+
+    arquivos = args.arquivo or [
+        a for a in app.ARQUIVOS_VALIDOS
+        if app.templates_compilados.resolver(a).exists() and (app.CORPOS_PDF_DIR / f"{a}.pdf").exists()
+    ]
+    if not arquivos:
+        print("✗ Nenhum template/corpo encontrado")
+        return 2
+
+    resultado = rodar(args.repeticoes, conversor, arquivos)
+
+    regressoes = []
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressoes = comparar(resultado, baseline, args.limite)
+
+    imprimir(resultado)
+
+    if args.saida:
+        args.saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ Resultado salvo em {args.saida}")
+
+    if regressoes:
+        print(f"\n✗ {len(regressoes)} etapa(s) acima do limite de {args.limite:.0%}:")
+        for etapa, anterior, atual, variacao in regressoes:
+            print(f"  ✗ {etapa}: {anterior:.2f} ms → {atual:.2f} ms ({variacao:+.0%})")
+        return 1
+
+    if args.baseline:
+        print(f"\n✓ Nenhuma regressão acima de {args.limite:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Cache endereçado por conteúdo para capas e relatórios finais
+
+Dois níveis: LRU em memória (bytes) e armazenamento em disco com limite de
+tamanho. As chaves combinam o hash da requisição (JSON canônico, com os
+valores exatamente como são renderizados) com os checksums dos arquivos de
+template/corpo, então editar um template invalida as entradas.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_checksums = {}
+_checksums_lock = threading.Lock()
+
+
+def checksum_arquivo(caminho: Path) -> str:
+    """SHA-256 do arquivo, memorizado enquanto mtime e tamanho não mudarem"""
+    info = caminho.stat()
+    assinatura = (info.st_mtime_ns, info.st_size)
+
+    with _checksums_lock:
+        memorizado = _checksums.get(caminho)
+    if memorizado and memorizado[0] == assinatura:
+        return memorizado[1]
+
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloco)
+    digest = sha.hexdigest()
+
+    with _checksums_lock:
+        _checksums[caminho] = (assinatura, digest)
+    return digest
+
+
+# Muda quando o que entra na chave muda, invalidando as entradas antigas
+VERSAO_CHAVE = "2"
+
+
+def chave_relatorio(tipo: str, dados: dict, *arquivos: Path) -> str:
+    """Chave do cache: tipo + requisição + checksums dos arquivos
+
+    Os valores entram como estão: o documento usa o nome do participante cru, então
+    "Ana  Silva" e "Ana Silva" são relatórios diferentes.
+    """
+    sha = hashlib.sha256()
+    sha.update(VERSAO_CHAVE.encode())
+    sha.update(tipo.encode())
+    sha.update(json.dumps(dados, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode())
+    for arquivo in arquivos:
+        sha.update(checksum_arquivo(arquivo).encode())
+    return sha.hexdigest()
+
+
+class CacheRelatorios:
+    """Cache de PDFs em dois níveis (memória LRU + disco)"""
+
+    def __init__(self, diretorio: Path, max_memoria_bytes: int, max_disco_bytes: int):
+        self.diretorio = diretorio
+        self.max_memoria_bytes = max_memoria_bytes
+        self.max_disco_bytes = max_disco_bytes
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.pdf"
+
+    def _guardar_memoria(self, chave: str, conteudo: bytes):
+        if len(conteudo) > self.max_memoria_bytes:
+            return
+        with self._lock:
+            antigo = self._memoria.pop(chave, None)
+            if antigo is not None:
+                self._bytes_memoria -= len(antigo)
+            self._memoria[chave] = conteudo
+            self._bytes_memoria += len(conteudo)
+            while self._bytes_memoria > self.max_memoria_bytes:
+                _, removido = self._memoria.popitem(last=False)
+                self._bytes_memoria -= len(removido)
+
+    def restaurar(self, chave: str, destino: Path) -> bool:
+        """Grava a entrada em destino; retorna False em caso de miss"""
+        with self._lock:
+            conteudo = self._memoria.get(chave)
+            if conteudo is not None:
+                self._memoria.move_to_end(chave)
+                self.hits_memoria += 1
+
+        if conteudo is None:
+            caminho = self._caminho(chave)
+            try:
+                conteudo = caminho.read_bytes()
+                os.utime(caminho)
+            except FileNotFoundError:
+                with self._lock:
+                    self.misses += 1
+                return False
+            with self._lock:
+                self.hits_disco += 1
+            self._guardar_memoria(chave, conteudo)
+
+        destino.write_bytes(conteudo)
+        return True
+
+    def guardar(self, chave: str, origem: Path):
+        """Armazena o arquivo nos dois níveis"""
+        conteudo = origem.read_bytes()
+        self._guardar_memoria(chave, conteudo)
+
+        caminho = self._caminho(chave)
+        temporario = caminho.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, caminho)
+        self._limitar_disco()
+
+    def _limitar_disco(self):
+        entradas = []
+        total = 0
+        for caminho in self.diretorio.glob("*.pdf"):
+            try:
+                info = caminho.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, caminho))
+            total += info.st_size
+
+        if total <= self.max_disco_bytes:
+            return
+
+        # Remove as entradas menos usadas recentemente (mtime atualizado a cada hit)
+        for _, tamanho, caminho in sorted(entradas):
+            caminho.unlink(missing_ok=True)
+            total -= tamanho
+            if total <= self.max_disco_bytes:
+                break
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            hits = self.hits_memoria + self.hits_disco
+            return {
+                "hits": hits,
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "entradas_memoria": len(self._memoria),
+                "bytes_memoria": self._bytes_memoria,
+            }
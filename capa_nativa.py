@@ -0,0 +1,150 @@
+"""
+Renderizador nativo da capa em PDF (sem DOCX nem LibreOffice)
+
+Desenha a mesma página descrita por gerar_html_capa usando ReportLab, com
+DejaVu Sans embutida e o logo de assets/. Opcional: se o ReportLab não
+estiver instalado, a API continua usando o caminho DOCX + LibreOffice.
+
+O ReportLab só é importado ao desenhar a primeira capa, para não pesar na
+subida dos processos que nunca usam o motor nativo.
+"""
+
+import importlib.util
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+REPORTLAB_DISPONIVEL = importlib.util.find_spec("reportlab") is not None
+
+FONTES_DIR = Path(os.getenv("FONTES_DIR", "/usr/share/fonts/truetype/dejavu"))
+
+# Margens dos templates em pontos: 3cm (esquerda/direita), 2.5cm (superior/inferior)
+MARGEM_X = 3 * 72 / 2.54
+MARGEM_Y = 2.5 * 72 / 2.54
+
+_recursos = {}
+
+
+def motor_nativo_disponivel() -> bool:
+    """ReportLab instalado e DejaVu Sans encontrada"""
+    return REPORTLAB_DISPONIVEL and (FONTES_DIR / "DejaVuSans.ttf").exists()
+
+
+def _registrar_fontes():
+    if "fontes" in _recursos:
+        return _recursos["fontes"]
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont("DejaVuSans", str(FONTES_DIR / "DejaVuSans.ttf")))
+    pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", str(FONTES_DIR / "DejaVuSans-Bold.ttf")))
+
+    # Itálico vem do pacote fonts-dejavu-extra; sem ele o rodapé usa a regular
+    italico = FONTES_DIR / "DejaVuSans-Oblique.ttf"
+    if italico.exists():
+        pdfmetrics.registerFont(TTFont("DejaVuSans-Oblique", str(italico)))
+        fonte_italico = "DejaVuSans-Oblique"
+    else:
+        fonte_italico = "DejaVuSans"
+
+    _recursos["fontes"] = ("DejaVuSans", "DejaVuSans-Bold", fonte_italico)
+    return _recursos["fontes"]
+
+
+def _logo(logo_path: Path):
+    """Logo reduzido uma única vez (o PNG original tem 1080px)"""
+    if "logo" not in _recursos:
+        imagem = None
+        if logo_path.exists():
+            try:
+                from PIL import Image
+                from reportlab.lib.utils import ImageReader
+
+                with Image.open(logo_path) as original:
+                    reduzida = original.convert("RGB")
+                    reduzida.thumbnail((240, 240))
+                imagem = ImageReader(reduzida)
+            except Exception as e:
+                logger.warning(f"⚠ Logo não carregado: {e}")
+        _recursos["logo"] = imagem
+    return _recursos["logo"]
+
+
+def renderizar_capa_pdf(output_path: Path, participante: str, linhas_tabela, predominante: str,
+                        menos_desenvolvido: str, descricoes, logo_path: Path):
+    """Gera a capa diretamente em PDF"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Paragraph
+
+    regular, negrito, italico = _registrar_fontes()
+    largura, altura = A4
+    largura_util = largura - 2 * MARGEM_X
+
+    estilo_texto = ParagraphStyle("texto", fontName=regular, fontSize=12, leading=14)
+    estilo_rodape = ParagraphStyle("rodape", parent=estilo_texto, fontName=italico)
+
+    c = canvas.Canvas(str(output_path), pagesize=A4)
+    c.setTitle("Relatório de Perfil de Escuta e Comunicação")
+    y = altura - MARGEM_Y
+
+    def paragrafo(texto, estilo=estilo_texto, espaco_antes=8):
+        nonlocal y
+        p = Paragraph(texto, estilo)
+        _, h = p.wrap(largura_util, altura)
+        y -= espaco_antes + h
+        p.drawOn(c, MARGEM_X, y)
+
+    logo = _logo(logo_path)
+    if logo is not None:
+        tamanho = 60
+        y -= tamanho
+        c.drawImage(logo, (largura - tamanho) / 2, y, tamanho, tamanho)
+
+    y -= 34
+    c.setFont(negrito, 14)
+    c.drawCentredString(largura / 2, y, "Relatório de Perfil de Escuta e Comunicação")
+
+    y -= 14
+    paragrafo(f"<font name='{negrito}'>Participante:</font> {_escapar(participante)}", espaco_antes=18)
+
+    y -= 32
+    c.setFont(negrito, 12)
+    c.drawString(MARGEM_X, y, "Resultado geral")
+
+    # Tabela sem bordas: estilo à esquerda, pontuação centralizada em 100pt
+    centro_pontuacao = largura - MARGEM_X - 50
+    y -= 26
+    c.drawString(MARGEM_X, y, "Estilo de escuta")
+    c.drawCentredString(centro_pontuacao, y, "Pontuação")
+    y -= 5
+    c.setFont(regular, 12)
+    for nome, pontuacao in linhas_tabela:
+        y -= 16
+        c.drawString(MARGEM_X, y, nome)
+        c.drawCentredString(centro_pontuacao, y, str(pontuacao))
+
+    y -= 12
+    paragrafo(f"<font name='{negrito}'>Estilo predominante:</font> {_escapar(predominante)}", espaco_antes=14)
+    paragrafo(f"<font name='{negrito}'>Estilo menos desenvolvido:</font> {_escapar(menos_desenvolvido)}")
+
+    y -= 32
+    c.setFont(negrito, 12)
+    c.drawString(MARGEM_X, y, "Descrição geral dos 4 estilos:")
+
+    for titulo, texto in descricoes:
+        paragrafo(f"<font name='{negrito}'>{_escapar(titulo)}:</font> {_escapar(texto)}", espaco_antes=12)
+
+    paragrafo("Essas informações serão aprofundadas no relatório anexo.", estilo_rodape, espaco_antes=25)
+
+    c.showPage()
+    c.save()
+    return True
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
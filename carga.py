@@ -0,0 +1,325 @@
+"""
+Gerador de carga e replay de tráfego contra a API em execução
+
+Dispara requisições em /gerar-relatorio, /gerar-relatorio-completo e
+/gerar-html-email e reporta vazão, latência p50/p95/p99 e taxa de erros por
+endpoint. Três modos:
+
+    fechado   N clientes simultâneos, cada um enviando a próxima requisição
+              assim que recebe a resposta (--concorrencia)
+    aberto    chegadas a uma taxa fixa, independente das respostas (--taxa),
+              espaçadas igualmente ou com intervalos exponenciais (--poisson)
+    replay    repete um JSONL capturado respeitando os intervalos originais
+              (--replay, acelerado ou não por --velocidade)
+
+Uso:
+    python carga.py --endpoint relatorio --concorrencia 8 --requisicoes 200
+    python carga.py --endpoint completo --endpoint html --taxa 5 --duracao 60
+    python carga.py --replay captura.jsonl --velocidade 2 --saida carga.json
+
+No replay, cada linha é um objeto com "ts" (epoch em segundos ou ISO 8601),
+"caminho" e opcionalmente "corpo" (o JSON enviado). As linhas de resumo do
+LOG_FORMATO=json servem como estão; sem "corpo", usa-se um corpo sintético.
+
+Para medir só o lado Python, suba a API com o conversor falso
+(libreoffice_falso.py):
+
+    LIBREOFFICE_BIN=./libreoffice_falso.py LIBREOFFICE_POOL_TAMANHO=0 \\
+        LIBREOFFICE_FALSO_LATENCIA_S=0.8 python app.py
+
+Requer httpx (pip install httpx), usado só aqui.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from pontuacao import ARQUIVOS
+
+ENDPOINTS = {
+    "relatorio": "/gerar-relatorio",
+    "completo": "/gerar-relatorio-completo",
+    "html": "/gerar-html-email",
+}
+CAMINHOS_ACEITOS = set(ENDPOINTS.values())
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p * len(ordenados)) - 1)]
+
+
+def corpo_sintetico(indice: int, repetir: bool = False, semente: int = 0) -> dict:
+    """Requisição válida e determinística para o índice (todas iguais com repetir)"""
+    if repetir:
+        indice = 0
+    sorteio = random.Random(f"{semente}-{indice}")
+    chave, arquivo = list(ARQUIVOS.items())[indice % len(ARQUIVOS)]
+    predominante, menos = chave.split("-")
+    return {
+        "participante": f"Participante Carga {semente}-{indice:06d}",
+        "pontuacoes": {estilo: sorteio.randint(10, 60) for estilo in ("PESSOAS", "ACAO", "TEMPO", "MENSAGEM")},
+        "predominante": predominante,
+        "menosDesenvolvido": menos,
+        "arquivo": arquivo,
+    }
+
+
+def _instante(valor) -> float:
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).timestamp()
+
+
+def ler_replay(caminho: Path, repetir: bool, semente: int) -> list:
+    """[(deslocamento em s, caminho, corpo)] das linhas do JSONL com endpoint de geração"""
+    eventos = []
+    with open(caminho, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+                endpoint = registro.get("caminho") or registro.get("endpoint")
+                endpoint = ENDPOINTS.get(endpoint, endpoint)
+                if endpoint not in CAMINHOS_ACEITOS or registro.get("metodo", "POST") != "POST":
+                    continue
+                instante = _instante(registro["ts"])
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠ {caminho.name}:{numero} ignorada ({e})")
+                continue
+            corpo = registro.get("corpo") or corpo_sintetico(len(eventos), repetir, semente)
+            eventos.append((instante, endpoint, corpo))
+
+    eventos.sort(key=lambda evento: evento[0])
+    if not eventos:
+        return []
+    inicio = eventos[0][0]
+    return [(instante - inicio, endpoint, corpo) for instante, endpoint, corpo in eventos]
+
+
+class Resultados:
+    def __init__(self):
+        self.amostras = []
+
+    def registrar(self, endpoint: str, status, latencia: float, tamanho: int):
+        self.amostras.append((endpoint, status, latencia, tamanho))
+
+    def _resumir(self, amostras, duracao: float) -> dict:
+        latencias = [latencia for _, status, latencia, _ in amostras if status == 200]
+        por_status = {}
+        for _, status, _, _ in amostras:
+            por_status[str(status)] = por_status.get(str(status), 0) + 1
+        erros = len(amostras) - len(latencias)
+        resumo = {
+            "requisicoes": len(amostras),
+            "sucesso": len(latencias),
+            "taxa_erros": round(erros / len(amostras), 4) if amostras else 0.0,
+            "vazao_rps": round(len(latencias) / duracao, 3) if duracao > 0 else 0.0,
+            "por_status": por_status,
+            "bytes_medio": round(statistics.fmean(t for *_, t in amostras)) if amostras else 0,
+        }
+        if latencias:
+            resumo.update({
+                "p50_ms": round(percentil(latencias, 0.50) * 1000, 1),
+                "p95_ms": round(percentil(latencias, 0.95) * 1000, 1),
+                "p99_ms": round(percentil(latencias, 0.99) * 1000, 1),
+                "max_ms": round(max(latencias) * 1000, 1),
+            })
+        return resumo
+
+    def resumo(self, duracao: float) -> dict:
+        endpoints = sorted({endpoint for endpoint, *_ in self.amostras})
+        resumo = {
+            endpoint: self._resumir([a for a in self.amostras if a[0] == endpoint], duracao)
+            for endpoint in endpoints
+        }
+        resumo["total"] = self._resumir(self.amostras, duracao)
+        return resumo
+
+
+async def enviar(cliente, endpoint: str, corpo: dict, resultados: Resultados):
+    inicio = time.perf_counter()
+    try:
+        resposta = await cliente.post(endpoint, json=corpo)
+        status, tamanho = resposta.status_code, len(resposta.content)
+    except Exception as e:
+        # Timeout, conexão recusada etc. entram como erro com o nome da exceção
+        status, tamanho = type(e).__name__, 0
+    resultados.registrar(endpoint, status, time.perf_counter() - inicio, tamanho)
+
+
+def gerador_requisicoes(endpoints, repetir: bool, semente: int):
+    indice = 0
+    while True:
+        yield ENDPOINTS[endpoints[indice % len(endpoints)]], corpo_sintetico(indice, repetir, semente)
+        indice += 1
+
+
+async def carga_fechada(cliente, requisicoes, concorrencia: int, total, fim, resultados):
+    restantes = [total]
+
+    async def cliente_virtual():
+        while time.monotonic() < fim:
+            if restantes[0] is not None:
+                if restantes[0] <= 0:
+                    return
+                restantes[0] -= 1
+            endpoint, corpo = next(requisicoes)
+            await enviar(cliente, endpoint, corpo, resultados)
+
+    await asyncio.gather(*(cliente_virtual() for _ in range(concorrencia)))
+
+
+async def disparar_agendadas(cliente, agenda, max_abertas: int, resultados):
+    """Envia cada (deslocamento, endpoint, corpo) no seu instante, sem esperar as anteriores"""
+    vagas = asyncio.Semaphore(max_abertas)
+    tarefas = []
+    inicio = time.monotonic()
+
+    async def uma(endpoint, corpo):
+        try:
+            await enviar(cliente, endpoint, corpo, resultados)
+        finally:
+            vagas.release()
+
+    for deslocamento, endpoint, corpo in agenda:
+        atraso = inicio + deslocamento - time.monotonic()
+        if atraso > 0:
+            await asyncio.sleep(atraso)
+        await vagas.acquire()
+        tarefas.append(asyncio.create_task(uma(endpoint, corpo)))
+    await asyncio.gather(*tarefas)
+
+
+def agenda_aberta(requisicoes, taxa: float, total, duracao, poisson: bool, semente: int):
+    sorteio = random.Random(semente)
+    deslocamento = 0.0
+    enviadas = 0
+    while (total is None or enviadas < total) and (duracao is None or deslocamento < duracao):
+        endpoint, corpo = next(requisicoes)
+        yield deslocamento, endpoint, corpo
+        enviadas += 1
+        deslocamento += sorteio.expovariate(taxa) if poisson else 1 / taxa
+
+
+async def rodar(args) -> dict:
+    import httpx
+
+    resultados = Resultados()
+    limites = httpx.Limits(max_connections=max(args.concorrencia, args.max_abertas))
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limites) as cliente:
+        requisicoes = gerador_requisicoes(args.endpoint, args.repetir, args.semente)
+
+        for _ in range(args.aquecimento):
+            endpoint, corpo = next(requisicoes)
+            await enviar(cliente, endpoint, corpo, Resultados())
+
+        inicio = time.monotonic()
+        if args.replay:
+            agenda = [
+                (deslocamento / args.velocidade, endpoint, corpo)
+                for deslocamento, endpoint, corpo in ler_replay(args.replay, args.repetir, args.semente)
+            ]
+            await disparar_agendadas(cliente, agenda, args.max_abertas, resultados)
+            modo = "replay"
+        elif args.taxa:
+            agenda = agenda_aberta(requisicoes, args.taxa, args.requisicoes, args.duracao, args.poisson, args.semente)
+            await disparar_agendadas(cliente, agenda, args.max_abertas, resultados)
+            modo = "aberto"
+        else:
+            fim = inicio + args.duracao if args.duracao else math.inf
+            await carga_fechada(cliente, requisicoes, args.concorrencia, args.requisicoes, fim, resultados)
+            modo = "fechado"
+        duracao = time.monotonic() - inicio
+
+    return {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "url": args.url,
+            "modo": modo,
+            "concorrencia": args.concorrencia if modo == "fechado" else None,
+            "taxa": args.taxa if modo == "aberto" else None,
+            "replay": str(args.replay) if args.replay else None,
+            "duracao_s": round(duracao, 3),
+        },
+        "endpoints": resultados.resumo(duracao),
+    }
+
+
+def imprimir(resultado: dict):
+    meta = resultado["meta"]
+    print("=" * 94)
+    print(f"  CARGA ({meta['modo']}) em {meta['url']} - {meta['duracao_s']:.1f}s")
+    print("=" * 94)
+    print(f"{'Endpoint':<28}{'req':>7}{'erros':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    for endpoint, r in resultado["endpoints"].items():
+        print(f"{endpoint:<28}{r['requisicoes']:>7}{r['taxa_erros']:>8.1%}{r['vazao_rps']:>9.2f}"
+              f"{r.get('p50_ms', 0):>10.1f}{r.get('p95_ms', 0):>10.1f}{r.get('p99_ms', 0):>10.1f}{r.get('max_ms', 0):>10.1f}")
+    falhas = {s: n for s, n in resultado["endpoints"]["total"]["por_status"].items() if s != "200"}
+    if falhas:
+        print("\nRespostas sem sucesso: " + ", ".join(f"{s}: {n}" for s, n in sorted(falhas.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga e replay de tráfego para a API")
+    parser.add_argument("--url", default="http://localhost:3344", help="endereço da API (padrão: %(default)s)")
+    parser.add_argument("--endpoint", action="append", choices=tuple(ENDPOINTS),
+                        help="endpoint a exercitar, alternados se repetido (padrão: relatorio)")
+    parser.add_argument("--concorrencia", type=int, default=4, help="clientes simultâneos no modo fechado")
+    parser.add_argument("--taxa", type=float, help="chegadas por segundo (modo aberto)")
+    parser.add_argument("--poisson", action="store_true", help="intervalos exponenciais no modo aberto")
+    parser.add_argument("--semente", type=int, default=0,
+                        help="semente dos corpos sintéticos e dos intervalos; mude-a para não repetir participantes")
+    parser.add_argument("--requisicoes", type=int, help="total de requisições")
+    parser.add_argument("--duracao", type=float, help="duração máxima (s)")
+    parser.add_argument("--replay", type=Path, help="JSONL capturado a repetir com o tempo original")
+    parser.add_argument("--velocidade", type=float, default=1.0, help="fator de aceleração do replay")
+    parser.add_argument("--max-abertas", type=int, default=256,
+                        help="requisições em voo no modo aberto/replay (padrão: %(default)s)")
+    parser.add_argument("--aquecimento", type=int, default=0, help="requisições não contabilizadas antes da medição")
+    parser.add_argument("--repetir", action="store_true",
+                        help="a mesma requisição em todas (exercita cache e deduplicação)")
+    parser.add_argument("--timeout", type=float, default=120, help="timeout por requisição (s)")
+    parser.add_argument("--saida", type=Path, help="grava o resultado em JSON")
+    parser.add_argument("--max-erros", type=float, help="código de saída 1 se a taxa de erros passar disso (0-1)")
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("✗ httpx não instalado: pip install httpx")
+        return 2
+
+    args.endpoint = args.endpoint or ["relatorio"]
+    if not args.replay and args.requisicoes is None and args.duracao is None:
+        args.requisicoes = 100
+    if (args.taxa is not None and args.taxa <= 0) or args.velocidade <= 0:
+        parser.error("--taxa e --velocidade devem ser positivos")
+
+    resultado = asyncio.run(rodar(args))
+    if not resultado["endpoints"]["total"]["requisicoes"]:
+        print("✗ Nenhuma requisição enviada")
+        return 2
+    imprimir(resultado)
+
+    if args.saida:
+        args.saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ Resultado salvo em {args.saida}")
+
+    taxa_erros = resultado["endpoints"]["total"]["taxa_erros"]
+    if args.max_erros is not None and taxa_erros > args.max_erros:
+        print(f"\n✗ Taxa de erros {taxa_erros:.1%} acima de {args.max_erros:.1%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Compilação dos templates DOCX da capa (templates/compilados)
+
+Para cada um dos 12 arquivos válidos, verifica se o template tem todos os
+campos que a capa preenche, aplica a normalização (DejaVu Sans 12pt, sem
+realce) e reamostra imagens embutidas maiores que o necessário para o
+tamanho em que aparecem na página. O resultado vai para
+templates/compilados/<arquivo>.docx, com um manifest.json que liga cada
+arquivo ao template de origem e aos checksums dos dois.
+
+Na API, o template compilado substitui o original enquanto os checksums
+baterem; em runtime sobram só as edições por participante.
+
+Uso:
+    python compilar_templates.py               # compila o que mudou
+    python compilar_templates.py --forcar      # recompila tudo
+    python compilar_templates.py --verificar   # só confere o manifest (código 1 se inválido)
+"""
+
+import argparse
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from cache_relatorios import checksum_arquivo
+from pontuacao import ARQUIVOS
+from templates_docx import TemplatesCompilados, campos_ausentes, normalizar_template
+
+BASE_DIR = Path(__file__).parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+COMPILADOS_DIR = TEMPLATES_DIR / "compilados"
+MANIFESTO = "manifest.json"
+
+EMU_POR_POLEGADA = 914400
+DPI_MAXIMO = 300
+
+
+def tamanhos_exibidos(doc) -> dict:
+    """Maior tamanho exibido (cx, cy em EMU) de cada imagem do pacote"""
+    tamanhos = {}
+    for parte in doc.part.package.iter_parts():
+        elemento = getattr(parte, "_element", None)
+        if elemento is None:
+            continue
+        for desenho in elemento.xpath(".//wp:inline | .//wp:anchor"):
+            extensao = desenho.find(qn("wp:extent"))
+            if extensao is None:
+                continue
+            cx, cy = int(extensao.get("cx")), int(extensao.get("cy"))
+            for rid in desenho.xpath(".//a:blip/@r:embed"):
+                imagem = parte.related_parts.get(rid)
+                if imagem is None:
+                    continue
+                anterior = tamanhos.get(imagem, (0, 0))
+                tamanhos[imagem] = (max(anterior[0], cx), max(anterior[1], cy))
+    return tamanhos
+
+
+def reduzir_imagens(doc, dpi_maximo: int = DPI_MAXIMO) -> list:
+    """Reamostra imagens acima de dpi_maximo no tamanho exibido; (nome, bytes antes, depois)"""
+    from PIL import Image
+
+    reduzidas = []
+    for imagem, (cx, cy) in tamanhos_exibidos(doc).items():
+        original = imagem.blob
+        with Image.open(io.BytesIO(original)) as img:
+            formato = img.format
+            largura = round(cx / EMU_POR_POLEGADA * dpi_maximo)
+            altura = round(cy / EMU_POR_POLEGADA * dpi_maximo)
+            if formato not in ("PNG", "JPEG") or not largura or img.width <= largura:
+                continue
+
+            buffer = io.BytesIO()
+            reduzida = img.resize((largura, altura), Image.LANCZOS)
+            if formato == "PNG":
+                reduzida.save(buffer, "PNG", optimize=True, dpi=(dpi_maximo, dpi_maximo))
+            else:
+                reduzida.save(buffer, "JPEG", quality=85, optimize=True, dpi=(dpi_maximo, dpi_maximo))
+
+        novo = buffer.getvalue()
+        if len(novo) < len(original):
+            imagem._blob = novo
+            reduzidas.append((imagem.partname, len(original), len(novo)))
+    return reduzidas
+
+
+def compilar(origem: Path, destino: Path, dpi_maximo: int) -> list:
+    """Grava em destino o template normalizado; levanta ValueError se faltar campo"""
+    doc = Document(origem)
+    faltando = campos_ausentes(doc)
+    if faltando:
+        raise ValueError(f"campos ausentes: {', '.join(faltando)}")
+
+    normalizar_template(doc)
+    reduzidas = reduzir_imagens(doc, dpi_maximo)
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=destino.parent, suffix=".tmp", delete=False) as tmp:
+        temporario = Path(tmp.name)
+    try:
+        doc.save(temporario)
+        temporario.replace(destino)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+    return reduzidas
+
+
+def carregar_manifesto() -> dict:
+    try:
+        return json.loads((COMPILADOS_DIR / MANIFESTO).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def verificar() -> int:
+    invalidos = TemplatesCompilados(TEMPLATES_DIR, COMPILADOS_DIR).verificar(ARQUIVOS.values())
+    for arquivo in invalidos:
+        print(f"✗ {arquivo}: sem template compilado válido")
+    if invalidos:
+        return 1
+    print(f"✓ {len(ARQUIVOS)} templates compilados e válidos")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila os templates DOCX da capa")
+    parser.add_argument("--forcar", action="store_true", help="recompila mesmo sem mudança no original")
+    parser.add_argument("--verificar", action="store_true", help="só confere o manifest")
+    parser.add_argument("--dpi", type=int, default=DPI_MAXIMO,
+                        help=f"resolução máxima das imagens no tamanho exibido (padrão: {DPI_MAXIMO})")
+    args = parser.parse_args()
+
+    if args.verificar:
+        return verificar()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("✗ Pillow não instalado: pip install pillow")
+        return 2
+
+    manifesto = carregar_manifesto()
+    falhas = 0
+
+    for arquivo in ARQUIVOS.values():
+        origem = TEMPLATES_DIR / f"{arquivo}.docx"
+        destino = COMPILADOS_DIR / f"{arquivo}.docx"
+        if not origem.exists():
+            print(f"✗ {arquivo}: template não encontrado")
+            manifesto.pop(arquivo, None)
+            falhas += 1
+            continue
+
+        sha_origem = checksum_arquivo(origem)
+        entrada = manifesto.get(arquivo)
+        if (
+            not args.forcar and entrada and entrada["origem_sha256"] == sha_origem
+            and entrada.get("dpi_maximo") == args.dpi
+            and destino.exists() and checksum_arquivo(destino) == entrada["sha256"]
+        ):
+            print(f"✓ {arquivo}: sem mudança")
+            continue
+
+        try:
+            reduzidas = compilar(origem, destino, args.dpi)
+        except Exception as e:
+            print(f"✗ {arquivo}: {e}")
+            manifesto.pop(arquivo, None)
+            falhas += 1
+            continue
+
+        entrada = manifesto[arquivo] = {
+            "origem": origem.name,
+            "origem_sha256": sha_origem,
+            "origem_bytes": origem.stat().st_size,
+            "sha256": checksum_arquivo(destino),
+            "bytes": destino.stat().st_size,
+            "dpi_maximo": args.dpi,
+        }
+        print(f"✓ {arquivo}: {entrada['origem_bytes'] / 1024:.0f} KB → {entrada['bytes'] / 1024:.0f} KB")
+        for nome, antes, depois in reduzidas:
+            print(f"    {nome}: {antes / 1024:.0f} KB → {depois / 1024:.0f} KB")
+
+    for arquivo in set(manifesto) - set(ARQUIVOS.values()):
+        del manifesto[arquivo]
+
+    COMPILADOS_DIR.mkdir(parents=True, exist_ok=True)
+    (COMPILADOS_DIR / MANIFESTO).write_text(
+        json.dumps(manifesto, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+    )
+
+    # Arquivos em templates/ que nenhum dos 12 relatórios usa
+    usados = {f"{arquivo}.docx" for arquivo in ARQUIVOS.values()} | {"email_capa.html", "README.md"}
+    for extra in sorted(p.name for p in TEMPLATES_DIR.iterdir() if p.is_file()):
+        if extra not in usados:
+            print(f"⚠ {extra}: não usado por nenhum relatório")
+
+    if falhas:
+        print(f"✗ {falhas} template(s) não compilados")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Compressão das respostas JSON e HTML (gzip ou brotli)
+
+Middleware ASGI que negocia a codificação pelo Accept-Encoding e comprime só
+respostas textuais (JSON, NDJSON, HTML). PDFs binários e multipart passam
+intactos. Respostas em streaming são comprimidas bloco a bloco, sem acumular
+o corpo inteiro. Brotli é opcional: sem o pacote, apenas gzip é oferecido.
+
+Corpos e blocos acima de LIMITE_NO_LOOP (o JSON com pdf_base64 tem vários MB)
+são comprimidos em uma thread, para não travar o event loop. Toda resposta
+de tipo comprimível leva Vary: Accept-Encoding, mesmo quando sai sem
+compressão (corpo pequeno, cliente sem gzip/br), para caches compartilhados
+não servirem uma variante ao cliente que negociou a outra.
+"""
+
+import asyncio
+import gzip
+import zlib
+
+try:
+    import brotli
+    BROTLI_DISPONIVEL = True
+except ImportError:
+    BROTLI_DISPONIVEL = False
+
+TIPOS_COMPRIMIVEIS = ("application/json", "application/x-ndjson", "text/html", "text/plain")
+LIMITE_NO_LOOP = 64 * 1024
+
+
+def escolher_codificacao(accept_encoding: str):
+    """Codificação aceita pelo cliente com o maior q: "br", "gzip" ou None
+
+    A preferência do servidor (brotli antes de gzip) só desempata q iguais.
+    """
+    aceitas = {}
+    for item in accept_encoding.lower().split(","):
+        nome, *parametros = item.split(";")
+        qualidade = 1.0
+        for parametro in parametros:
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    qualidade = float(valor)
+                except ValueError:
+                    qualidade = 0.0
+        if nome.strip():
+            aceitas[nome.strip()] = qualidade
+
+    oferecidas = ("br", "gzip") if BROTLI_DISPONIVEL else ("gzip",)
+    escolhida, maior = None, 0.0
+    for codificacao in oferecidas:
+        qualidade = aceitas.get(codificacao, aceitas.get("*", 0.0))
+        if qualidade > maior:
+            escolhida, maior = codificacao, qualidade
+    return escolhida
+
+
+class _Compressor:
+    def __init__(self, codificacao: str, nivel_gzip: int, qualidade_brotli: int):
+        if codificacao == "br":
+            self._br = brotli.Compressor(quality=qualidade_brotli)
+            self._zlib = None
+        else:
+            self._br = None
+            self._zlib = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def bloco(self, dados: bytes) -> bytes:
+        """Comprime e descarrega o bloco, para o cliente receber o stream progressivamente"""
+        if self._br is not None:
+            return self._br.process(dados) + self._br.flush()
+        return self._zlib.compress(dados) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._zlib.flush()
+
+
+def _com_vary(headers: list, remover=()) -> list:
+    """Headers com Accept-Encoding somado ao Vary (e sem os nomes em `remover`)"""
+    vary = None
+    novos = []
+    for nome, valor in headers:
+        if nome.lower() == b"vary":
+            vary = valor
+        elif nome.lower() not in remover:
+            novos.append((nome, valor))
+    if vary is None:
+        novos.append((b"vary", b"Accept-Encoding"))
+    elif b"accept-encoding" in vary.lower():
+        novos.append((b"vary", vary))
+    else:
+        novos.append((b"vary", vary + b", Accept-Encoding"))
+    return novos
+
+
+class CompressaoMiddleware:
+    def __init__(self, app, minimo_bytes: int = 500, nivel_gzip: int = 6, qualidade_brotli: int = 5):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+
+    def _comprimir(self, codificacao: str, corpo: bytes) -> bytes:
+        if codificacao == "gzip":
+            return gzip.compress(corpo, self.nivel_gzip)
+        return brotli.compress(corpo, quality=self.qualidade_brotli)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for nome, valor in scope["headers"]:
+            if nome == b"accept-encoding":
+                accept_encoding = valor.decode("latin-1")
+                break
+
+        codificacao = escolher_codificacao(accept_encoding)
+        inicio = None
+        compressor = None
+        repassar = False
+
+        async def enviar(mensagem):
+            nonlocal inicio, compressor, repassar
+
+            if mensagem["type"] == "http.response.start":
+                inicio = mensagem
+                return
+
+            if mensagem["type"] != "http.response.body" or repassar:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+
+            if compressor is None:
+                headers = {nome.lower(): valor for nome, valor in inicio["headers"]}
+                tipo = headers.get(b"content-type", b"").decode("latin-1")
+                comprimivel = b"content-encoding" not in headers and tipo.startswith(TIPOS_COMPRIMIVEIS)
+                if not comprimivel or codificacao is None or (not mais and len(corpo) < self.minimo_bytes):
+                    repassar = True
+                    await send({**inicio, "headers": _com_vary(inicio["headers"])} if comprimivel else inicio)
+                    await send(mensagem)
+                    return
+
+                compressor = _Compressor(codificacao, self.nivel_gzip, self.qualidade_brotli)
+                novos_headers = _com_vary(inicio["headers"], remover=(b"content-length",))
+                novos_headers.append((b"content-encoding", codificacao.encode()))
+
+                if not mais:
+                    # Corpo completo em uma mensagem: comprime de uma vez, com Content-Length
+                    if len(corpo) > LIMITE_NO_LOOP:
+                        comprimido = await asyncio.to_thread(self._comprimir, codificacao, corpo)
+                    else:
+                        comprimido = self._comprimir(codificacao, corpo)
+                    novos_headers.append((b"content-length", str(len(comprimido)).encode()))
+                    await send({**inicio, "headers": novos_headers})
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+
+                await send({**inicio, "headers": novos_headers})
+
+            if len(corpo) > LIMITE_NO_LOOP:
+                bloco = await asyncio.to_thread(compressor.bloco, corpo)
+            else:
+                bloco = compressor.bloco(corpo) if corpo else b""
+            if mais:
+                if bloco:
+                    await send({"type": "http.response.body", "body": bloco, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": bloco + compressor.finalizar()})
+
+        await self.app(scope, receive, enviar)
@@ -1,11 +1,19 @@
 #!/bin/bash
 # Script para configurar LibreOffice para respeitar fontes do DOCX
+#
+# Também inicializa o perfil por completo (uma conversão de teste), para que
+# a imagem já saia com ele pronto: os perfis isolados da API são cópias dele
+# e a primeira conversão de um container novo não precisa criá-lo.
 
+PERFIL_DIR=~/.config/libreoffice/4/user
+LIBREOFFICE_BIN=${LIBREOFFICE_BIN:-libreoffice}
+
+escrever_configuracao() {
 # Criar diretório de config se não existir
-mkdir -p ~/.config/libreoffice/4/user
+mkdir -p "$PERFIL_DIR"
 
 # Criar registrymodifications.xcu
-cat > ~/.config/libreoffice/4/user/registrymodifications.xcu << 'EOF'
+cat > "$PERFIL_DIR/registrymodifications.xcu" << 'EOF'
 <?xml version="1.0" encoding="UTF-8"?>
 <oor:items xmlns:oor="http://openoffice.org/2001/registry" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
   <item oor:path="/org.openoffice.Office.Common/Filter/Microsoft/Import">
@@ -23,5 +31,38 @@ cat > ~/.config/libreoffice/4/user/registrymodifications.xcu << 'EOF'
   </item>
 </oor:items>
 EOF
+}
 
+escrever_configuracao
 echo "LibreOffice configurado para respeitar fontes embarcadas"
+
+if ! command -v "$LIBREOFFICE_BIN" &> /dev/null; then
+    echo "⚠️  $LIBREOFFICE_BIN não encontrado: perfil não inicializado (será criado na primeira conversão)"
+    exit 0
+fi
+
+# Conversão de teste com um DOCX mínimo (um TXT se python-docx não estiver instalado)
+AQUECIMENTO_DIR=$(mktemp -d)
+if python3 -c "import docx; docx.Document().save('$AQUECIMENTO_DIR/aquecimento.docx')" 2> /dev/null; then
+    ENTRADA="$AQUECIMENTO_DIR/aquecimento.docx"
+else
+    echo "aquecimento" > "$AQUECIMENTO_DIR/aquecimento.txt"
+    ENTRADA="$AQUECIMENTO_DIR/aquecimento.txt"
+fi
+
+INICIO=$(date +%s)
+"$LIBREOFFICE_BIN" --headless --norestore --convert-to pdf --outdir "$AQUECIMENTO_DIR" "$ENTRADA" > /dev/null 2>&1
+if [ ! -f "$AQUECIMENTO_DIR/aquecimento.pdf" ]; then
+    echo "⚠️  Conversão de teste falhou: perfil não inicializado"
+    rm -rf "$AQUECIMENTO_DIR"
+    exit 0
+fi
+rm -rf "$AQUECIMENTO_DIR"
+
+# O LibreOffice reescreve o registrymodifications.xcu ao sair; garante as opções acima
+if ! grep -q "ImportWWFieldsAsEnhancedFields" "$PERFIL_DIR/registrymodifications.xcu"; then
+    escrever_configuracao
+fi
+touch "$PERFIL_DIR/.inicializado"
+
+echo "Perfil LibreOffice inicializado em $(( $(date +%s) - INICIO ))s"
@@ -0,0 +1,335 @@
+"""
+Pool de instâncias LibreOffice headless para conversão DOCX → PDF
+
+Cada instância fica escutando em um socket local próprio e usa um perfil
+(UserInstallation) isolado. As requisições pegam uma instância emprestada,
+convertem via UNO e devolvem a instância ao pool, evitando o custo de subir
+um processo LibreOffice por capa.
+
+Sem a ponte UNO, PerfisSubprocesso dá a cada conversão simultânea via
+`soffice --convert-to` um perfil próprio: processos com o mesmo perfil
+colidem ou são serializados pelo LibreOffice. Os perfis ficam em um
+diretório por processo da API (pid), para que vários workers uvicorn
+convertam em paralelo sem compartilhar nada.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Perfil escrito por configure-libreoffice.sh (usado como semente dos perfis isolados)
+PERFIL_LIBREOFFICE_PADRAO = Path.home() / ".config" / "libreoffice" / "4" / "user"
+# Deixado pelo script depois de rodar o LibreOffice uma vez: o perfil padrão está completo
+MARCADOR_PERFIL_INICIALIZADO = ".inicializado"
+
+
+class ErroConversao(Exception):
+    """Falha ao converter documento no LibreOffice"""
+
+
+class TimeoutConversao(ErroConversao):
+    """Conversão (ou espera por instância livre) excedeu o timeout"""
+
+
+def uno_disponivel() -> bool:
+    """Verifica se a ponte Python-UNO está instalada"""
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def preparar_perfil(diretorio: Path) -> str:
+    """Cria perfil isolado semeado com as configurações padrão e retorna sua URI
+
+    Se o perfil padrão já foi inicializado (configure-libreoffice.sh no build da
+    imagem), ele é copiado inteiro e o primeiro soffice não precisa criá-lo.
+    """
+    user_dir = diretorio / "user"
+    destino = user_dir / "registrymodifications.xcu"
+    if not destino.exists() and (PERFIL_LIBREOFFICE_PADRAO / MARCADOR_PERFIL_INICIALIZADO).exists():
+        shutil.copytree(
+            PERFIL_LIBREOFFICE_PADRAO, user_dir, dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns(".lock", MARCADOR_PERFIL_INICIALIZADO)
+        )
+    user_dir.mkdir(parents=True, exist_ok=True)
+
+    semente = PERFIL_LIBREOFFICE_PADRAO / "registrymodifications.xcu"
+    if semente.exists() and not destino.exists():
+        shutil.copy2(semente, destino)
+
+    return diretorio.resolve().as_uri()
+
+
+def diretorio_do_processo(perfis_dir: Path) -> Path:
+    """Diretório de perfis exclusivo deste processo (worker)"""
+    return perfis_dir / str(os.getpid())
+
+
+def limpar_perfis_orfaos(perfis_dir: Path) -> int:
+    """Remove diretórios de perfis deixados por processos que não existem mais"""
+    removidos = 0
+    if not perfis_dir.exists():
+        return 0
+    for diretorio in perfis_dir.iterdir():
+        if not diretorio.is_dir() or not diretorio.name.isdigit():
+            continue
+        try:
+            os.kill(int(diretorio.name), 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            # Processo existe, mas é de outro usuário
+            continue
+        shutil.rmtree(diretorio, ignore_errors=True)
+        removidos += 1
+    return removidos
+
+
+def _porta_livre() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _propriedades(**valores):
+    from com.sun.star.beans import PropertyValue
+
+    props = []
+    for nome, valor in valores.items():
+        prop = PropertyValue()
+        prop.Name = nome
+        prop.Value = valor
+        props.append(prop)
+    return tuple(props)
+
+
+class InstanciaLibreOffice:
+    """Processo soffice de longa duração acessado via socket UNO"""
+
+    def __init__(self, binario: str, perfil_dir: Path, indice: int):
+        self.binario = binario
+        self.perfil_dir = perfil_dir
+        self.indice = indice
+        self.porta = None
+        self.conversoes = 0
+        self._processo = None
+        self._desktop = None
+
+    @property
+    def ativa(self) -> bool:
+        return self._processo is not None and self._processo.poll() is None and self._desktop is not None
+
+    def iniciar(self, timeout: float = 60):
+        """Sobe o processo e aguarda a conexão UNO ficar disponível"""
+        import uno
+
+        self.encerrar()
+        self.porta = _porta_livre()
+        perfil_uri = preparar_perfil(self.perfil_dir)
+
+        comando = [
+            self.binario,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--nodefault",
+            "--norestore",
+            "--nolockcheck",
+            f"--accept=socket,host=127.0.0.1,port={self.porta};urp;StarOffice.ComponentContext",
+            f"-env:UserInstallation={perfil_uri}",
+        ]
+        inicio = time.monotonic()
+        self._processo = subprocess.Popen(
+            comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        contexto_local = uno.getComponentContext()
+        resolver = contexto_local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", contexto_local
+        )
+        url = f"uno:socket,host=127.0.0.1,port={self.porta};urp;StarOffice.ComponentContext"
+
+        while True:
+            if self._processo.poll() is not None:
+                raise ErroConversao(
+                    f"LibreOffice #{self.indice} encerrou ao iniciar (código {self._processo.returncode})"
+                )
+            try:
+                contexto = resolver.resolve(url)
+                self._desktop = contexto.ServiceManager.createInstanceWithContext(
+                    "com.sun.star.frame.Desktop", contexto
+                )
+                break
+            except Exception:
+                if time.monotonic() - inicio > timeout:
+                    self.encerrar()
+                    raise ErroConversao(f"LibreOffice #{self.indice} não respondeu em {timeout}s")
+                time.sleep(0.25)
+
+        logger.info(
+            f"✓ LibreOffice #{self.indice} pronto na porta {self.porta} "
+            f"({time.monotonic() - inicio:.1f}s)"
+        )
+
+    def converter(self, docx_path: Path, pdf_path: Path, timeout: float):
+        """Converte um DOCX em PDF; encerra a instância se estourar o timeout"""
+        if not self.ativa:
+            self.iniciar()
+
+        erro = []
+
+        def _executar():
+            documento = None
+            try:
+                documento = self._desktop.loadComponentFromURL(
+                    docx_path.resolve().as_uri(), "_blank", 0,
+                    _propriedades(Hidden=True, ReadOnly=True)
+                )
+                documento.storeToURL(
+                    pdf_path.resolve().as_uri(),
+                    _propriedades(FilterName="writer_pdf_Export")
+                )
+            except Exception as e:
+                erro.append(e)
+            finally:
+                if documento is not None:
+                    try:
+                        documento.close(True)
+                    except Exception:
+                        pass
+
+        thread = threading.Thread(target=_executar, daemon=True)
+        thread.start()
+        thread.join(timeout)
+
+        if thread.is_alive():
+            logger.error(f"✗ LibreOffice #{self.indice} excedeu {timeout}s, reiniciando")
+            self.encerrar(forcar=True)
+            raise TimeoutConversao(f"Conversão excedeu o timeout de {timeout}s")
+
+        if erro:
+            # Conexão pode ter caído junto com o processo; força reinício no próximo uso
+            if self._processo is None or self._processo.poll() is not None:
+                self._desktop = None
+            raise ErroConversao(f"Conversão falhou: {erro[0]}")
+
+        self.conversoes += 1
+
+    def encerrar(self, forcar: bool = False):
+        """Finaliza o processo soffice da instância"""
+        if self._desktop is not None and not forcar:
+            try:
+                self._desktop.terminate()
+            except Exception:
+                pass
+        self._desktop = None
+
+        if self._processo is not None:
+            if forcar:
+                self._processo.kill()
+            try:
+                self._processo.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._processo.kill()
+                self._processo.wait()
+            self._processo = None
+
+
+class PoolLibreOffice:
+    """Pool de instâncias LibreOffice emprestadas por conversão"""
+
+    def __init__(self, binario: str, tamanho: int, perfis_dir: Path, timeout: float):
+        self.binario = binario
+        self.tamanho = tamanho
+        self.perfis_dir = perfis_dir
+        self.timeout = timeout
+        self._instancias = [
+            InstanciaLibreOffice(binario, perfis_dir / f"instancia_{i}", i)
+            for i in range(tamanho)
+        ]
+        self._livres = queue.Queue()
+        for instancia in self._instancias:
+            self._livres.put(instancia)
+
+    def aquecer(self):
+        """Inicia todas as instâncias antecipadamente"""
+        logger.info(f"→ Aquecendo pool LibreOffice ({self.tamanho} instâncias)...")
+        for instancia in self._instancias:
+            if not instancia.ativa:
+                try:
+                    instancia.iniciar()
+                except Exception as e:
+                    logger.error(f"✗ Falha ao aquecer LibreOffice #{instancia.indice}: {e}")
+
+    @contextmanager
+    def emprestar(self):
+        """Empresta uma instância livre, aguardando até o timeout de conversão"""
+        try:
+            instancia = self._livres.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutConversao(f"Nenhuma instância LibreOffice livre em {self.timeout}s")
+        try:
+            yield instancia
+        finally:
+            self._livres.put(instancia)
+
+    def converter(self, docx_path: Path, pdf_path: Path):
+        with self.emprestar() as instancia:
+            instancia.converter(docx_path, pdf_path, self.timeout)
+
+    def encerrar(self):
+        for instancia in self._instancias:
+            instancia.encerrar()
+
+    def estatisticas(self) -> dict:
+        return {
+            "tamanho": self.tamanho,
+            "livres": self._livres.qsize(),
+            "ativas": sum(1 for i in self._instancias if i.ativa),
+            "conversoes": sum(i.conversoes for i in self._instancias),
+        }
+
+
+class PerfisSubprocesso:
+    """Perfis isolados emprestados a cada conversão via subprocesso
+
+    Limita as conversões simultâneas deste processo à quantidade de perfis.
+    """
+
+    def __init__(self, perfis_dir: Path, quantidade: int):
+        self.perfis_dir = perfis_dir
+        self.quantidade = quantidade
+        self._diretorios = [perfis_dir / f"slot_{i}" for i in range(quantidade)]
+        self._livres = asyncio.Queue()
+        for diretorio in self._diretorios:
+            self._livres.put_nowait(diretorio)
+
+    def preparar(self):
+        """Cria todos os perfis antecipadamente, fora do caminho da primeira conversão"""
+        for diretorio in self._diretorios:
+            preparar_perfil(diretorio)
+
+    @asynccontextmanager
+    async def emprestar(self):
+        """URI (-env:UserInstallation) de um perfil livre"""
+        diretorio = await self._livres.get()
+        try:
+            yield await asyncio.to_thread(preparar_perfil, diretorio)
+        finally:
+            self._livres.put_nowait(diretorio)
+
+    def estatisticas(self) -> dict:
+        return {"perfis": self.quantidade, "livres": self._livres.qsize()}
@@ -0,0 +1,137 @@
+"""
+Cache dos corpos PDF (assets/corpos_pdf) usados na junção com a capa
+
+Cada corpo é aberto via mmap e parseado uma única vez por processo; a junção
+de cada requisição só precisa parsear a capa de uma página. Entradas são
+recarregadas quando mtime ou tamanho do arquivo mudam.
+
+VariantesCorpos escolhe a versão otimizada (email/impressao) de cada corpo.
+"""
+
+import json
+import logging
+import mmap
+import threading
+from pathlib import Path
+
+from cache_relatorios import checksum_arquivo
+
+logger = logging.getLogger(__name__)
+
+
+class CorpoPdf:
+    """Corpo PDF parseado, com acesso serializado ao leitor"""
+
+    def __init__(self, caminho: Path):
+        from PyPDF2 import PdfReader, PdfWriter
+
+        self.caminho = caminho
+        info = caminho.stat()
+        self.assinatura = (info.st_mtime_ns, info.st_size)
+
+        with open(caminho, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.reader = PdfReader(self._mmap)
+        self._lock = threading.Lock()
+
+        # Resolve todos os objetos agora para que as junções só reutilizem a árvore
+        self.anexar(PdfWriter())
+
+    @property
+    def paginas(self) -> int:
+        return len(self.reader.pages)
+
+    def anexar(self, writer):
+        """Acrescenta as páginas do corpo ao writer (PdfWriter)"""
+        with self._lock:
+            for pagina in self.reader.pages:
+                writer.add_page(pagina)
+
+
+class CacheCorpos:
+    """Corpos PDF carregados sob demanda e invalidados por mtime/tamanho"""
+
+    def __init__(self):
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def obter(self, caminho: Path) -> CorpoPdf:
+        info = caminho.stat()
+        assinatura = (info.st_mtime_ns, info.st_size)
+
+        with self._lock:
+            corpo = self._entradas.get(caminho)
+            if corpo is not None and corpo.assinatura == assinatura:
+                return corpo
+
+            corpo = CorpoPdf(caminho)
+            self._entradas[caminho] = corpo
+            logger.info(f"✓ Corpo PDF carregado: {caminho.name} ({corpo.paginas} páginas)")
+            return corpo
+
+    def pre_carregar(self, caminhos):
+        for caminho in caminhos:
+            if caminho.exists():
+                try:
+                    self.obter(caminho)
+                except Exception as e:
+                    logger.error(f"✗ Erro ao carregar corpo {caminho.name}: {e}")
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class VariantesCorpos:
+    """Variantes otimizadas dos corpos (otimizar_assets.py), validadas pelo manifest
+
+    Uma variante só é usada se o SHA-256 do original e o da própria variante
+    baterem com o manifest; senão a requisição usa o corpo original.
+    """
+
+    def __init__(self, diretorio: Path, manifesto: str = "manifest.json"):
+        self.diretorio = diretorio
+        self._manifesto = diretorio / manifesto
+        self._assinatura = None
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def _carregar(self) -> dict:
+        try:
+            info = self._manifesto.stat()
+        except FileNotFoundError:
+            return {}
+        assinatura = (info.st_mtime_ns, info.st_size)
+
+        with self._lock:
+            if assinatura != self._assinatura:
+                try:
+                    self._entradas = json.loads(self._manifesto.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.error(f"✗ Manifest de variantes inválido: {e}")
+                    self._entradas = {}
+                self._assinatura = assinatura
+            return self._entradas
+
+    def resolver(self, corpo_pdf: Path, qualidade: str) -> Path:
+        """Caminho da variante `qualidade` do corpo, ou o próprio corpo se não houver variante válida"""
+        entrada = self._carregar().get(qualidade, {}).get(corpo_pdf.name)
+        if entrada is None:
+            return corpo_pdf
+
+        variante = self.diretorio / qualidade / corpo_pdf.name
+        try:
+            valida = (
+                checksum_arquivo(corpo_pdf) == entrada["origem_sha256"]
+                and checksum_arquivo(variante) == entrada["sha256"]
+            )
+        except (OSError, KeyError):
+            valida = False
+
+        if not valida:
+            logger.warning(f"⚠ Variante {qualidade} de {corpo_pdf.name} desatualizada, usando o original")
+            return corpo_pdf
+        return variante
+
+    def estatisticas(self) -> dict:
+        entradas = self._carregar()
+        return {perfil: len(corpos) for perfil, corpos in entradas.items()}
@@ -0,0 +1,111 @@
+"""
+Camada de execução das etapas bloqueantes do pipeline de relatórios
+
+Etapas CPU-bound (python-docx, PyPDF2) rodam em um pool de processos com
+número fixo de workers e fila de espera limitada, para que uma renderização
+lenta não congele o event loop do uvicorn.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def _nada():
+    return None
+
+
+class ExecutorSaturado(Exception):
+    """Fila de espera do executor atingiu o limite configurado"""
+
+
+class ExecutorRelatorios:
+    """Executa funções bloqueantes em workers dedicados, com fila limitada"""
+
+    def __init__(self, workers: int, max_fila: int, processos: bool = True, inicializador=None):
+        self.workers = max(1, workers)
+        self.max_fila = max_fila
+        self.processos = processos
+        self.inicializador = inicializador
+        self._pool = None
+        self._vagas = None
+        self._aguardando = 0
+        self._em_execucao = 0
+        self._concluidas = 0
+        self._falhas = 0
+
+    def _obter_pool(self):
+        if self._pool is None:
+            if self.processos:
+                # spawn: os workers não herdam threads/sockets do processo principal
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.inicializador
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="relatorio",
+                    initializer=self.inicializador
+                )
+            logger.info(
+                f"✓ Executor iniciado: {self.workers} "
+                f"{'processos' if self.processos else 'threads'}"
+            )
+        return self._pool
+
+    async def executar(self, func, *args):
+        """Executa func(*args) em um worker, aguardando vaga sem bloquear o loop"""
+        if self._vagas is None:
+            self._vagas = asyncio.Semaphore(self.workers)
+
+        if self._vagas.locked() and self._aguardando >= self.max_fila:
+            raise ExecutorSaturado(
+                f"Fila de renderização cheia ({self._aguardando} aguardando)"
+            )
+
+        self._aguardando += 1
+        try:
+            await self._vagas.acquire()
+        finally:
+            self._aguardando -= 1
+
+        self._em_execucao += 1
+        try:
+            loop = asyncio.get_running_loop()
+            resultado = await loop.run_in_executor(self._obter_pool(), func, *args)
+            self._concluidas += 1
+            return resultado
+        except Exception:
+            self._falhas += 1
+            raise
+        finally:
+            self._em_execucao -= 1
+            self._vagas.release()
+
+    def iniciar(self):
+        """Cria os workers antecipadamente, executando o inicializador em cada um"""
+        pool = self._obter_pool()
+        # Força a criação dos workers agora (o pool os cria sob demanda); com threads,
+        # o inicializador da primeira já carrega o cache compartilhado do processo
+        for futuro in [pool.submit(_nada) for _ in range(self.workers)]:
+            futuro.result()
+
+    def estatisticas(self) -> dict:
+        return {
+            "modo": "processos" if self.processos else "threads",
+            "workers": self.workers,
+            "em_execucao": self._em_execucao,
+            "fila": self._aguardando,
+            "max_fila": self.max_fila,
+            "concluidas": self._concluidas,
+            "falhas": self._falhas,
+        }
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,196 @@
+"""
+Fila persistente de jobs de relatório (SQLite)
+
+Separa o recebimento das requisições da capacidade de renderização: o POST
+só grava o job, e workers (no próprio processo da API ou em outros
+processos/containers que compartilhem o volume) reservam jobs de forma
+atômica. Jobs reservados por um worker que morreu voltam para a fila quando
+a reserva expira.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    callback_url TEXT,
+    criado_em REAL NOT NULL,
+    iniciado_em REAL,
+    concluido_em REAL,
+    expira_em REAL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    resultado TEXT,
+    erro TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_criado ON jobs (status, criado_em);
+"""
+
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+class FilaJobs:
+    """Fila de jobs em SQLite compartilhável entre processos"""
+
+    def __init__(self, db_path: Path, resultados_dir: Path, reserva_s: float, max_tentativas: int):
+        self.db_path = db_path
+        self.resultados_dir = resultados_dir
+        self.reserva_s = reserva_s
+        self.max_tentativas = max_tentativas
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.resultados_dir.mkdir(parents=True, exist_ok=True)
+        with self._conexao() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(ESQUEMA)
+
+    @contextmanager
+    def _conexao(self):
+        # Autocommit; transações explícitas só na reserva
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def criar(self, payload: dict, callback_url: str = None) -> str:
+        return self.criar_varios([payload], callback_url)[0]
+
+    def criar_varios(self, payloads: list, callback_url: str = None) -> list:
+        """Enfileira vários jobs em uma única transação"""
+        agora = time.time()
+        linhas = [
+            (uuid.uuid4().hex, PENDENTE, json.dumps(payload, ensure_ascii=False), callback_url, agora)
+            for payload in payloads
+        ]
+        with self._conexao() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO jobs (id, status, payload, callback_url, criado_em) VALUES (?, ?, ?, ?, ?)",
+                linhas
+            )
+            conn.execute("COMMIT")
+        return [linha[0] for linha in linhas]
+
+    def obter(self, job_id: str):
+        with self._conexao() as conn:
+            linha = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(linha) if linha else None
+
+    def reservar(self, worker: str):
+        """Reserva o job pendente mais antigo (ou com reserva expirada)
+
+        Reservas expiradas que já esgotaram as tentativas (o job derruba o
+        worker toda vez) viram erro em vez de voltar para a fila.
+        """
+        agora = time.time()
+        with self._conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                esgotados = conn.execute(
+                    "UPDATE jobs SET status = ?, concluido_em = ?, expira_em = NULL, erro = ? "
+                    "WHERE status = ? AND expira_em < ? AND tentativas >= ?",
+                    (ERRO, agora, "Reserva expirou em todas as tentativas",
+                     PROCESSANDO, agora, self.max_tentativas)
+                ).rowcount
+                linha = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? OR (status = ? AND expira_em < ?) "
+                    "ORDER BY criado_em LIMIT 1",
+                    (PENDENTE, PROCESSANDO, agora)
+                ).fetchone()
+                if linha is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, iniciado_em = ?, expira_em = ?, "
+                        "tentativas = tentativas + 1 WHERE id = ?",
+                        (PROCESSANDO, worker, agora, agora + self.reserva_s, linha["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if esgotados:
+            logger.warning(f"⚠ {esgotados} job(s) com reserva expirada e tentativas esgotadas marcados como erro")
+        if linha is None:
+            return None
+
+        job = dict(linha)
+        job["tentativas"] += 1
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def concluir(self, job_id: str, resultado: Path):
+        with self._conexao() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, concluido_em = ?, expira_em = NULL, resultado = ?, erro = NULL "
+                "WHERE id = ?",
+                (CONCLUIDO, time.time(), str(resultado), job_id)
+            )
+
+    def falhar(self, job_id: str, erro: str, tentativas: int, definitivo: bool = False) -> str:
+        """Registra a falha; volta o job para a fila enquanto houver tentativas"""
+        status = ERRO if definitivo or tentativas >= self.max_tentativas else PENDENTE
+        with self._conexao() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, concluido_em = ?, expira_em = NULL, erro = ? WHERE id = ?",
+                (status, time.time() if status == ERRO else None, erro, job_id)
+            )
+        return status
+
+    def limpar(self, retencao_s: float) -> int:
+        """Remove jobs finalizados (e seus PDFs) mais antigos que a retenção"""
+        limite = time.time() - retencao_s
+        with self._conexao() as conn:
+            linhas = conn.execute(
+                "SELECT id, resultado FROM jobs WHERE status IN (?, ?) AND concluido_em < ?",
+                (CONCLUIDO, ERRO, limite)
+            ).fetchall()
+            for linha in linhas:
+                if linha["resultado"]:
+                    Path(linha["resultado"]).unlink(missing_ok=True)
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND concluido_em < ?",
+                (CONCLUIDO, ERRO, limite)
+            )
+        return len(linhas)
+
+    def estatisticas(self) -> dict:
+        with self._conexao() as conn:
+            linhas = conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+        contagem = {PENDENTE: 0, PROCESSANDO: 0, CONCLUIDO: 0, ERRO: 0}
+        contagem.update({linha["status"]: linha["total"] for linha in linhas})
+        return contagem
+
+
+def notificar_callback(url: str, conteudo: dict, tentativas: int = 3, timeout: float = 10):
+    """POST JSON para a URL de callback, com algumas tentativas"""
+    corpo = json.dumps(conteudo, ensure_ascii=False).encode()
+    for tentativa in range(1, tentativas + 1):
+        try:
+            requisicao = urllib.request.Request(
+                url, data=corpo, method="POST",
+                headers={"Content-Type": "application/json"}
+            )
+            with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+                logger.info(f"✓ Callback notificado ({resposta.status}): {url}")
+                return True
+        except Exception as e:
+            logger.warning(f"⚠ Callback falhou (tentativa {tentativa}/{tentativas}): {e}")
+            if tentativa < tentativas:
+                time.sleep(2 ** tentativa)
+    return False
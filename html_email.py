@@ -0,0 +1,37 @@
+"""
+Modelo HTML pré-compilado para o corpo do email
+
+O modelo é dividido uma única vez em segmentos estáticos (head, CSS, SVG,
+tabela, descrições) e campos {{nome}}; cada renderização só preenche as
+posições dos campos, com escape HTML, e junta a lista.
+"""
+
+import html
+import re
+from pathlib import Path
+
+CAMPO = re.compile(r"\{\{(\w+)\}\}")
+
+
+def escapar(valor) -> str:
+    if isinstance(valor, int):
+        return str(valor)
+    return html.escape(valor, quote=True)
+
+
+class ModeloHtml:
+    """Modelo com segmentos estáticos e campos {{nome}}"""
+
+    def __init__(self, fonte: str):
+        # Campos nas posições ímpares, segmentos estáticos nas pares
+        self._partes = CAMPO.split(fonte)
+        self.campos = tuple(self._partes[1::2])
+
+    @classmethod
+    def de_arquivo(cls, caminho: Path) -> "ModeloHtml":
+        return cls(caminho.read_text(encoding="utf-8"))
+
+    def renderizar(self, **valores) -> str:
+        partes = self._partes.copy()
+        partes[1::2] = [escapar(valores[campo]) for campo in self.campos]
+        return "".join(partes)
@@ -0,0 +1,173 @@
+"""
+Idempotência e deduplicação de gerações em andamento (single-flight)
+
+Cada requisição tem uma impressão digital (dados normalizados + checksums do
+template e do corpo), a mesma chave do relatório final no cache_relatorios.
+Enquanto um relatório está sendo gerado, requisições com a mesma impressão
+aguardam o mesmo resultado em vez de abrir outra conversão; depois de pronto,
+ele é repetido durante a janela configurada a partir do cache. Aqui só fica
+um marcador por impressão (<diretorio>/<impressao>, pela data de modificação),
+nunca uma segunda cópia do PDF.
+
+O cabeçalho Idempotency-Key, quando enviado, fica ligado à impressão da
+primeira requisição: reutilizar a chave com outros dados é um conflito.
+
+O single-flight vale só dentro de cada processo: com WORKERS > 1, requisições
+iguais em workers diferentes podem gerar o relatório duas vezes. A repetição
+de resultados prontos vale entre workers, pelo diretório e cache em disco
+compartilhados. Sem cache (CACHE_HABILITADO=false) o single-flight continua:
+quem aguardava recebe o conteúdo do PDF de quem gerou, guardado em memória só
+até os que aguardavam o copiarem. Não há é de onde repetir depois de pronto.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+
+GERADO = "gerado"
+AGUARDADO = "aguardado"
+REPETIDO = "repetido"
+
+
+class ConflitoIdempotencia(Exception):
+    """Idempotency-Key já usada com uma requisição diferente"""
+
+
+class Idempotencia:
+    """Resultados recentes por impressão digital e gerações em andamento"""
+
+    def __init__(self, diretorio: Path, janela_s: float, cache=None):
+        self.diretorio = diretorio
+        self.chaves_dir = diretorio / "chaves"
+        self.janela_s = janela_s
+        self.cache = cache
+        self.chaves_dir.mkdir(parents=True, exist_ok=True)
+
+        self._em_andamento = {}
+        self._aguardando = {}
+        self._contadores = {GERADO: 0, AGUARDADO: 0, REPETIDO: 0, "conflitos": 0}
+
+    def _marcador(self, impressao: str) -> Path:
+        return self.diretorio / impressao
+
+    def _recente(self, caminho: Path) -> bool:
+        try:
+            return caminho.stat().st_mtime > time.time() - self.janela_s
+        except FileNotFoundError:
+            return False
+
+    def _restaurar(self, impressao: str, destino: Path, na_janela: bool = True) -> bool:
+        if self.cache is None:
+            return False
+        if na_janela and not self._recente(self._marcador(impressao)):
+            return False
+        # O cache pode ter descartado a entrada (LRU): quem pediu gera de novo
+        return self.cache.restaurar(impressao, destino)
+
+    def _marcar(self, impressao: str):
+        self._marcador(impressao).touch()
+
+    def vincular(self, chave: str, impressao: str):
+        """Liga a Idempotency-Key à impressão; levanta ConflitoIdempotencia se já ligada a outra"""
+        arquivo = self.chaves_dir / hashlib.sha256(chave.encode()).hexdigest()
+        if self._recente(arquivo):
+            try:
+                anterior = arquivo.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                anterior = impressao
+            if anterior != impressao:
+                self._contadores["conflitos"] += 1
+                raise ConflitoIdempotencia("Idempotency-Key já usada com dados diferentes")
+            return
+
+        temporario = arquivo.with_name(f".{arquivo.name}.{os.getpid()}.tmp")
+        temporario.write_text(impressao, encoding="utf-8")
+        temporario.replace(arquivo)
+
+    async def executar(self, impressao: str, destino: Path, gerar) -> str:
+        """Coloca em destino o PDF da impressão, chamando `await gerar()` só se necessário
+
+        Retorna GERADO, AGUARDADO (resultado de uma geração simultânea) ou
+        REPETIDO (resultado recente). Erros da geração em andamento são
+        repassados a quem a aguardava. Com cache, `gerar` deve guardar o PDF
+        nele com a impressão como chave; sem cache, quem aguardava recebe o
+        conteúdo do destino de quem gerou.
+        """
+        while True:
+            if await asyncio.to_thread(self._restaurar, impressao, destino):
+                self._contadores[REPETIDO] += 1
+                return REPETIDO
+
+            futuro = self._em_andamento.get(impressao)
+            if futuro is None:
+                break
+
+            self._aguardando[impressao] = self._aguardando.get(impressao, 0) + 1
+            try:
+                conteudo = await asyncio.shield(futuro)
+            except asyncio.CancelledError:
+                # A requisição que gerava foi cancelada: a próxima volta assume a geração
+                if not futuro.cancelled():
+                    raise
+                continue
+            finally:
+                self._aguardando[impressao] -= 1
+                if not self._aguardando[impressao]:
+                    del self._aguardando[impressao]
+
+            if conteudo is not None:
+                await asyncio.to_thread(destino.write_bytes, conteudo)
+                self._contadores[AGUARDADO] += 1
+                return AGUARDADO
+            if await asyncio.to_thread(self._restaurar, impressao, destino, False):
+                self._contadores[AGUARDADO] += 1
+                return AGUARDADO
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[impressao] = futuro
+        try:
+            await gerar()
+            conteudo = None
+            if self.cache is not None:
+                await asyncio.to_thread(self._marcar, impressao)
+            elif impressao in self._aguardando:
+                # Sem cache: o PDF vai para quem aguardava pelo próprio futuro
+                conteudo = await asyncio.to_thread(destino.read_bytes)
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Marca a exceção como consumida mesmo sem ninguém aguardando
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(conteudo)
+        finally:
+            del self._em_andamento[impressao]
+
+        self._contadores[GERADO] += 1
+        return GERADO
+
+    def limpar(self) -> int:
+        """Remove marcadores e chaves fora da janela"""
+        limite = time.time() - self.janela_s
+        removidos = 0
+        for diretorio in (self.diretorio, self.chaves_dir):
+            for caminho in diretorio.iterdir():
+                try:
+                    if caminho.is_file() and caminho.stat().st_mtime < limite:
+                        caminho.unlink()
+                        removidos += 1
+                except FileNotFoundError:
+                    continue
+        return removidos
+
+    def estatisticas(self) -> dict:
+        return {
+            "em_andamento": len(self._em_andamento),
+            "janela_s": self.janela_s,
+            **self._contadores,
+        }
@@ -0,0 +1,63 @@
+"""
+Fases da subida do processo e estado de prontidão
+
+A importação do app e cada fase do aquecimento (workers do executor com
+templates e corpos carregados, perfis ou pool LibreOffice, conversão de
+teste) são cronometradas. Com o aquecimento em segundo plano o uvicorn já
+aceita conexões enquanto ele roda, mas /health responde 503 até o fim, para
+que o balanceador só mande tráfego quando a primeira renderização for rápida.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+INICIANDO = "iniciando"
+PRONTO = "pronto"
+FALHOU = "falhou"
+
+
+class Inicializacao:
+    """Tempo de cada fase da subida e estado (iniciando, pronto ou falhou)"""
+
+    def __init__(self, inicio: float):
+        self.inicio = inicio
+        self.estado = INICIANDO
+        self.erro = None
+        self.fases = {}
+        self._pronto_em = None
+
+    @property
+    def pronto(self) -> bool:
+        return self.estado == PRONTO
+
+    def registrar(self, fase: str, duracao: float):
+        self.fases[fase] = round(duracao, 3)
+        logger.info("✓ Subida: %s em %.2fs", fase, duracao)
+
+    @contextmanager
+    def fase(self, nome: str):
+        inicio = time.perf_counter()
+        yield
+        self.registrar(nome, time.perf_counter() - inicio)
+
+    def concluir(self, erro: Exception = None):
+        self._pronto_em = time.perf_counter()
+        if erro is None:
+            self.estado = PRONTO
+            logger.info("✓ Pronto para receber tráfego (%.2fs desde o início)", self._pronto_em - self.inicio)
+        else:
+            self.estado = FALHOU
+            self.erro = str(erro)
+            logger.error(f"✗ Falha no aquecimento: {erro}")
+
+    def estatisticas(self) -> dict:
+        fim = self._pronto_em or time.perf_counter()
+        return {
+            "estado": self.estado,
+            "total_s": round(fim - self.inicio, 3),
+            "fases_s": dict(self.fases),
+            **({"erro": self.erro} if self.erro else {}),
+        }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Substituto determinístico do LibreOffice para testes de carga
+
+Aceita a mesma linha de comando que a API usa no modo subprocesso
+(--convert-to pdf --outdir DIR arquivos.docx, -env:UserInstallation=...) e
+grava para cada DOCX um PDF de uma página A4 em branco, levando um tempo
+fixo por execução. Não lê o DOCX nem depende de nada além da biblioteca
+padrão, então roda em qualquer Linux e o tempo medido na API fica sendo o do
+lado Python mais a latência configurada.
+
+    LIBREOFFICE_BIN=./libreoffice_falso.py LIBREOFFICE_POOL_TAMANHO=0 python app.py
+
+Variáveis:
+    LIBREOFFICE_FALSO_LATENCIA_S     duração de cada execução (padrão: 1.0)
+    LIBREOFFICE_FALSO_POR_ARQUIVO_S  acréscimo por DOCX convertido (padrão: 0)
+    LIBREOFFICE_FALSO_CPU            1 = ocupa a CPU durante a espera em vez de dormir
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+INICIO = time.monotonic()
+
+
+def pdf_em_branco() -> bytes:
+    """PDF mínimo válido com uma página A4 vazia"""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << >> >>",
+    ]
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicao in posicoes:
+        saida += b"%010d 00000 n \n" % posicao
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(saida)
+
+
+def esperar(segundos: float, ocupar_cpu: bool):
+    fim = INICIO + segundos
+    if ocupar_cpu:
+        while time.monotonic() < fim:
+            pass
+    else:
+        time.sleep(max(0.0, fim - time.monotonic()))
+
+
+def main(argumentos) -> int:
+    if "--outdir" not in argumentos:
+        print("uso: libreoffice_falso.py --headless --convert-to pdf --outdir DIR arquivo.docx...", file=sys.stderr)
+        return 2
+    outdir = Path(argumentos[argumentos.index("--outdir") + 1])
+    docx = [Path(a) for a in argumentos if a.lower().endswith(".docx")]
+
+    latencia = float(os.getenv("LIBREOFFICE_FALSO_LATENCIA_S", "1.0"))
+    por_arquivo = float(os.getenv("LIBREOFFICE_FALSO_POR_ARQUIVO_S", "0"))
+    esperar(latencia + por_arquivo * len(docx), os.getenv("LIBREOFFICE_FALSO_CPU", "0") == "1")
+
+    conteudo = pdf_em_branco()
+    for arquivo in docx:
+        if not arquivo.exists():
+            print(f"Error: source file could not be loaded: {arquivo}", file=sys.stderr)
+            return 1
+        (outdir / f"{arquivo.stem}.pdf").write_bytes(conteudo)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,199 @@
+"""
+Logs estruturados com correlação por requisição e amostragem
+
+Cada requisição HTTP recebe um id (X-Request-ID enviado pelo cliente ou um
+gerado aqui) que aparece em todas as linhas de log emitidas durante ela,
+inclusive nas etapas que rodam nos workers do executor (com_contexto), e
+volta no cabeçalho X-Request-ID da resposta. Ao terminar, a requisição emite
+uma única linha INFO de resumo com status, duração e o tempo de cada etapa.
+
+O detalhe por etapa fica em DEBUG. Com amostragem > 0, essa fração das
+requisições emite o detalhe mesmo com o nível em INFO; nas demais as
+mensagens são descartadas antes de formatadas.
+
+Formatos: "texto" (o de sempre, com o id da requisição) e "json" (um objeto
+por linha, com os campos extras do registro).
+"""
+
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+FORMATO_TEXTO = "%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s"
+ID_VALIDO = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# Atributos de todo LogRecord; o que sobrar veio de `extra=` e vai para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "color_message"
+}
+
+_id_requisicao = ContextVar("id_requisicao", default="-")
+_amostrada = ContextVar("requisicao_amostrada", default=False)
+_resumo = ContextVar("resumo_requisicao", default=None)
+
+
+class FiltroContexto(logging.Filter):
+    """Anexa o id da requisição e descarta registros abaixo do nível fora das amostradas"""
+
+    def __init__(self, nivel: int):
+        super().__init__()
+        self.nivel = nivel
+
+    def filter(self, record) -> bool:
+        if record.levelno < self.nivel and not _amostrada.get():
+            return False
+        record.request_id = _id_requisicao.get()
+        return True
+
+
+class FormatoJson(logging.Formatter):
+    def format(self, record) -> str:
+        saida = {
+            "ts": f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for campo, valor in vars(record).items():
+            if campo not in _ATRIBUTOS_PADRAO:
+                saida[campo] = valor
+        if record.exc_info:
+            saida["exc"] = self.formatException(record.exc_info)
+        return json.dumps(saida, ensure_ascii=False, default=str)
+
+
+def configurar(formato: str = "texto", nivel: str = "INFO", amostragem: float = 0.0, detalhados=()):
+    """Configura o logging do processo (também nos workers, que importam o app)
+
+    `detalhados` são os loggers cujo DEBUG pode sair nas requisições amostradas.
+    """
+    nivel_num = logging.getLevelName(nivel.upper())
+    if not isinstance(nivel_num, int):
+        nivel_num = logging.INFO
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(FormatoJson() if formato == "json" else logging.Formatter(FORMATO_TEXTO))
+    handler.addFilter(FiltroContexto(nivel_num))
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [handler]
+    raiz.setLevel(nivel_num)
+    for nome in detalhados:
+        logging.getLogger(nome).setLevel(logging.DEBUG if amostragem > 0 else logging.NOTSET)
+
+
+@contextmanager
+def requisicao(id_requisicao: str, amostrada: bool = False):
+    """Contexto de log de uma requisição (ou job); produz o dicionário do resumo"""
+    resumo = {"etapas": {}, "campos": {}}
+    tokens = (_id_requisicao.set(id_requisicao), _amostrada.set(amostrada), _resumo.set(resumo))
+    try:
+        yield resumo
+    finally:
+        _resumo.reset(tokens[2])
+        _amostrada.reset(tokens[1])
+        _id_requisicao.reset(tokens[0])
+
+
+def contexto() -> tuple:
+    """Id e amostragem da requisição atual, para repassar aos workers do executor"""
+    return _id_requisicao.get(), _amostrada.get()
+
+
+def com_contexto(contexto_origem: tuple, func, *args):
+    """Executa func(*args) com o contexto de log da requisição de origem"""
+    id_requisicao, amostrada = contexto_origem
+    tokens = (_id_requisicao.set(id_requisicao), _amostrada.set(amostrada))
+    try:
+        return func(*args)
+    finally:
+        _amostrada.reset(tokens[1])
+        _id_requisicao.reset(tokens[0])
+
+
+def resumo_atual():
+    """Etapas e campos acumulados na requisição atual (None fora de requisição)"""
+    return _resumo.get()
+
+
+def registrar_etapa(etapa: str, duracao: float):
+    """Soma a duração da etapa ao resumo da requisição atual (se houver)"""
+    resumo = _resumo.get()
+    if resumo is not None:
+        etapas = resumo["etapas"]
+        etapas[etapa] = etapas.get(etapa, 0.0) + duracao
+
+
+def anotar(campo: str, valor):
+    """Acrescenta um campo à linha de resumo da requisição atual"""
+    resumo = _resumo.get()
+    if resumo is not None:
+        resumo["campos"][campo] = valor
+
+
+def _texto_resumo(resumo: dict) -> str:
+    partes = [f"{etapa}={duracao * 1000:.0f}ms" for etapa, duracao in resumo["etapas"].items()]
+    partes.extend(f"{campo}={valor}" for campo, valor in resumo["campos"].items())
+    return " " + " ".join(partes) if partes else ""
+
+
+class CorrelacaoMiddleware:
+    """Id por requisição (X-Request-ID), amostragem do detalhe e linha de resumo ao final"""
+
+    def __init__(self, app, amostragem: float = 0.0, silenciosos=("/health", "/metrics")):
+        self.app = app
+        self.amostragem = amostragem
+        self.silenciosos = set(silenciosos)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recebido = ""
+        for nome, valor in scope["headers"]:
+            if nome == b"x-request-id":
+                recebido = valor.decode("latin-1")
+                break
+        id_requisicao = recebido if ID_VALIDO.match(recebido) else uuid.uuid4().hex[:16]
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                mensagem = {
+                    **mensagem,
+                    "headers": [*mensagem.get("headers", []), (b"x-request-id", id_requisicao.encode())]
+                }
+            await send(mensagem)
+
+        amostrada = self.amostragem > 0 and random.random() < self.amostragem
+        inicio = time.perf_counter()
+        with requisicao(id_requisicao, amostrada) as resumo:
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                nivel = logging.DEBUG if scope["path"] in self.silenciosos else logging.INFO
+                if logger.isEnabledFor(nivel):
+                    duracao_ms = (time.perf_counter() - inicio) * 1000
+                    logger.log(
+                        nivel, "%s %s %s %.0fms%s", scope["method"], scope["path"], status, duracao_ms,
+                        _texto_resumo(resumo),
+                        extra={
+                            "metodo": scope["method"],
+                            "caminho": scope["path"],
+                            "status": status,
+                            "duracao_ms": round(duracao_ms, 1),
+                            "etapas_ms": {e: round(d * 1000, 1) for e, d in resumo["etapas"].items()},
+                            **resumo["campos"],
+                        }
+                    )
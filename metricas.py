@@ -0,0 +1,212 @@
+"""
+Métricas no formato texto do Prometheus (/metrics)
+
+Implementação mínima, sem dependências: contadores, medidores e histogramas
+com rótulos, guardados em dicionários e serializados só na coleta. Observar
+um valor custa uma busca no dicionário e um bisect, desprezível perto das
+etapas medidas.
+
+As etapas que rodam nos workers do executor são cronometradas dentro do
+worker (cronometrar) e registradas no processo principal, que é quem expõe
+as métricas. medir() também soma a etapa à linha de resumo da requisição
+(logs.registrar_etapa).
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from logs import registrar_etapa
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_BYTES = tuple(4096 * 4 ** i for i in range(8))  # 4 KiB a 64 MiB
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+
+    def exportar(self):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        for valores, valor in sorted(self._series.items()):
+            yield f"{self.nome}{_rotulos(self.rotulos, valores)} {_numero(valor)}"
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, *valores, quantidade: float = 1):
+        self._series[valores] = self._series.get(valores, 0) + quantidade
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def inc(self, *valores, quantidade: float = 1):
+        self._series[valores] = self._series.get(valores, 0) + quantidade
+
+    def dec(self, *valores, quantidade: float = 1):
+        self.inc(*valores, quantidade=-quantidade)
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, buckets, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor: float, *valores):
+        serie = self._series.get(valores)
+        if serie is None:
+            # contagem por bucket (+Inf no fim), soma, total
+            serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exportar(self):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        for valores, (contagens, soma, total) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                rotulo_le = f'le="{_numero(limite)}"'
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, rotulo_le)} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {soma}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, valores)} {total}"
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def contador(self, nome, ajuda, rotulos=()) -> Contador:
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def medidor(self, nome, ajuda, rotulos=()) -> Medidor:
+        return self._registrar(Medidor(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, buckets, rotulos=()) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, buckets, rotulos))
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+def exportar_estatisticas(prefixo: str, ajuda: str, estatisticas: dict) -> str:
+    """Campos numéricos de um dicionário de estatísticas (/health) como medidores"""
+    linhas = []
+    for campo, valor in estatisticas.items():
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            continue
+        nome = f"{prefixo}_{campo}"
+        linhas.append(f"# HELP {nome} {ajuda} ({campo})")
+        linhas.append(f"# TYPE {nome} gauge")
+        linhas.append(f"{nome} {_numero(valor)}")
+    return "\n".join(linhas) + "\n" if linhas else ""
+
+
+def cronometrar(func, *args):
+    """Executa func(*args) e devolve (duração em segundos, resultado); roda dentro do worker"""
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+REGISTRO = Registro()
+
+ETAPAS = REGISTRO.histograma(
+    "relatorio_etapa_segundos", "Duração de cada etapa do pipeline",
+    BUCKETS_SEGUNDOS, ("etapa",)
+)
+REQUISICOES = REGISTRO.contador(
+    "relatorio_requisicoes_total", "Requisições de geração por endpoint, arquivo e resultado",
+    ("endpoint", "arquivo", "resultado")
+)
+DURACAO_REQUISICOES = REGISTRO.histograma(
+    "relatorio_requisicao_segundos", "Duração total das requisições de geração",
+    BUCKETS_SEGUNDOS, ("endpoint",)
+)
+EM_ANDAMENTO = REGISTRO.medidor(
+    "relatorio_em_andamento", "Requisições de geração em andamento", ("endpoint",)
+)
+LIBREOFFICE = REGISTRO.contador(
+    "libreoffice_execucoes_total", "Conversões LibreOffice por modo e código de saída (ou timeout)",
+    ("modo", "resultado")
+)
+SAIDA_BYTES = REGISTRO.histograma(
+    "relatorio_saida_bytes", "Tamanho dos PDFs e HTMLs gerados",
+    BUCKETS_BYTES, ("tipo",)
+)
+
+
+@contextmanager
+def medir(etapa: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        ETAPAS.observar(duracao, etapa)
+        registrar_etapa(etapa, duracao)
+
+
+def _resultado(erro: BaseException) -> str:
+    # Erros de validação (pydantic) contam como erro do cliente
+    status = getattr(erro, "status_code", 422 if isinstance(erro, ValueError) else 500)
+    if status == 503:
+        return "saturado"
+    if 400 <= status < 500:
+        return "erro_cliente"
+    return "erro"
+
+
+@contextmanager
+def requisicao(endpoint: str, arquivo: str):
+    """Conta a requisição por resultado, com medidor de em andamento e duração total"""
+    EM_ANDAMENTO.inc(endpoint)
+    inicio = time.perf_counter()
+    resultado = "sucesso"
+    try:
+        yield
+    except BaseException as e:
+        resultado = _resultado(e)
+        raise
+    finally:
+        EM_ANDAMENTO.dec(endpoint)
+        DURACAO_REQUISICOES.observar(time.perf_counter() - inicio, endpoint)
+        REQUISICOES.inc(endpoint, arquivo, resultado)
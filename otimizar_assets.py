@@ -0,0 +1,154 @@
+"""
+Otimização dos corpos PDF (assets/corpos_pdf)
+
+Gera variantes menores de cada corpo em assets/corpos_pdf/otimizados/<perfil>/
+e um manifest.json com o SHA-256 do original usado. A API só usa uma variante
+enquanto o hash do original bater com o do manifest; caso contrário, cai no
+original.
+
+Perfis:
+    impressao  sem perdas: subconjunto das fontes usadas, deduplicação de
+               objetos, remoção de recursos órfãos e recompressão dos streams
+    email      o mesmo, mais imagens reamostradas para ~110 dpi (JPEG q60)
+
+Quase todo o tamanho dos corpos originais (~4 MB) vem de uma fonte embutida
+inteira; o subconjunto sozinho já reduz cada arquivo para menos de 100 KB.
+
+Uso:
+    python otimizar_assets.py                    # todos os perfis, só o que mudou
+    python otimizar_assets.py --perfil email
+    python otimizar_assets.py --forcar           # regenera tudo
+
+Requer PyMuPDF e fontTools (pip install pymupdf fonttools), usados só aqui;
+a API em si não depende deles.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from cache_relatorios import checksum_arquivo
+
+BASE_DIR = Path(__file__).parent
+CORPOS_PDF_DIR = BASE_DIR / "assets" / "corpos_pdf"
+VARIANTES_DIR = CORPOS_PDF_DIR / "otimizados"
+MANIFESTO = "manifest.json"
+
+PERFIS = {
+    "impressao": {"imagens": None},
+    "email": {"imagens": {"dpi_threshold": 150, "dpi_target": 110, "quality": 60}},
+}
+
+
+def otimizar(origem: Path, destino: Path, perfil: str):
+    """Grava em destino a variante do perfil (escrita atômica)"""
+    import pymupdf
+
+    doc = pymupdf.open(origem)
+    try:
+        doc.subset_fonts()
+        imagens = PERFIS[perfil]["imagens"]
+        if imagens:
+            doc.rewrite_images(**imagens)
+
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=destino.parent, suffix=".tmp", delete=False) as tmp:
+            temporario = Path(tmp.name)
+        try:
+            doc.save(temporario, garbage=4, deflate=True, clean=True, use_objstms=1)
+            temporario.replace(destino)
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+    finally:
+        doc.close()
+
+
+def carregar_manifesto(diretorio: Path = VARIANTES_DIR) -> dict:
+    try:
+        return json.loads((diretorio / MANIFESTO).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera variantes otimizadas dos corpos PDF")
+    parser.add_argument("--perfil", action="append", choices=tuple(PERFIS),
+                        help="perfil a gerar (padrão: todos)")
+    parser.add_argument("--forcar", action="store_true", help="regenera mesmo sem mudança no original")
+    args = parser.parse_args()
+
+    try:
+        import pymupdf  # noqa: F401
+        import fontTools  # noqa: F401
+    except ImportError as e:
+        print(f"✗ Dependência ausente ({e.name}): pip install pymupdf fonttools")
+        return 2
+
+    origens = sorted(CORPOS_PDF_DIR.glob("*.pdf"))
+    if not origens:
+        print(f"✗ Nenhum corpo PDF em {CORPOS_PDF_DIR}")
+        return 2
+
+    manifesto = carregar_manifesto()
+    total_origem = total_variantes = 0
+    falhas = 0
+
+    for perfil in args.perfil or PERFIS:
+        entradas = manifesto.setdefault(perfil, {})
+        print(f"→ Perfil {perfil}")
+
+        for origem in origens:
+            destino = VARIANTES_DIR / perfil / origem.name
+            sha_origem = checksum_arquivo(origem)
+            entrada = entradas.get(origem.name)
+
+            if (
+                not args.forcar and entrada and entrada["origem_sha256"] == sha_origem
+                and destino.exists() and checksum_arquivo(destino) == entrada["sha256"]
+            ):
+                print(f"  ✓ {origem.name}: sem mudança")
+            else:
+                try:
+                    otimizar(origem, destino, perfil)
+                except Exception as e:
+                    print(f"  ✗ {origem.name}: {e}")
+                    entradas.pop(origem.name, None)
+                    falhas += 1
+                    continue
+                entrada = entradas[origem.name] = {
+                    "origem_sha256": sha_origem,
+                    "origem_bytes": origem.stat().st_size,
+                    "sha256": checksum_arquivo(destino),
+                    "bytes": destino.stat().st_size,
+                }
+                print(f"  ✓ {origem.name}: {entrada['origem_bytes'] / 1024:.0f} KB → "
+                      f"{entrada['bytes'] / 1024:.0f} KB")
+
+            total_origem += entrada["origem_bytes"]
+            total_variantes += entrada["bytes"]
+
+    # Entradas de corpos que não existem mais
+    nomes = {origem.name for origem in origens}
+    for entradas in manifesto.values():
+        for nome in set(entradas) - nomes:
+            del entradas[nome]
+
+    VARIANTES_DIR.mkdir(parents=True, exist_ok=True)
+    (VARIANTES_DIR / MANIFESTO).write_text(
+        json.dumps(manifesto, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+    )
+
+    if total_origem:
+        print(f"\n✓ {total_origem / 1024 / 1024:.1f} MB → {total_variantes / 1024 / 1024:.1f} MB "
+              f"({total_variantes / total_origem:.0%})")
+    if falhas:
+        print(f"✗ {falhas} variante(s) não geradas")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
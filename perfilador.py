@@ -0,0 +1,215 @@
+"""
+Perfilamento sob demanda de requisições (cProfile)
+
+Uma requisição é perfilada quando traz o token de administração no cabeçalho
+X-Perfilamento-Token (ou no parâmetro ?perfilar=), ou quando cai na
+amostragem configurada.
+As etapas CPU-bound continuam no executor: cada uma roda sob um cProfile
+dentro do próprio worker (perfilar), que devolve as estatísticas junto com o
+resultado, e o perfil da requisição é a soma delas. O event loop não é
+perfilado, então nem /health nem as outras requisições são bloqueadas ou
+entram no perfil. Cache e repetição de resultados são ignorados, para medir o
+pipeline inteiro.
+
+A conversão no LibreOffice roda em outro processo e não entra no cProfile;
+o relatório em texto traz o tempo de cada etapa medido no relógio (inclusive
+a conversão). Uma requisição por vez é perfilada; as que chegam enquanto
+isso rodam normalmente.
+
+Cada perfil gera <nome>.prof (pstats: snakeviz, `python -m pstats`) e
+<nome>.txt, em um diretório limitado aos `max_perfis` mais recentes.
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import pstats
+import random
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import logs
+
+logger = logging.getLogger(__name__)
+
+NOME_VALIDO = re.compile(r"^[\w.-]+\.(prof|txt)$")
+
+_ativo = ContextVar("perfil_ativo", default=False)
+_estatisticas = ContextVar("perfil_estatisticas", default=None)
+
+
+def ativo() -> bool:
+    """Se a requisição atual está sendo perfilada"""
+    return _ativo.get()
+
+
+def perfilar(func, *args):
+    """Executa func(*args) sob o cProfile; devolve (resultado, estatísticas). Roda dentro do worker"""
+    perfil = cProfile.Profile()
+    resultado = perfil.runcall(func, *args)
+    perfil.create_stats()
+    return resultado, perfil.stats
+
+
+def anexar(estatisticas: dict):
+    """Soma as estatísticas de uma etapa ao perfil da requisição atual"""
+    coletadas = _estatisticas.get()
+    if coletadas is not None:
+        coletadas.append(estatisticas)
+
+
+class _EstatisticasWorker:
+    """Estatísticas vindas de um worker, no formato que pstats.Stats carrega"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def token_confere(recebido: str, token: str) -> bool:
+    return bool(token) and hmac.compare_digest(recebido.encode(), token.encode())
+
+
+class Perfilador:
+    def __init__(self, diretorio: Path, max_perfis: int, token: str = "", amostragem: float = 0.0,
+                 caminhos=(), linhas: int = 40):
+        self.diretorio = diretorio
+        self.max_perfis = max_perfis
+        self.token = token
+        self.amostragem = amostragem
+        self.caminhos = set(caminhos)
+        self.linhas = linhas
+        self.em_andamento = False
+        self._gerados = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return bool(self.token) or self.amostragem > 0
+
+    def pedido(self, scope) -> bool:
+        """Se a requisição pediu (ou sorteou) perfilamento"""
+        if scope["path"] not in self.caminhos:
+            return False
+        if self.token:
+            for nome, valor in scope["headers"]:
+                if nome == b"x-perfilamento-token":
+                    return token_confere(valor.decode("latin-1"), self.token)
+            if b"perfilar=" in scope.get("query_string", b""):
+                consulta = parse_qs(scope["query_string"].decode("latin-1"))
+                return token_confere(consulta.get("perfilar", [""])[0], self.token)
+        return self.amostragem > 0 and random.random() < self.amostragem
+
+    def salvar(self, coletadas: list, scope, status: int, duracao: float) -> str:
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        id_requisicao = logs.contexto()[0]
+        nome = "{}_{}_{}".format(
+            datetime.now().strftime("%Y%m%d-%H%M%S"),
+            scope["path"].strip("/").replace("/", "_") or "raiz",
+            re.sub(r"[^\w.-]", "_", id_requisicao),
+        )
+
+        estatisticas = pstats.Stats(stream=io.StringIO())
+        for stats in coletadas:
+            estatisticas.add(_EstatisticasWorker(stats))
+        estatisticas.dump_stats(self.diretorio / f"{nome}.prof")
+
+        texto = io.StringIO()
+        texto.write(f"{scope['method']} {scope['path']} -> {status} em {duracao * 1000:.0f} ms "
+                    f"(requisição {id_requisicao})\n\n")
+        resumo = logs.resumo_atual()
+        if resumo and resumo["etapas"]:
+            texto.write("Etapas (relógio, inclui a espera pelo LibreOffice):\n")
+            for etapa, segundos in resumo["etapas"].items():
+                texto.write(f"  {etapa:<20}{segundos * 1000:>10.1f} ms\n")
+            texto.write("\n")
+        texto.write(f"cProfile das {len(coletadas)} etapas executadas nos workers:\n")
+        estatisticas.stream = texto
+        estatisticas.sort_stats("cumulative").print_stats(self.linhas)
+        estatisticas.sort_stats("tottime").print_stats(self.linhas)
+        (self.diretorio / f"{nome}.txt").write_text(texto.getvalue(), encoding="utf-8")
+
+        self._limitar()
+        self._gerados += 1
+        return nome
+
+    def _limitar(self):
+        perfis = sorted(self.diretorio.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for antigo in perfis[self.max_perfis:]:
+            antigo.unlink(missing_ok=True)
+            antigo.with_suffix(".txt").unlink(missing_ok=True)
+
+    def listar(self) -> list:
+        perfis = []
+        for caminho in sorted(self.diretorio.glob("*.prof"), reverse=True) if self.diretorio.exists() else []:
+            info = caminho.stat()
+            perfis.append({
+                "nome": caminho.stem,
+                "bytes": info.st_size,
+                "criado_em": info.st_mtime,
+                "arquivos": [caminho.name, caminho.with_suffix(".txt").name],
+            })
+        return perfis
+
+    def caminho(self, arquivo: str):
+        """Arquivo de perfil pelo nome, ou None se inválido/inexistente"""
+        if not NOME_VALIDO.match(arquivo):
+            return None
+        caminho = self.diretorio / arquivo
+        return caminho if caminho.is_file() else None
+
+    def estatisticas(self) -> dict:
+        return {
+            "habilitado": self.habilitado,
+            "amostragem": self.amostragem,
+            "em_andamento": self.em_andamento,
+            "gerados": self._gerados,
+        }
+
+
+class PerfilMiddleware:
+    """Perfila as requisições pedidas; as demais passam direto"""
+
+    def __init__(self, app, perfilador: Perfilador):
+        self.app = app
+        self.perfilador = perfilador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.perfilador.pedido(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self.perfilador.em_andamento:
+            logger.warning("⚠ Outro perfil em andamento: requisição segue sem perfil")
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        self.perfilador.em_andamento = True
+        coletadas = []
+        tokens = (_ativo.set(True), _estatisticas.set(coletadas))
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _estatisticas.reset(tokens[1])
+            _ativo.reset(tokens[0])
+            self.perfilador.em_andamento = False
+            try:
+                nome = self.perfilador.salvar(coletadas, scope, status, time.perf_counter() - inicio)
+                logger.info("✓ Perfil gravado: %s", nome)
+            except Exception as e:
+                logger.error(f"✗ Erro ao gravar perfil: {e}")
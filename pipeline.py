@@ -0,0 +1,97 @@
+"""
+Pipeline em estágios para a geração de relatórios
+
+Cada estágio (preencher, converter, juntar) tem seu próprio número de vagas
+e uma fila de espera limitada. Uma requisição só ocupa a vaga do estágio em
+que está: enquanto o LibreOffice converte a capa de uma, o preenchimento e a
+junção/base64 de outras avançam nos seus estágios, em vez de todas
+disputarem os mesmos recursos do começo ao fim da geração.
+
+Fila de um estágio cheia levanta EstagioSaturado (um ExecutorSaturado, que
+os endpoints já respondem com 503).
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from execucao import ExecutorSaturado
+
+PREENCHER = "preencher"
+CONVERTER = "converter"
+JUNTAR = "juntar"
+
+
+class EstagioSaturado(ExecutorSaturado):
+    """Fila de espera de um estágio do pipeline atingiu o limite"""
+
+
+class Estagio:
+    """Vagas e fila limitada de um estágio"""
+
+    def __init__(self, nome: str, workers: int, max_fila: int):
+        self.nome = nome
+        self.workers = max(1, workers)
+        self.max_fila = max_fila
+        self._vagas = None
+        self._aguardando = 0
+        self._em_execucao = 0
+        self._concluidas = 0
+        self._recusadas = 0
+        self._ocupado_s = 0.0
+        self._espera_s = 0.0
+
+    @asynccontextmanager
+    async def vaga(self):
+        if self._vagas is None:
+            self._vagas = asyncio.Semaphore(self.workers)
+
+        if self._vagas.locked() and self._aguardando >= self.max_fila:
+            self._recusadas += 1
+            raise EstagioSaturado(
+                f"Estágio {self.nome} saturado ({self._aguardando} aguardando)"
+            )
+
+        chegada = time.perf_counter()
+        self._aguardando += 1
+        try:
+            await self._vagas.acquire()
+        finally:
+            self._aguardando -= 1
+
+        inicio = time.perf_counter()
+        self._espera_s += inicio - chegada
+        self._em_execucao += 1
+        try:
+            yield
+        finally:
+            self._em_execucao -= 1
+            self._concluidas += 1
+            self._ocupado_s += time.perf_counter() - inicio
+            self._vagas.release()
+
+    def estatisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "em_execucao": self._em_execucao,
+            "fila": self._aguardando,
+            "max_fila": self.max_fila,
+            "concluidas": self._concluidas,
+            "recusadas": self._recusadas,
+            "espera_total_s": round(self._espera_s, 3),
+            "ocupado_total_s": round(self._ocupado_s, 3),
+        }
+
+
+class PipelineRelatorios:
+    """Estágios da geração de um relatório, por nome"""
+
+    def __init__(self, estagios):
+        self.estagios = {estagio.nome: estagio for estagio in estagios}
+
+    def vaga(self, nome: str):
+        """Ocupa uma vaga do estágio `nome` (async with)"""
+        return self.estagios[nome].vaga()
+
+    def estatisticas(self) -> dict:
+        return {nome: estagio.estatisticas() for nome, estagio in self.estagios.items()}
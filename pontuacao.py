@@ -0,0 +1,213 @@
+"""
+Pontuação do questionário LSP-R a partir das respostas brutas
+
+Mesma regra do Function Node do n8n (N8N_INTEGRATION.md), calculada no
+servidor para qualquer número de respondentes de uma vez: as respostas viram
+uma matriz N x 24 e as pontuações saem de um único produto com a matriz de
+itens de cada estilo.
+
+Empates seguem o n8n: entre pontuações iguais vence o estilo que vem depois
+na ordem PESSOAS, ACAO, TEMPO, MENSAGEM. O menos desenvolvido é escolhido
+entre os estilos restantes, então nunca coincide com o predominante.
+"""
+
+import csv
+import io
+import re
+
+import numpy as np
+
+ESTILOS = ("PESSOAS", "ACAO", "TEMPO", "MENSAGEM")
+
+# Itens (1-24) de cada estilo
+PERFIS = {
+    "PESSOAS": [1, 5, 9, 13, 17, 21],
+    "ACAO": [2, 6, 10, 14, 18, 22],
+    "TEMPO": [3, 7, 11, 15, 19, 23],
+    "MENSAGEM": [4, 8, 12, 16, 20, 24],
+}
+
+NUM_ITENS = 24
+
+# 6 itens por estilo com pontuação máxima 60 (Pontuacoes): cada resposta vai de 0 a 10
+RESPOSTA_MIN = 0
+RESPOSTA_MAX = 10
+
+ARQUIVOS = {
+    "ACAO-MENSAGEM": "relatório_mais_ação_menos_mensagem",
+    "ACAO-PESSOAS": "relatório_mais_ação_menos_pessoas",
+    "ACAO-TEMPO": "relatório_mais_ação_menos_tempo",
+    "MENSAGEM-ACAO": "relatório_mais_mensagem_menos_ação",
+    "MENSAGEM-PESSOAS": "relatório_mais_mensagem_menos_pessoas",
+    "MENSAGEM-TEMPO": "relatório_mais_mensagem_menos_tempo",
+    "PESSOAS-ACAO": "relatório_mais_pessoas_e_menos_ação",
+    "PESSOAS-MENSAGEM": "relatório_mais_pessoas_e_menos_mensagem",
+    "PESSOAS-TEMPO": "relatório_mais_pessoas_e_menos_tempo",
+    "TEMPO-ACAO": "relatório_mais_tempo_e_menos_ação",
+    "TEMPO-MENSAGEM": "relatório_mais_tempo_e_menos_mensagem",
+    "TEMPO-PESSOAS": "relatório_mais_tempo_e_menos_pessoas",
+}
+
+# Matriz 24 x 4: item i pertence ao estilo j
+MATRIZ_ESTILOS = np.zeros((NUM_ITENS, len(ESTILOS)), dtype=np.int64)
+for _coluna, _estilo in enumerate(ESTILOS):
+    MATRIZ_ESTILOS[[item - 1 for item in PERFIS[_estilo]], _coluna] = 1
+
+# Tabela [predominante, menos] -> arquivo
+TABELA_ARQUIVOS = [
+    [ARQUIVOS.get(f"{mais}-{menos}") for menos in ESTILOS]
+    for mais in ESTILOS
+]
+
+ITEM = re.compile(r"^\s*(\d+)\s*\.")
+CAMPOS_NOME = ("participante", "nome", "nome completo", "name")
+
+
+class ErroRespostas(ValueError):
+    """Respostas de um respondente não puderam ser interpretadas"""
+
+
+def _inteiro(valor) -> int:
+    if isinstance(valor, bool):
+        raise ErroRespostas(f"Resposta inválida: {valor!r}")
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    try:
+        return int(str(valor).strip())
+    except ValueError:
+        raise ErroRespostas(f"Resposta inválida: {valor!r}")
+
+
+def extrair_respondente(registro: dict):
+    """(participante, 24 respostas) de um registro JSON
+
+    Aceita `respostas` como lista de 24 valores ou dicionário item -> valor, ou
+    as colunas do Google Forms ("1. ...", "2. ...") direto no registro.
+    """
+    participante = "Participante"
+    for campo in ("participante", "nome"):
+        valor = registro.get(campo)
+        if isinstance(valor, str) and valor.strip():
+            participante = valor.strip()
+            break
+    else:
+        for chave, valor in registro.items():
+            if chave.strip().lower() in CAMPOS_NOME and str(valor).strip():
+                participante = str(valor).strip()
+                break
+
+    respostas = registro.get("respostas")
+    if isinstance(respostas, list):
+        if len(respostas) != NUM_ITENS:
+            raise ErroRespostas(f"Esperadas {NUM_ITENS} respostas, recebidas {len(respostas)}")
+        # Conversão e validação dos valores ficam para a montagem da matriz
+        return participante, respostas
+
+    if isinstance(respostas, dict):
+        por_item = {_inteiro(chave): valor for chave, valor in respostas.items()}
+    else:
+        por_item = {}
+        for chave, valor in registro.items():
+            encontrado = ITEM.match(str(chave))
+            if encontrado:
+                por_item[int(encontrado.group(1))] = valor
+
+    faltando = [item for item in range(1, NUM_ITENS + 1) if item not in por_item]
+    if faltando:
+        raise ErroRespostas(f"Itens sem resposta: {faltando}")
+    return participante, [_inteiro(por_item[item]) for item in range(1, NUM_ITENS + 1)]
+
+
+def ler_csv(conteudo: str):
+    """Registros (dicts) de uma exportação CSV do Google Forms"""
+    amostra = conteudo[:4096]
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+    return list(csv.DictReader(io.StringIO(conteudo), dialect=dialeto))
+
+
+def _matriz(linhas: list, indices: list, resultados: list):
+    """Matriz N x 24 de inteiros; linhas com valores não inteiros viram erro"""
+    # O numpy converteria booleanos misturados a inteiros em 1/0: eles vão para o caminho lento
+    if not any(type(valor) is bool for linha in linhas for valor in linha):
+        matriz = np.array(linhas)
+        if matriz.dtype.kind in "iu" and matriz.ndim == 2:
+            return matriz.astype(np.int64, copy=False)
+
+    # Caminho lento: algum valor veio como texto, float ou booleano
+    convertidas = []
+    validos = []
+    for indice, linha in zip(indices, linhas):
+        try:
+            convertidas.append([_inteiro(valor) for valor in linha])
+            validos.append(indice)
+        except ErroRespostas as e:
+            resultados[indice] = {"indice": indice, "erro": str(e)}
+    indices[:] = validos
+    return np.array(convertidas, dtype=np.int64) if convertidas else None
+
+
+def pontuar(matriz: np.ndarray):
+    """Pontuações (N x 4) e índices de predominante e menos desenvolvido"""
+    pontuacoes = matriz @ MATRIZ_ESTILOS
+    n = len(pontuacoes)
+    ultimo = len(ESTILOS) - 1
+
+    # argmax/argmin devolvem a primeira ocorrência; invertendo as colunas vence o último estilo
+    predominante = ultimo - np.argmax(pontuacoes[:, ::-1], axis=1)
+
+    restantes = pontuacoes.copy()
+    restantes[np.arange(n), predominante] = np.iinfo(restantes.dtype).max
+    menos = ultimo - np.argmin(restantes[:, ::-1], axis=1)
+
+    return pontuacoes, predominante, menos
+
+
+def pontuar_registros(registros: list) -> list:
+    """Resultado por registro: pontuações, estilos e arquivo, ou o erro de leitura"""
+    resultados = [None] * len(registros)
+    linhas = []
+    indices = []
+
+    for indice, registro in enumerate(registros):
+        try:
+            if not isinstance(registro, dict):
+                raise ErroRespostas("Registro deve ser um objeto")
+            participante, respostas = extrair_respondente(registro)
+        except ErroRespostas as e:
+            resultados[indice] = {"indice": indice, "erro": str(e)}
+            continue
+        resultados[indice] = {"indice": indice, "participante": participante}
+        linhas.append(respostas)
+        indices.append(indice)
+
+    if not linhas:
+        return resultados
+
+    matriz = _matriz(linhas, indices, resultados)
+    if matriz is None:
+        return resultados
+
+    fora = ((matriz < RESPOSTA_MIN) | (matriz > RESPOSTA_MAX)).any(axis=1)
+    pontuacoes, predominante, menos = pontuar(matriz)
+
+    for indice, linha_fora, pontos, mais, menor in zip(
+        indices, fora.tolist(), pontuacoes.tolist(), predominante.tolist(), menos.tolist()
+    ):
+        resultado = resultados[indice]
+        if linha_fora:
+            resultados[indice] = {
+                "indice": indice,
+                "erro": f"Respostas fora do intervalo {RESPOSTA_MIN}-{RESPOSTA_MAX}"
+            }
+            continue
+        resultado["pontuacoes"] = dict(zip(ESTILOS, pontos))
+        resultado["predominante"] = ESTILOS[mais]
+        resultado["menosDesenvolvido"] = ESTILOS[menor]
+        resultado["arquivo"] = TABELA_ARQUIVOS[mais][menor]
+
+    return resultados
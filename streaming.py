@@ -0,0 +1,66 @@
+"""
+Respostas em streaming para relatórios grandes
+
+O PDF é lido do disco em blocos e enviado conforme é lido, em vez de ser
+carregado inteiro na memória e embutido em uma string base64 única. O pico de
+memória por requisição fica constante, independente do tamanho do corpo.
+"""
+
+import asyncio
+import base64
+import json
+import uuid
+from pathlib import Path
+from urllib.parse import quote
+
+# Múltiplo de 3: cada bloco vira base64 sem padding intermediário
+TAMANHO_BLOCO = 3 * 64 * 1024
+
+
+async def _ler_blocos(caminho: Path):
+    with open(caminho, "rb") as f:
+        while True:
+            bloco = await asyncio.to_thread(f.read, TAMANHO_BLOCO)
+            if not bloco:
+                break
+            yield bloco
+
+
+async def stream_json_base64(campo_pdf: str, caminho_pdf: Path, antes: dict, depois: dict):
+    """JSON com o PDF em base64 gerado incrementalmente (mesmo formato da resposta completa)"""
+    abertura = json.dumps(antes, ensure_ascii=False)[:-1]
+    separador = ", " if antes else ""
+    yield f'{abertura}{separador}"{campo_pdf}": "'.encode()
+
+    async for bloco in _ler_blocos(caminho_pdf):
+        yield base64.b64encode(bloco)
+
+    fechamento = json.dumps(depois, ensure_ascii=False)[1:]
+    separador = ", " if depois else ""
+    yield f'"{separador}{fechamento}'.encode()
+
+
+def fronteira_multipart() -> str:
+    return f"relatorio-{uuid.uuid4().hex}"
+
+
+async def stream_multipart(fronteira: str, metadados: dict, caminho_pdf: Path, filename: str):
+    """multipart/mixed: parte JSON (metadados + HTML) seguida do PDF binário"""
+    corpo_json = json.dumps(metadados, ensure_ascii=False).encode()
+    yield (
+        f"--{fronteira}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(corpo_json)}\r\n\r\n"
+    ).encode() + corpo_json + b"\r\n"
+
+    yield (
+        f"--{fronteira}\r\n"
+        f"Content-Type: application/pdf\r\n"
+        f"Content-Disposition: attachment; filename*=UTF-8''{quote(filename)}\r\n"
+        f"Content-Length: {caminho_pdf.stat().st_size}\r\n\r\n"
+    ).encode()
+
+    async for bloco in _ler_blocos(caminho_pdf):
+        yield bloco
+
+    yield f"\r\n--{fronteira}--\r\n".encode()
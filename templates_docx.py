@@ -0,0 +1,190 @@
+"""
+Cache dos templates DOCX da capa, com índice dos pontos de substituição
+
+Cada template é aberto uma vez por processo: a árvore XML do corpo fica em
+memória já normalizada, junto com o índice dos parágrafos/runs que recebem
+os dados do participante. Cada requisição copia só o document.xml, aplica as
+substituições nos nós indexados e grava o DOCX reaproveitando as demais
+partes do pacote já serializadas. Entradas são recarregadas quando mtime ou
+tamanho do arquivo mudam.
+
+Templates compilados por compilar_templates.py já vêm normalizados e são
+usados no lugar dos originais enquanto os checksums do manifest baterem.
+"""
+
+import copy
+import io
+import json
+import logging
+import threading
+import zipfile
+from pathlib import Path
+
+from cache_relatorios import checksum_arquivo
+
+logger = logging.getLogger(__name__)
+
+# Textos que a capa precisa ter para receber os dados do participante
+CAMPOS_OBRIGATORIOS = (
+    "Nome completo",
+    "Estilo de escuta",
+    "Pontuação",
+    "Estilo predominante:",
+    "Estilo menos desenvolvido:",
+)
+
+
+def normalizar_template(doc):
+    """Aplica DejaVu Sans 12pt e remove realce em todo o documento (uma vez por template)"""
+    from docx.shared import Pt
+
+    for para in doc.paragraphs:
+        for run in para.runs:
+            run.font.name = 'DejaVu Sans'
+            run.font.size = Pt(12)
+            run.font.highlight_color = None
+
+
+def campos_ausentes(doc) -> list:
+    texto = "\n".join(para.text for para in doc.paragraphs)
+    return [campo for campo in CAMPOS_OBRIGATORIOS if campo not in texto]
+
+
+class TemplateDocx:
+    """Template parseado, normalizado e indexado"""
+
+    def __init__(self, caminho: Path, indexador, normalizador=None):
+        self.caminho = caminho
+        info = caminho.stat()
+        self.assinatura = (info.st_mtime_ns, info.st_size)
+
+        from docx import Document
+
+        documento = Document(caminho)
+        if normalizador is not None:
+            normalizador(documento)
+        self.indice = indexador(documento)
+
+        self._parte = documento.part
+        self._nome_parte = self._parte.partname.lstrip("/")
+        self._elemento = documento.element
+
+        # Demais partes do pacote (estilos, header, imagens...) serializadas uma única vez
+        buffer = io.BytesIO()
+        documento.save(buffer)
+        with zipfile.ZipFile(buffer) as pacote:
+            self._partes = [(nome, pacote.read(nome)) for nome in pacote.namelist()]
+
+    def novo_documento(self):
+        """Cópia independente do corpo do template, pronta para edição"""
+        from docx.document import Document as DocumentoDocx
+
+        return DocumentoDocx(copy.deepcopy(self._elemento), self._parte)
+
+    def salvar(self, documento, output_path: Path):
+        """Grava o DOCX trocando apenas o document.xml"""
+        from docx.opc.oxml import serialize_part_xml
+
+        xml = serialize_part_xml(documento.element)
+        # Imagens já vêm comprimidas; ZIP_STORED evita recomprimir a cada capa
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_STORED) as saida:
+            for nome, conteudo in self._partes:
+                saida.writestr(nome, xml if nome == self._nome_parte else conteudo)
+
+
+class CacheTemplates:
+    """Templates DOCX carregados sob demanda e invalidados por mtime/tamanho
+
+    Templates dentro de `compilados_dir` já foram normalizados na compilação.
+    """
+
+    def __init__(self, indexador, normalizador=None, compilados_dir: Path = None):
+        self.indexador = indexador
+        self.normalizador = normalizador
+        self.compilados_dir = compilados_dir
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def obter(self, caminho: Path) -> TemplateDocx:
+        info = caminho.stat()
+        assinatura = (info.st_mtime_ns, info.st_size)
+
+        with self._lock:
+            template = self._entradas.get(caminho)
+            if template is not None and template.assinatura == assinatura:
+                return template
+
+            normalizador = None if caminho.parent == self.compilados_dir else self.normalizador
+            template = TemplateDocx(caminho, self.indexador, normalizador)
+            self._entradas[caminho] = template
+            logger.info(f"✓ Template carregado: {caminho.name}")
+            return template
+
+    def pre_carregar(self, caminhos):
+        for caminho in caminhos:
+            if caminho.exists():
+                try:
+                    self.obter(caminho)
+                except Exception as e:
+                    logger.error(f"✗ Erro ao carregar template {caminho.name}: {e}")
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class TemplatesCompilados:
+    """Templates compilados (compilar_templates.py), validados pelo manifest
+
+    Um template compilado só é usado se os SHA-256 do original e do compilado
+    baterem com o manifest; senão a requisição usa o original, normalizado ao
+    carregar.
+    """
+
+    def __init__(self, templates_dir: Path, compilados_dir: Path, manifesto: str = "manifest.json"):
+        self.templates_dir = templates_dir
+        self.compilados_dir = compilados_dir
+        self._manifesto = compilados_dir / manifesto
+        self._assinatura = None
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def _carregar(self) -> dict:
+        try:
+            info = self._manifesto.stat()
+        except FileNotFoundError:
+            return {}
+        assinatura = (info.st_mtime_ns, info.st_size)
+
+        with self._lock:
+            if assinatura != self._assinatura:
+                try:
+                    self._entradas = json.loads(self._manifesto.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.error(f"✗ Manifest de templates inválido: {e}")
+                    self._entradas = {}
+                self._assinatura = assinatura
+            return self._entradas
+
+    def _compilado_valido(self, arquivo: str):
+        entrada = self._carregar().get(arquivo)
+        if entrada is None:
+            return None
+        original = self.templates_dir / entrada["origem"]
+        compilado = self.compilados_dir / f"{arquivo}.docx"
+        try:
+            if (
+                checksum_arquivo(original) == entrada["origem_sha256"]
+                and checksum_arquivo(compilado) == entrada["sha256"]
+            ):
+                return compilado
+        except (OSError, KeyError):
+            pass
+        return None
+
+    def resolver(self, arquivo: str) -> Path:
+        """Template compilado de `arquivo`, ou o original se não houver compilado válido"""
+        return self._compilado_valido(arquivo) or self.templates_dir / f"{arquivo}.docx"
+
+    def verificar(self, arquivos) -> list:
+        """Arquivos sem template compilado válido (manifest ausente, desatualizado ou incompleto)"""
+        return [arquivo for arquivo in arquivos if self._compilado_valido(arquivo) is None]
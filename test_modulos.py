@@ -0,0 +1,942 @@
+"""
+Testes dos módulos da API (sem servidor rodando)
+Execute: python test_modulos.py   (ou: python -m pytest test_modulos.py)
+
+Os testes de endpoint usam o TestClient com o libreoffice_falso.py no lugar do
+LibreOffice e diretórios temporários, então rodam em qualquer máquina com as
+dependências do requirements.txt.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+TEMP = Path(tempfile.mkdtemp(prefix="lsp_testes_"))
+
+# Configuração do app importado pelos testes de endpoint (antes do import)
+os.environ.update({
+    "DADOS_DIR": str(TEMP / "dados"),
+    "TRABALHO_DIR": str(TEMP / "trabalho"),
+    "LIBREOFFICE_BIN": str(BASE_DIR / "libreoffice_falso.py"),
+    "LIBREOFFICE_FALSO_LATENCIA_S": "0.05",
+    "LIBREOFFICE_POOL_TAMANHO": "0",
+    "EXECUTOR_PROCESSOS": "0",
+    "EXECUTOR_WORKERS": "1",
+    "EXECUTOR_MAX_FILA": "4",
+    "CACHE_HABILITADO": "0",
+    "JOBS_WORKERS": "0",
+    "AQUECIMENTO_EM_FUNDO": "0",
+    "AQUECIMENTO_CONVERSAO": "0",
+    "LOG_NIVEL": "WARNING",
+})
+sys.path.insert(0, str(BASE_DIR))
+
+
+# Cores para output
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    END = '\033[0m'
+
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+
+def print_error(msg):
+    print(f"{Colors.RED}✗ {msg}{Colors.END}")
+
+
+DADOS_EXEMPLO = {
+    "participante": "João Silva",
+    "pontuacoes": {"PESSOAS": 37, "ACAO": 18, "TEMPO": 41, "MENSAGEM": 38},
+    "predominante": "TEMPO",
+    "menosDesenvolvido": "ACAO",
+    "arquivo": "relatório_mais_tempo_e_menos_ação"
+}
+
+
+def linhas_ndjson(resposta) -> list:
+    return [json.loads(linha) for linha in resposta.text.splitlines() if linha.strip()]
+
+
+def test_lote_maior_que_a_fila():
+    """Lote com mais itens que workers + fila do executor termina sem ExecutorSaturado"""
+    from fastapi.testclient import TestClient
+    import app
+
+    quantidade = app.executor.workers + app.executor.max_fila + 8
+    itens = [dict(DADOS_EXEMPLO, participante=f"Participante {i}") for i in range(quantidade)]
+
+    with TestClient(app.app) as cliente:
+        resposta = cliente.post("/gerar-relatorios-lote", json=itens)
+
+    assert resposta.status_code == 200
+    linhas = linhas_ndjson(resposta)
+    assert len(linhas) == quantidade
+    falhas = [linha for linha in linhas if not linha["success"]]
+    assert not falhas, falhas[:3]
+    assert sorted(linha["indice"] for linha in linhas) == list(range(quantidade))
+
+
+def test_lote_maior_que_o_pool():
+    """No modo pool, a espera por instância livre não conta no timeout da conversão"""
+    import asyncio
+    from fastapi.testclient import TestClient
+    from conversor import PoolLibreOffice
+    from libreoffice_falso import pdf_em_branco
+    import app
+
+    pool = PoolLibreOffice("libreoffice", 2, TEMP / "pool", timeout=1.0)
+    conversoes = []
+
+    def converter(docx_path, pdf_path, timeout):
+        conversoes.append(docx_path)
+        time.sleep(0.3)
+        Path(pdf_path).write_bytes(pdf_em_branco())
+
+    for instancia in pool._instancias:
+        instancia.converter = converter
+
+    # 20 capas x 0,3 s em 2 instâncias: as últimas esperam bem mais que o timeout de 1 s
+    itens = [dict(DADOS_EXEMPLO, participante=f"Pool {i}") for i in range(20)]
+    with TestClient(app.app) as cliente:
+        app.pool_libreoffice, app.vagas_pool = pool, asyncio.Semaphore(pool.tamanho)
+        try:
+            resposta = cliente.post("/gerar-relatorios-lote", json=itens)
+        finally:
+            app.pool_libreoffice, app.vagas_pool = None, None
+
+    assert resposta.status_code == 200
+    linhas = linhas_ndjson(resposta)
+    falhas = [linha for linha in linhas if not linha["success"]]
+    assert not falhas, falhas[:3]
+    assert len(linhas) == len(conversoes) == 20
+
+
+def test_lote_falhas_parciais():
+    """Itens inválidos ou com erro na geração falham sozinhos; os demais saem no NDJSON"""
+    from fastapi.testclient import TestClient
+    import app
+
+    itens = [
+        DADOS_EXEMPLO,
+        dict(DADOS_EXEMPLO, pontuacoes={"PESSOAS": 70, "ACAO": 18, "TEMPO": 41, "MENSAGEM": 38}),
+        dict(DADOS_EXEMPLO, arquivo="inexistente"),
+        dict(DADOS_EXEMPLO, menosDesenvolvido="TEMPO"),
+        dict(DADOS_EXEMPLO, participante="Falha na junção"),
+        dict(DADOS_EXEMPLO, participante="Maria Souza"),
+    ]
+
+    juntar_pdfs = app.juntar_pdfs
+
+    def juntar_ou_falhar(capa_pdf, corpo_pdf, saida):
+        if Path(capa_pdf).name == "capa_4.pdf":
+            raise RuntimeError("PDF corrompido")
+        return juntar_pdfs(capa_pdf, corpo_pdf, saida)
+
+    app.juntar_pdfs = juntar_ou_falhar
+    try:
+        with TestClient(app.app) as cliente:
+            resposta = cliente.post("/gerar-relatorios-lote", json=itens)
+    finally:
+        app.juntar_pdfs = juntar_pdfs
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    linhas = {linha["indice"]: linha for linha in linhas_ndjson(resposta)}
+    assert sorted(linhas) == list(range(len(itens)))
+
+    for indice in (0, 5):
+        assert linhas[indice]["success"] is True
+        assert linhas[indice]["participante"] == itens[indice]["participante"]
+        assert linhas[indice]["pdf_base64"]
+    assert linhas[1]["success"] is False and isinstance(linhas[1]["erro"], list)
+    assert linhas[2] == {"indice": 2, "success": False, "erro": "Arquivo inválido: inexistente"}
+    assert linhas[3]["success"] is False and "não podem ser iguais" in linhas[3]["erro"]
+    assert linhas[4] == {"indice": 4, "success": False, "erro": "PDF corrompido"}
+
+
+def test_formatos_resposta_completo():
+    """json-stream devolve o mesmo JSON do formato json; multipart traz metadados e PDF binário"""
+    import base64
+    from fastapi.testclient import TestClient
+    import app
+
+    dados = dict(DADOS_EXEMPLO, participante="José Araújo")
+    with TestClient(app.app) as cliente:
+        normal = cliente.post("/gerar-relatorio-completo", json=dados)
+        stream = cliente.post("/gerar-relatorio-completo?formato=json-stream", json=dados)
+        multipart = cliente.post("/gerar-relatorio-completo?formato=multipart", json=dados)
+
+    assert normal.status_code == stream.status_code == multipart.status_code == 200
+
+    esperado = normal.json()
+    recebido = stream.json()
+    assert stream.headers["content-type"].startswith("application/json")
+    assert list(recebido) == list(esperado)
+    assert {c: recebido[c] for c in ("success", "html", "filename", "participante")} == \
+        {c: esperado[c] for c in ("success", "html", "filename", "participante")}
+    pdf = base64.b64decode(recebido["pdf_base64"], validate=True)
+    assert pdf.startswith(b"%PDF") and len(pdf) == len(base64.b64decode(esperado["pdf_base64"]))
+
+    tipo = multipart.headers["content-type"]
+    assert tipo.startswith("multipart/mixed; boundary=relatorio-")
+    fronteira = tipo.split("boundary=", 1)[1].encode()
+    corpo = multipart.content
+    assert corpo.startswith(b"--" + fronteira + b"\r\n")
+    assert corpo.endswith(b"\r\n--" + fronteira + b"--\r\n")
+
+    partes = corpo[:-len(b"\r\n--" + fronteira + b"--\r\n")].split(b"--" + fronteira + b"\r\n")[1:]
+    assert len(partes) == 2
+    cabecalhos = []
+    conteudos = []
+    for parte in partes:
+        cabecalho, conteudo = parte.split(b"\r\n\r\n", 1)
+        cabecalho = dict(linha.split(": ", 1) for linha in cabecalho.decode().split("\r\n"))
+        conteudo = conteudo.removesuffix(b"\r\n")
+        assert int(cabecalho["Content-Length"]) == len(conteudo)
+        cabecalhos.append(cabecalho)
+        conteudos.append(conteudo)
+
+    assert cabecalhos[0]["Content-Type"] == "application/json; charset=utf-8"
+    metadados = json.loads(conteudos[0])
+    assert metadados == {c: esperado[c] for c in ("success", "html", "filename", "participante")}
+
+    assert cabecalhos[1]["Content-Type"] == "application/pdf"
+    assert cabecalhos[1]["Content-Disposition"] == \
+        "attachment; filename*=UTF-8''relatorio_Jos%C3%A9_Ara%C3%BAjo.pdf"
+    assert conteudos[1].startswith(b"%PDF") and len(conteudos[1]) == len(pdf)
+
+
+def test_stream_json_base64_em_blocos():
+    """PDF maior que um bloco gera o mesmo base64 da codificação de uma vez só"""
+    import asyncio
+    import base64
+    from streaming import TAMANHO_BLOCO, stream_json_base64
+
+    caminho = Path(tempfile.mkdtemp(dir=TEMP)) / "grande.pdf"
+    conteudo = os.urandom(2 * TAMANHO_BLOCO + 1234)
+    caminho.write_bytes(conteudo)
+
+    async def coletar():
+        return [
+            bloco async for bloco in
+            stream_json_base64("pdf_base64", caminho, {"success": True}, {"filename": "grande.pdf"})
+        ]
+
+    blocos = asyncio.run(coletar())
+    assert len(blocos) > 3
+    assert json.loads(b"".join(blocos)) == {
+        "success": True,
+        "pdf_base64": base64.b64encode(conteudo).decode(),
+        "filename": "grande.pdf",
+    }
+
+
+def test_cache_templates_indice():
+    """Template indexado uma vez, reaproveitado entre capas e recarregado quando o arquivo muda"""
+    import shutil
+    from docx import Document
+    from templates_docx import CacheTemplates
+    import app
+
+    caminho = Path(tempfile.mkdtemp(dir=TEMP)) / "template.docx"
+    shutil.copy(app.templates_compilados.resolver(DADOS_EXEMPLO["arquivo"]), caminho)
+
+    indexacoes = []
+
+    def indexador(doc):
+        indexacoes.append(caminho)
+        return app.indexar_template(doc)
+
+    cache = CacheTemplates(indexador, app.normalizar_template)
+    template = cache.obter(caminho)
+    assert cache.obter(caminho) is template
+    assert len(indexacoes) == len(cache) == 1
+    assert template.indice["nome"] and template.indice["tabela"] is not None
+    assert template.indice["predominante"] and template.indice["menos_desenvolvido"]
+
+    # Capas preenchidas a partir da mesma entrada não alteram o corpo do template
+    saidas = []
+    for participante in ("Ana Prado", "Bruno Lima"):
+        doc = template.novo_documento()
+        for i, runs in template.indice["nome"]:
+            for j in runs:
+                run = doc.paragraphs[i].runs[j]
+                run.text = run.text.replace("Nome completo", participante)
+        saida = caminho.with_name(f"{participante}.docx")
+        template.salvar(doc, saida)
+        saidas.append("\n".join(para.text for para in Document(saida).paragraphs))
+    assert "Ana Prado" in saidas[0] and "Nome completo" not in saidas[0]
+    assert "Bruno Lima" in saidas[1] and "Ana Prado" not in saidas[1]
+    assert "Nome completo" in "\n".join(para.text for para in template.novo_documento().paragraphs)
+
+    # Arquivo trocado (mtime/tamanho): a próxima capa usa o template novo
+    documento = Document(caminho)
+    documento.add_paragraph("Parágrafo novo")
+    documento.save(caminho)
+    novo = cache.obter(caminho)
+    assert novo is not template and len(indexacoes) == 2
+    assert novo.novo_documento().paragraphs[-1].text == "Parágrafo novo"
+    assert cache.obter(caminho) is novo and len(cache) == 1
+
+
+def nova_fila(reserva_s=60, max_tentativas=2):
+    from fila_jobs import FilaJobs
+    diretorio = Path(tempfile.mkdtemp(dir=TEMP))
+    return FilaJobs(diretorio / "jobs.db", diretorio / "resultados", reserva_s, max_tentativas)
+
+
+def test_fila_jobs_nova_tentativa():
+    """Falha volta o job para a fila até esgotar as tentativas"""
+    from fila_jobs import ERRO, PENDENTE
+
+    fila = nova_fila(max_tentativas=2)
+    job_id = fila.criar({"n": 1})
+
+    job = fila.reservar("w1")
+    assert job["id"] == job_id and job["tentativas"] == 1 and job["payload"] == {"n": 1}
+    assert fila.reservar("w2") is None
+    assert fila.falhar(job_id, "falhou", job["tentativas"]) == PENDENTE
+
+    job = fila.reservar("w1")
+    assert job["tentativas"] == 2
+    assert fila.falhar(job_id, "falhou", job["tentativas"]) == ERRO
+    assert fila.reservar("w1") is None
+    assert fila.obter(job_id)["status"] == ERRO
+
+
+def test_fila_jobs_reserva_expirada():
+    """Reserva expirada volta para a fila; esgotadas as tentativas, vira erro e não trava a fila"""
+    from fila_jobs import ERRO
+
+    fila = nova_fila(reserva_s=0.05, max_tentativas=2)
+    venenoso = fila.criar({"n": 1})
+    time.sleep(0.01)
+    seguinte = fila.criar({"n": 2})
+
+    # O worker "morre" duas vezes com o mesmo job (nunca chama concluir/falhar)
+    for tentativa in (1, 2):
+        job = fila.reservar(f"w{tentativa}")
+        assert job["id"] == venenoso and job["tentativas"] == tentativa
+        time.sleep(0.1)
+
+    job = fila.reservar("w3")
+    assert job["id"] == seguinte
+    registro = fila.obter(venenoso)
+    assert registro["status"] == ERRO and registro["tentativas"] == 2
+    assert fila.estatisticas()[ERRO] == 1
+
+
+def test_escolher_codificacao():
+    """Maior q vence; a preferência do servidor só desempata"""
+    from compressao import BROTLI_DISPONIVEL, escolher_codificacao
+
+    assert escolher_codificacao("br;q=0.1, gzip;q=1.0") == "gzip"
+    assert escolher_codificacao("gzip;q=0, identity") is None
+    assert escolher_codificacao("identity") is None
+    assert escolher_codificacao("") is None
+    preferida = "br" if BROTLI_DISPONIVEL else "gzip"
+    assert escolher_codificacao("gzip, br") == preferida
+    assert escolher_codificacao("gzip;q=0.5, br;q=0.5") == preferida
+    assert escolher_codificacao("*") == preferida
+    assert escolher_codificacao("*;q=0.2, gzip;q=0.8") == "gzip"
+
+
+def test_compressao_middleware():
+    """Comprime JSON grande e streaming; respostas pequenas e binárias passam intactas"""
+    import gzip
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse, Response, StreamingResponse
+    from fastapi.testclient import TestClient
+    from compressao import CompressaoMiddleware
+
+    grande = {"texto": "relatório " * 200}
+    api = FastAPI()
+    api.add_middleware(CompressaoMiddleware, minimo_bytes=500)
+    api.get("/grande")(lambda: JSONResponse(grande, headers={"Vary": "Origin"}))
+    api.get("/pequeno")(lambda: {"ok": True})
+    api.get("/pdf")(lambda: Response(b"%PDF-" + b"0" * 2000, media_type="application/pdf"))
+    api.get("/stream")(lambda: StreamingResponse(
+        (f'{{"indice": {i}}}\n' for i in range(50)), media_type="application/x-ndjson"
+    ))
+
+    with TestClient(api) as cliente:
+        gz = {"Accept-Encoding": "gzip"}
+        resposta = cliente.get("/grande", headers=gz)
+        assert resposta.headers["content-encoding"] == "gzip"
+        assert resposta.headers["vary"] == "Origin, Accept-Encoding"
+        assert resposta.json() == grande
+
+        # Corpo cru para conferir o Content-Length do corpo comprimido
+        with cliente.stream("GET", "/grande", headers=gz) as bruto:
+            comprimido = b"".join(bruto.iter_raw())
+        assert int(bruto.headers["content-length"]) == len(comprimido)
+        assert json.loads(gzip.decompress(comprimido)) == grande
+
+        resposta = cliente.get("/stream", headers=gz)
+        assert resposta.headers["content-encoding"] == "gzip"
+        assert len(linhas_ndjson(resposta)) == 50
+
+        # Sem compressão, tipos comprimíveis ainda variam por Accept-Encoding; PDF não
+        pequeno = cliente.get("/pequeno", headers=gz)
+        assert "content-encoding" not in pequeno.headers
+        assert pequeno.headers["vary"] == "Accept-Encoding"
+        identidade = cliente.get("/grande", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identidade.headers
+        assert identidade.headers["vary"] == "Origin, Accept-Encoding"
+        pdf = cliente.get("/pdf", headers=gz)
+        assert "content-encoding" not in pdf.headers and "vary" not in pdf.headers
+
+
+def test_compressao_corpo_grande():
+    """Corpo acima de LIMITE_NO_LOOP (como o pdf_base64) é comprimido em thread, íntegro"""
+    import base64
+    import threading
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import compressao
+
+    enorme = {"pdf_base64": base64.b64encode(os.urandom(3 * compressao.LIMITE_NO_LOOP)).decode()}
+    api = FastAPI()
+    api.add_middleware(compressao.CompressaoMiddleware)
+    api.get("/enorme")(lambda: enorme)
+
+    threads = []
+    comprimir = compressao.CompressaoMiddleware._comprimir
+
+    def comprimir_registrando(self, codificacao, corpo):
+        threads.append(threading.current_thread().name)
+        return comprimir(self, codificacao, corpo)
+
+    compressao.CompressaoMiddleware._comprimir = comprimir_registrando
+    try:
+        with TestClient(api) as cliente:
+            loop = cliente.portal.call(lambda: threading.current_thread().name)
+            for codificacao in ("gzip", "br") if compressao.BROTLI_DISPONIVEL else ("gzip",):
+                resposta = cliente.get("/enorme", headers={"Accept-Encoding": codificacao})
+                assert resposta.headers["content-encoding"] == codificacao
+                assert resposta.json() == enorme
+    finally:
+        compressao.CompressaoMiddleware._comprimir = comprimir
+
+    assert threads and loop not in threads
+
+
+def test_intervalo_pedido():
+    """Range de intervalo único: início-fim, aberto, sufixo e fora do arquivo"""
+    from artefatos import intervalo_pedido
+
+    assert intervalo_pedido("bytes=0-99", 1000) == (0, 99)
+    assert intervalo_pedido("bytes=900-", 1000) == (900, 999)
+    assert intervalo_pedido("bytes=900-5000", 1000) == (900, 999)
+    assert intervalo_pedido("bytes=-100", 1000) == (900, 999)
+    assert intervalo_pedido("bytes=-5000", 1000) == (0, 999)
+    assert intervalo_pedido("bytes=0-1, 5-9", 1000) is None
+    assert intervalo_pedido("linhas=0-9", 1000) is None
+    for invalido in ("bytes=1000-", "bytes=50-10", "bytes=-0"):
+        try:
+            intervalo_pedido(invalido, 1000)
+        except ValueError:
+            continue
+        raise AssertionError(f"{invalido} deveria ser 416")
+
+
+def test_responder_artefato():
+    """200 com ETag, 304 por If-None-Match, 206 com Content-Disposition, 416 e If-Range"""
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from artefatos import ArmazemRelatorios, responder_artefato
+
+    diretorio = Path(tempfile.mkdtemp(dir=TEMP))
+    origem = diretorio / "origem.pdf"
+    conteudo = bytes(range(256)) * 400
+    origem.write_bytes(conteudo)
+    armazem = ArmazemRelatorios(diretorio / "artefatos.db", diretorio / "pdfs", 3600, 10 ** 9)
+    entrada = armazem.guardar(origem, "hash", "relatório.pdf")
+
+    api = FastAPI()
+
+    @api.get("/r")
+    def baixar(request: Request):
+        return responder_artefato(armazem.caminho(entrada["id"]), entrada, request.headers, 60)
+
+    with TestClient(api) as cliente:
+        resposta = cliente.get("/r")
+        assert resposta.status_code == 200 and resposta.content == conteudo
+        etag = resposta.headers["etag"]
+        assert etag == f'"{entrada["sha256"]}"'
+        disposicao = resposta.headers["content-disposition"]
+        assert "relat%C3%B3rio.pdf" in disposicao
+
+        resposta = cliente.get("/r", headers={"If-None-Match": f'"outro", {etag}'})
+        assert resposta.status_code == 304 and resposta.content == b""
+        assert resposta.headers["etag"] == etag
+
+        resposta = cliente.get("/r", headers={"Range": "bytes=100-199"})
+        assert resposta.status_code == 206 and resposta.content == conteudo[100:200]
+        assert resposta.headers["content-range"] == f"bytes 100-199/{len(conteudo)}"
+        assert resposta.headers["content-disposition"] == disposicao
+
+        resposta = cliente.get("/r", headers={"Range": "bytes=-10"})
+        assert resposta.status_code == 206 and resposta.content == conteudo[-10:]
+
+        resposta = cliente.get("/r", headers={"Range": f"bytes={len(conteudo)}-"})
+        assert resposta.status_code == 416
+        assert resposta.headers["content-range"] == f"bytes */{len(conteudo)}"
+
+        # If-Range com ETag antigo: arquivo inteiro
+        resposta = cliente.get("/r", headers={"Range": "bytes=0-9", "If-Range": '"antigo"'})
+        assert resposta.status_code == 200 and len(resposta.content) == len(conteudo)
+
+
+def nova_idempotencia(janela_s=600):
+    from cache_relatorios import CacheRelatorios
+    from idempotencia import Idempotencia
+    diretorio = Path(tempfile.mkdtemp(dir=TEMP))
+    cache = CacheRelatorios(diretorio / "cache", 10 ** 7, 10 ** 8)
+    return Idempotencia(diretorio / "idempotencia", janela_s, cache), cache, diretorio
+
+
+def test_idempotencia_single_flight_e_repeticao():
+    """Gerações simultâneas iguais viram uma; a seguinte é repetida do cache"""
+    import asyncio
+    from idempotencia import AGUARDADO, GERADO, REPETIDO
+
+    idempotencia, cache, diretorio = nova_idempotencia()
+    geracoes = []
+
+    def gerador(destino):
+        async def gerar():
+            geracoes.append(destino)
+            await asyncio.sleep(0.05)
+            destino.write_bytes(b"%PDF-relatorio")
+            cache.guardar("impressao", destino)
+        return gerar
+
+    async def cenario():
+        destinos = [diretorio / f"saida{i}.pdf" for i in range(5)]
+        origens = await asyncio.gather(*(
+            idempotencia.executar("impressao", destino, gerador(destino)) for destino in destinos
+        ))
+        repetida = diretorio / "repetida.pdf"
+        origem = await idempotencia.executar("impressao", repetida, gerador(repetida))
+        return destinos + [repetida], list(origens) + [origem]
+
+    destinos, origens = asyncio.run(cenario())
+    assert len(geracoes) == 1
+    assert sorted(origens) == sorted([GERADO] + [AGUARDADO] * 4 + [REPETIDO])
+    assert all(destino.read_bytes() == b"%PDF-relatorio" for destino in destinos)
+    # Nenhuma cópia do PDF fora do cache
+    assert not list((diretorio / "idempotencia").glob("*.pdf"))
+
+
+def test_idempotencia_sem_cache():
+    """Sem cache o single-flight continua (PDF passado a quem aguardava); só não há repetição"""
+    import asyncio
+    from idempotencia import AGUARDADO, GERADO, Idempotencia
+
+    diretorio = Path(tempfile.mkdtemp(dir=TEMP))
+    idempotencia = Idempotencia(diretorio / "idempotencia", 600, cache=None)
+    geracoes = []
+
+    def gerador(destino):
+        async def gerar():
+            geracoes.append(destino)
+            await asyncio.sleep(0.05)
+            destino.write_bytes(b"%PDF-sem-cache")
+        return gerar
+
+    async def cenario():
+        destinos = [diretorio / "a.pdf", diretorio / "b.pdf"]
+        origens = await asyncio.gather(*(
+            idempotencia.executar("impressao", destino, gerador(destino)) for destino in destinos
+        ))
+        depois = diretorio / "depois.pdf"
+        origem = await idempotencia.executar("impressao", depois, gerador(depois))
+        return destinos, list(origens), origem
+
+    destinos, origens, origem_depois = asyncio.run(cenario())
+    assert sorted(origens) == sorted([GERADO, AGUARDADO])
+    assert all(destino.read_bytes() == b"%PDF-sem-cache" for destino in destinos)
+    # Terminada a geração não há de onde repetir: a seguinte gera de novo
+    assert origem_depois == GERADO
+    assert len(geracoes) == 2
+    assert [c.name for c in (diretorio / "idempotencia").iterdir()] == ["chaves"]
+
+
+def test_idempotencia_erro_repassado():
+    """Erro da geração chega a quem aguardava; nada fica para repetir"""
+    import asyncio
+
+    idempotencia, _, diretorio = nova_idempotencia()
+
+    async def gerar():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("LibreOffice falhou")
+
+    async def cenario():
+        return await asyncio.gather(*(
+            idempotencia.executar("impressao", diretorio / f"saida{i}.pdf", gerar) for i in range(3)
+        ), return_exceptions=True)
+
+    resultados = asyncio.run(cenario())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    assert idempotencia.estatisticas()["em_andamento"] == 0
+
+
+def test_idempotencia_chave_conflitante():
+    """Mesma Idempotency-Key com outra impressão é conflito; com a mesma, não"""
+    from idempotencia import ConflitoIdempotencia
+
+    idempotencia, _, _ = nova_idempotencia()
+    idempotencia.vincular("chave-1", "impressao-a")
+    idempotencia.vincular("chave-1", "impressao-a")
+    idempotencia.vincular("chave-2", "impressao-b")
+    try:
+        idempotencia.vincular("chave-1", "impressao-b")
+    except ConflitoIdempotencia:
+        pass
+    else:
+        raise AssertionError("Idempotency-Key reutilizada com outros dados deveria conflitar")
+    assert idempotencia.estatisticas()["conflitos"] == 1
+
+
+def respostas_por_estilo(**valores) -> list:
+    """24 respostas em que cada item do estilo recebe o valor dado (padrão 5)"""
+    from pontuacao import ESTILOS, PERFIS
+    respostas = [0] * 24
+    for estilo in ESTILOS:
+        for item in PERFIS[estilo]:
+            respostas[item - 1] = valores.get(estilo, 5)
+    return respostas
+
+
+def test_pontuacao_estilos_e_empates():
+    """Predominante e menos desenvolvido; empates vencidos pelo estilo que vem depois"""
+    from pontuacao import pontuar_registros
+
+    resultados = pontuar_registros([
+        {"participante": "Ana", "respostas": respostas_por_estilo(PESSOAS=3, ACAO=2, TEMPO=7, MENSAGEM=6)},
+        {"participante": "Empate total", "respostas": [5] * 24},
+        {"participante": "Empate no topo", "respostas": respostas_por_estilo(PESSOAS=9, ACAO=9, TEMPO=1, MENSAGEM=4)},
+    ])
+
+    ana, total, topo = resultados
+    assert ana["pontuacoes"] == {"PESSOAS": 18, "ACAO": 12, "TEMPO": 42, "MENSAGEM": 36}
+    assert (ana["predominante"], ana["menosDesenvolvido"]) == ("TEMPO", "ACAO")
+    assert ana["arquivo"] == "relatório_mais_tempo_e_menos_ação"
+
+    assert (total["predominante"], total["menosDesenvolvido"]) == ("MENSAGEM", "TEMPO")
+    assert total["arquivo"] == "relatório_mais_mensagem_menos_tempo"
+    assert (topo["predominante"], topo["menosDesenvolvido"]) == ("ACAO", "TEMPO")
+
+
+def test_pontuacao_respostas_invalidas():
+    """Fora de 0-10, quantidade errada ou texto viram erro só daquele respondente"""
+    from pontuacao import pontuar_registros
+
+    fora = [5] * 24
+    fora[3] = 11
+    resultados = pontuar_registros([
+        {"participante": "Fora", "respostas": fora},
+        {"participante": "Negativa", "respostas": [-1] + [5] * 23},
+        {"participante": "Curta", "respostas": [5] * 23},
+        {"participante": "Texto", "respostas": ["cinco"] + [5] * 23},
+        "não é objeto",
+        {"participante": "Válida", "respostas": [5] * 24},
+    ])
+
+    assert resultados[0] == {"indice": 0, "erro": "Respostas fora do intervalo 0-10"}
+    assert resultados[1] == {"indice": 1, "erro": "Respostas fora do intervalo 0-10"}
+    assert resultados[2] == {"indice": 2, "erro": "Esperadas 24 respostas, recebidas 23"}
+    assert "Resposta inválida" in resultados[3]["erro"]
+    assert resultados[4] == {"indice": 4, "erro": "Registro deve ser um objeto"}
+    assert resultados[5]["predominante"] == "MENSAGEM"
+
+
+def test_pontuacao_booleanos():
+    """Booleano entre inteiros é inválido, esteja a linha sozinha ou no meio de outras"""
+    from pontuacao import pontuar_registros
+
+    com_booleano = {"participante": "Bool", "respostas": [True, 2] + [5] * 22}
+    valida = {"participante": "Válida", "respostas": [5] * 24}
+    for registros in ([com_booleano], [com_booleano, valida], [valida, com_booleano]):
+        resultados = pontuar_registros(registros)
+        erros = [r for r in resultados if "erro" in r]
+        assert len(erros) == 1 and "Resposta inválida" in erros[0]["erro"]
+        assert erros[0]["indice"] == registros.index(com_booleano)
+        assert all("predominante" in r for r in resultados if "erro" not in r)
+
+
+def test_pontuacao_csv():
+    """Exportação do Google Forms (; ou ,) com colunas "N. pergunta" e nome"""
+    from pontuacao import ler_csv, pontuar_registros
+
+    cabecalho = ["Carimbo de data/hora", "Nome"] + [f"{item}. Pergunta {item}" for item in range(1, 25)]
+    respostas = respostas_por_estilo(PESSOAS=8, ACAO=1, TEMPO=4, MENSAGEM=6)
+    for separador in (";", ","):
+        conteudo = "\n".join([
+            separador.join(cabecalho),
+            separador.join(["01/02/2026 10:00", "Carla Dias"] + [str(r) for r in respostas]),
+            separador.join(["01/02/2026 10:05", "Sem respostas"] + [""] * 24),
+        ])
+        validos, invalido = pontuar_registros(ler_csv(conteudo))
+        assert validos["participante"] == "Carla Dias"
+        assert (validos["predominante"], validos["menosDesenvolvido"]) == ("PESSOAS", "ACAO")
+        assert validos["pontuacoes"]["PESSOAS"] == 48
+        assert "erro" in invalido and invalido["indice"] == 1
+
+
+def test_admissao_aimd():
+    """Gerações rápidas sobem o limite (+1 por rodada); lenta ou com falha o multiplica pelo fator"""
+    import asyncio
+    from admissao import ControleAdmissao
+
+    async def cenario():
+        controle = ControleAdmissao(
+            limite_inicial=2, limite_min=1, limite_max=4, max_fila=10,
+            latencia_alvo_s=0.05, espera_max_s=5, fator_reducao=0.5
+        )
+
+        # Cada geração rápida soma 1/limite: 2 + 1/2 + 1/2.5, perto de +1 por rodada
+        for _ in range(2):
+            async with controle.admitir():
+                pass
+        assert abs(controle.limite - 2.9) < 1e-9
+
+        for _ in range(20):
+            async with controle.admitir():
+                pass
+        assert controle.limite == 4.0
+
+        # Rajada de lentas: só a primeira dentro da janela reduz
+        async def lenta():
+            async with controle.admitir():
+                await asyncio.sleep(0.06)
+
+        await asyncio.gather(lenta(), lenta(), lenta())
+        assert controle.limite == 2.0
+        assert controle.estatisticas()["reducoes"] == 1
+
+        # Falha fora da janela: reduz de novo, sem passar do mínimo
+        await asyncio.sleep(0.06)
+        try:
+            async with controle.admitir():
+                raise RuntimeError("conversão falhou")
+        except RuntimeError:
+            pass
+        assert controle.limite == 1.0
+        await asyncio.sleep(0.06)
+        try:
+            async with controle.admitir():
+                raise RuntimeError("conversão falhou")
+        except RuntimeError:
+            pass
+        assert controle.limite == 1.0
+        assert controle.estatisticas()["em_execucao"] == 0
+
+    asyncio.run(cenario())
+
+
+def test_admissao_fila_e_recusa():
+    """Acima do limite espera na fila; fila cheia recusa na hora com Retry-After"""
+    import asyncio
+    from admissao import AdmissaoRecusada, ControleAdmissao
+
+    async def cenario():
+        controle = ControleAdmissao(
+            limite_inicial=1, limite_min=1, limite_max=1, max_fila=1,
+            latencia_alvo_s=1, espera_max_s=5
+        )
+        liberar = asyncio.Event()
+        ordem = []
+
+        async def geracao(nome):
+            async with controle.admitir():
+                ordem.append(nome)
+                await liberar.wait()
+
+        primeira = asyncio.create_task(geracao("primeira"))
+        await asyncio.sleep(0)
+        segunda = asyncio.create_task(geracao("segunda"))
+        await asyncio.sleep(0)
+        assert controle.estatisticas()["fila"] == 1
+
+        try:
+            async with controle.admitir():
+                raise AssertionError("deveria recusar com a fila cheia")
+        except AdmissaoRecusada as e:
+            assert e.retry_after >= 1
+
+        liberar.set()
+        await asyncio.gather(primeira, segunda)
+        assert ordem == ["primeira", "segunda"]
+        assert controle.estatisticas()["recusadas"] == 1
+
+    asyncio.run(cenario())
+
+
+def test_pipeline_vagas_por_estagio():
+    """Cada estágio limita as próprias vagas; fila do estágio cheia levanta EstagioSaturado"""
+    import asyncio
+    from execucao import ExecutorSaturado
+    from pipeline import CONVERTER, JUNTAR, PREENCHER, Estagio, EstagioSaturado, PipelineRelatorios
+
+    async def cenario():
+        pipeline = PipelineRelatorios([
+            Estagio(PREENCHER, workers=2, max_fila=4),
+            Estagio(CONVERTER, workers=1, max_fila=1),
+            Estagio(JUNTAR, workers=2, max_fila=4),
+        ])
+        liberar = asyncio.Event()
+        pico = {PREENCHER: 0, CONVERTER: 0}
+
+        async def ocupar(nome):
+            async with pipeline.vaga(nome):
+                em_execucao = pipeline.estatisticas()[nome]["em_execucao"]
+                pico[nome] = max(pico[nome], em_execucao)
+                await liberar.wait()
+
+        conversoes = [asyncio.create_task(ocupar(CONVERTER)) for _ in range(2)]
+        preenchimentos = [asyncio.create_task(ocupar(PREENCHER)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        estatisticas = pipeline.estatisticas()
+        assert (estatisticas[CONVERTER]["em_execucao"], estatisticas[CONVERTER]["fila"]) == (1, 1)
+        assert (estatisticas[PREENCHER]["em_execucao"], estatisticas[PREENCHER]["fila"]) == (2, 1)
+
+        # Conversão saturada não impede a junção de outra requisição
+        async with pipeline.vaga(JUNTAR):
+            assert pipeline.estatisticas()[JUNTAR]["em_execucao"] == 1
+
+        try:
+            async with pipeline.vaga(CONVERTER):
+                raise AssertionError("deveria recusar com a fila do estágio cheia")
+        except EstagioSaturado as e:
+            assert isinstance(e, ExecutorSaturado)
+
+        liberar.set()
+        await asyncio.gather(*conversoes, *preenchimentos)
+        assert pico == {PREENCHER: 2, CONVERTER: 1}
+
+        estatisticas = pipeline.estatisticas()
+        assert estatisticas[CONVERTER]["concluidas"] == 2
+        assert estatisticas[CONVERTER]["recusadas"] == 1
+        assert estatisticas[PREENCHER]["concluidas"] == 3
+        assert estatisticas[JUNTAR]["concluidas"] == 1
+
+    asyncio.run(cenario())
+
+
+def test_pipeline_libera_vaga_na_falha():
+    """Erro dentro do estágio devolve a vaga e libera quem estava na fila"""
+    import asyncio
+    from pipeline import Estagio
+
+    async def cenario():
+        estagio = Estagio("converter", workers=1, max_fila=2)
+        ordem = []
+
+        async def falhar():
+            async with estagio.vaga():
+                ordem.append("falha")
+                await asyncio.sleep(0.01)
+                raise RuntimeError("conversão falhou")
+
+        async def seguinte():
+            async with estagio.vaga():
+                ordem.append("seguinte")
+
+        resultados = await asyncio.gather(falhar(), seguinte(), return_exceptions=True)
+        assert isinstance(resultados[0], RuntimeError) and resultados[1] is None
+        assert ordem == ["falha", "seguinte"]
+
+        estatisticas = estagio.estatisticas()
+        assert (estatisticas["em_execucao"], estatisticas["fila"]) == (0, 0)
+        assert estatisticas["concluidas"] == 2
+
+        # Cancelamento enquanto aguarda na fila também não vaza vaga nem lugar na fila
+        async with estagio.vaga():
+            esperando = asyncio.create_task(seguinte())
+            await asyncio.sleep(0)
+            assert estagio.estatisticas()["fila"] == 1
+            esperando.cancel()
+            await asyncio.gather(esperando, return_exceptions=True)
+        assert estagio.estatisticas()["fila"] == 0
+
+        await asyncio.wait_for(seguinte(), timeout=1)
+        assert ordem == ["falha", "seguinte", "seguinte"]
+
+    asyncio.run(cenario())
+
+
+def test_modelo_html_escapa_campos():
+    """Valores dos campos saem escapados; inteiros e segmentos estáticos intactos"""
+    from html_email import ModeloHtml
+
+    modelo = ModeloHtml('<p title="{{nome}}">{{nome}}</p><script>var x = 1 < 2;</script><b>{{pontos}}</b>')
+    assert modelo.campos == ("nome", "nome", "pontos")
+
+    html = modelo.renderizar(nome='<img src=x onerror="alert(1)"> & \'Zé\'', pontos=42)
+    assert html == (
+        '<p title="&lt;img src=x onerror=&quot;alert(1)&quot;&gt; &amp; &#x27;Zé&#x27;">'
+        '&lt;img src=x onerror=&quot;alert(1)&quot;&gt; &amp; &#x27;Zé&#x27;</p>'
+        '<script>var x = 1 < 2;</script><b>42</b>'
+    )
+
+
+def test_perfil_somado_dos_workers():
+    """Estatísticas devolvidas pelas etapas (perfilar) são somadas no .prof da requisição"""
+    import pstats
+    from concurrent.futures import ThreadPoolExecutor
+    from perfilador import Perfilador, perfilar
+
+    def etapa(n):
+        return sum(i * i for i in range(n))
+
+    with ThreadPoolExecutor(2) as pool:
+        resultados = list(pool.map(lambda n: perfilar(etapa, n), (1000, 2000)))
+    assert [r for r, _ in resultados] == [etapa(1000), etapa(2000)]
+
+    perfilador = Perfilador(Path(tempfile.mkdtemp(dir=TEMP)), max_perfis=5, token="t")
+    nome = perfilador.salvar([stats for _, stats in resultados], {"method": "POST", "path": "/x"}, 200, 0.1)
+
+    estatisticas = pstats.Stats(str(perfilador.diretorio / f"{nome}.prof"))
+    chamadas = [valores[0] for funcao, valores in estatisticas.stats.items() if funcao[2] == "etapa"]
+    assert chamadas == [2]
+    assert "cProfile das 2 etapas" in (perfilador.diretorio / f"{nome}.txt").read_text(encoding="utf-8")
+
+
+def main():
+    """Executar todos os testes"""
+    print("\n" + "="*70)
+    print("  TESTES DOS MÓDULOS")
+    print("="*70)
+
+    testes = [(nome, funcao) for nome, funcao in globals().items() if nome.startswith("test_")]
+    falhas = 0
+    for nome, funcao in testes:
+        inicio = time.perf_counter()
+        try:
+            funcao()
+            print_success(f"{nome} ({time.perf_counter() - inicio:.2f}s)")
+        except Exception as e:
+            falhas += 1
+            print_error(f"{nome}: {type(e).__name__}: {e}")
+
+    print("\n" + "="*70)
+    if falhas:
+        print_error(f"{falhas} de {len(testes)} testes falharam")
+    else:
+        print_success(f"Todos os {len(testes)} testes passaram")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""
+Worker dedicado da fila de jobs (/jobs)
+
+Roda o mesmo pipeline da API, só consumindo a fila SQLite em DADOS_DIR.
+Vários workers (processos ou containers com o mesmo volume) podem drenar a
+fila em paralelo. Para não processar jobs no processo da API, suba-a com
+JOBS_WORKERS=0.
+
+    python worker.py
+"""
+
+import asyncio
+
+import app
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(app.rodar_worker())
+    except KeyboardInterrupt:
+        pass